@@ -3,12 +3,218 @@ import json
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 from openai import OpenAI
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import logging
+import copy
+import itertools
+import time
+from db import ConnectionManager
+from cache import TTLCache
+from cache_versions import CacheVersions
+from cohorts import bin_counts, load_cohort_model
+from decision_log import DecisionLog
+from llm_cache import LLMResponseCache
+from llm_gateway import LLMGateway, CircuitBreaker
+from migrations import DEFAULT_TASK_OUTCOME_KEYS, migrate
+from prompts import PLAN_SCHEMA, PromptCompiler, PromptRequest, conforming
+from slots import SlotModel
+
+# Hot per-user queries; each one is served by an index from migrations.py
+PATTERN_STATS_SQL = '''
+    SELECT total_tasks, completed_tasks, hour_sum, hour_sum_sq
+    FROM user_pattern_stats
+    WHERE email = ?
+'''
+
+# Ties are broken by the most recent task, matching value_counts() over the
+# newest-first task history
+PATTERN_BINS_SQL = '''
+    SELECT kind, bin FROM user_pattern_bins
+    WHERE email = ?
+    ORDER BY kind, task_count DESC, last_task_id DESC
+'''
+
+COHORT_BINS_SQL = '''
+    SELECT kind, bin, task_count FROM user_pattern_bins
+    WHERE email = ?
+'''
+
+PENDING_TASK_COUNT_SQL = '''
+    SELECT COUNT(*) FROM user_behavior 
+    WHERE email = ? AND scheduled_time > ? AND completion_status IS NULL
+'''
+
+RECENT_TASKS_SQL = '''
+    SELECT task_name, scheduled_time, completion_status, created_at, id
+    FROM user_behavior 
+    WHERE email = ? 
+    ORDER BY created_at DESC
+    LIMIT 10
+'''
+
+# Precomputed patterns, used while computed after the user's last change and within the max age
+PRECOMPUTED_PATTERNS_SQL = '''
+    SELECT productivity_patterns FROM user_preferences
+    WHERE email = ? AND patterns_updated_at >= ?
+      AND (patterns_dirty_at IS NULL OR patterns_dirty_at < patterns_updated_at)
+'''
+
+# An upsert: a user's first precompute may still be running, with no row yet to mark
+MARK_PATTERNS_DIRTY_SQL = '''
+    INSERT INTO user_preferences (email, patterns_dirty_at) VALUES (?, ?)
+    ON CONFLICT (email) DO UPDATE SET patterns_dirty_at = excluded.patterns_dirty_at
+'''
+
+# Outcomes are recorded by primary key; RETURNING hands back what the aggregates need
+RECORD_OUTCOME_SQL = '''
+    UPDATE user_behavior
+    SET completion_status = ?, user_feedback = ?, completion_time = ?
+    WHERE id = ? AND email = ? AND completion_status IS NULL
+    RETURNING task_name, scheduled_time
+'''
+
+# Older clients identify the task by name: the user's newest pending task of that name
+PENDING_TASK_BY_NAME_SQL = '''
+    SELECT id FROM user_behavior
+    WHERE email = ? AND task_name = ? AND completion_status IS NULL
+    ORDER BY created_at DESC
+    LIMIT 1
+'''
+
+# Per-task outcome counters, kept as a Space-Saving top-k sketch per user
+# (migration 9): bump a tracked key, add a key while there is room, or
+# take over the entry with the fewest outcomes
+TASK_OUTCOME_BUMP_SQL = '''
+    UPDATE user_task_outcomes
+    SET outcomes = outcomes + ? + ?, successes = successes + ?, failures = failures + ?
+    WHERE email = ? AND task_key = ?
+'''
+
+TASK_OUTCOME_KEYS_SQL = '''
+    SELECT COUNT(*) FROM user_task_outcomes WHERE email = ?
+'''
+
+TASK_OUTCOME_INSERT_SQL = '''
+    INSERT INTO user_task_outcomes (email, task_key, outcomes, error, successes, failures)
+    VALUES (?, ?, ? + ?, 0, ?, ?)
+'''
+
+# The new key inherits the evicted count as its error bound
+TASK_OUTCOME_REPLACE_SQL = '''
+    UPDATE user_task_outcomes
+    SET task_key = ?, error = outcomes, outcomes = outcomes + ? + ?, successes = ?, failures = ?
+    WHERE email = ? AND task_key = (
+        SELECT task_key FROM user_task_outcomes WHERE email = ?
+        ORDER BY outcomes, task_key LIMIT 1
+    )
+'''
+
+TASK_OUTCOMES_SQL = '''
+    SELECT task_key, outcomes, error, successes, failures FROM user_task_outcomes
+    WHERE email = ?
+    ORDER BY outcomes DESC, task_key
+'''
+
+# Batch scan for the precompute job: one user range at a time, in email
+# order along idx_user_behavior_email_created (which covers every column)
+PATTERN_SCAN_USERS_SQL = '''
+    SELECT DISTINCT email FROM user_behavior
+    WHERE email > ?
+    ORDER BY email
+    LIMIT ?
+'''
+
+PATTERN_SCAN_SQL = '''
+    SELECT email,
+           CAST(strftime('%H', scheduled_time) AS INTEGER),
+           (CAST(strftime('%w', scheduled_time) AS INTEGER) + 6) % 7,
+           completion_status = 'completed',
+           id,
+           created_at
+    FROM user_behavior
+    WHERE email > ? AND email <= ?
+    ORDER BY email
+'''
+
+# Archived tasks of the same user range (retention.py), one row per user, day and hour
+ROLLUP_SCAN_SQL = '''
+    SELECT email, hour, (CAST(strftime('%w', day) AS INTEGER) + 6) % 7, completed, last_task_id, tasks
+    FROM user_daily_rollup
+    WHERE email > ? AND email <= ?
+    ORDER BY email
+'''
+
+# Multi-user analytics: rows per user, then the task columns in the same email order
+# (both from the covering email index), optionally narrowed to a list of emails
+ANALYTICS_USERS_SQL = '''
+    SELECT email, COUNT(*) FROM user_behavior
+    WHERE email IS NOT NULL AND scheduled_time IS NOT NULL {}
+    GROUP BY email ORDER BY email
+'''
+
+ANALYTICS_SCAN_SQL = '''
+    SELECT id, scheduled_time, completion_status IS 'completed' FROM user_behavior
+    WHERE email IS NOT NULL AND scheduled_time IS NOT NULL {}
+    ORDER BY email
+'''
+
+ANALYTICS_COLUMNS = np.dtype([("id", np.int64), ("scheduled_time", "U32"), ("completed", np.int64)])
+
+# The same for archived tasks, read from their rollup in primary key order
+ANALYTICS_ROLLUP_USERS_SQL = '''
+    SELECT email, COUNT(*) FROM user_daily_rollup
+    WHERE email IS NOT NULL {}
+    GROUP BY email ORDER BY email
+'''
+
+ANALYTICS_ROLLUP_SQL = '''
+    SELECT day, hour, tasks, completed, last_task_id FROM user_daily_rollup
+    WHERE email IS NOT NULL {}
+    ORDER BY email
+'''
+
+ANALYTICS_ROLLUP_COLUMNS = np.dtype([("day", "U10"), ("hour", np.int64), ("tasks", np.int64),
+                                     ("completed", np.int64), ("last_task_id", np.int64)])
+
+# SQLite's default limit on host parameters is 999
+ANALYTICS_EMAILS_PER_QUERY = 900
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+def summarize_patterns(total_tasks: int, completed_tasks: int, hour_sum: int, hour_sum_sq: int,
+                       bins: List[Tuple[str, int]]) -> Dict:
+    """Pattern summary from task counts, hour sums and frequency-ranked (kind, bin) pairs"""
+    if not total_tasks:
+        return {"patterns": "new_user", "preferred_times": [], "productivity_score": 0.5}
+    
+    # Analyze completion patterns
+    completion_rate = completed_tasks / total_tasks
+    
+    # Find preferred hours and days (bins are already ranked by frequency)
+    preferred_hours = [b for kind, b in bins if kind == 'hour'][:3]
+    preferred_days = [b for kind, b in bins if kind == 'day'][:3]
+    
+    # Sample standard deviation of the scheduled hour from the running sums
+    if total_tasks > 1:
+        variance = (total_tasks * hour_sum_sq - hour_sum ** 2) / (total_tasks * (total_tasks - 1))
+        hour_std = np.sqrt(np.float64(max(variance, 0)))
+    else:
+        hour_std = np.float64(np.nan)
+    
+    # Calculate productivity score based on completion rate and timing
+    productivity_score = completion_rate * 0.7 + (1 - hour_std / 24) * 0.3
+    
+    return {
+        "patterns": "established_user",
+        "completion_rate": completion_rate,
+        "preferred_hours": preferred_hours,
+        "preferred_days": preferred_days,
+        "productivity_score": productivity_score,
+        "total_tasks": total_tasks
+    }
 
 class AgenticReminderAgent:
     """
@@ -16,13 +222,62 @@ class AgenticReminderAgent:
     learns from user behavior, and makes intelligent decisions.
     """
     
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, db_path: str = "agentic_reminders.db"):
         self.openai_api_key = openai_api_key
-        self.client = OpenAI(api_key=openai_api_key)
-        self.db_path = "agentic_reminders.db"
+        # Retries are left to the gateway's breaker and the heuristic fallbacks
+        self.llm = LLMGateway(
+            OpenAI(api_key=openai_api_key, max_retries=0),
+            timeout=float(os.environ.get('LLM_TIMEOUT', 8)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('LLM_BREAKER_THRESHOLD', 5)),
+                cooldown=float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+            )
+        )
+        self.db_path = db_path
+        self.db = ConnectionManager(self.db_path)
+        # Per-user data versions; caches key entries by them so every worker process sees every write
+        self.cache_versions = CacheVersions(self.db)
+        # Pattern results per (email, cache version)
+        self.pattern_cache = TTLCache(
+            max_size=int(os.environ.get('PATTERN_CACHE_SIZE', 1024)),
+            ttl=float(os.environ.get('PATTERN_CACHE_TTL', 300))
+        )
+        # Precomputed patterns older than this are recomputed on read
+        self.precomputed_max_age = float(os.environ.get('PATTERN_PRECOMPUTE_MAX_AGE', 7200))
+        # Offline-trained cohorts (cohorts.py), loaded once; users with fewer
+        # tasks than cohort_sparse_tasks are scheduled from their cohort's best hours
+        self.cohorts = load_cohort_model(os.environ.get('COHORT_MODEL_PATH', 'cohort_model.joblib'))
+        self.cohort_sparse_tasks = int(os.environ.get('COHORT_SPARSE_TASKS', 5))
+        # Distinct tasks tracked per user by the outcome sketch
+        self.task_outcome_keys = int(os.environ.get('TASK_OUTCOME_KEYS', DEFAULT_TASK_OUTCOME_KEYS))
+        # Hour-of-week completion model; the LLM is asked only when it is not confident
+        self.slot_model = SlotModel(
+            self.db,
+            min_confidence=float(os.environ.get('SLOT_MODEL_MIN_CONFIDENCE', 0.6)),
+            cache_size=int(os.environ.get('SLOT_MODEL_CACHE_SIZE', 4096))
+        )
+        # Write-behind audit log; writes synchronously until start() is called
+        self.decision_log = DecisionLog(
+            self.db,
+            max_queue=int(os.environ.get('DECISION_LOG_QUEUE', 10000)),
+            batch_size=int(os.environ.get('DECISION_LOG_BATCH', 500)),
+            interval=float(os.environ.get('DECISION_LOG_INTERVAL', 1.0))
+        )
         self.setup_database()
+        self.llm_cache = LLMResponseCache(self.db, memory_size=int(os.environ.get('LLM_CACHE_SIZE', 512)))
+        # Compiled prompts with per-call-site token accounting
+        self.prompts = PromptCompiler(self.llm, DEFAULT_MODEL)
         self.setup_logging()
         
+    @property
+    def client(self):
+        """The OpenAI client behind the gateway"""
+        return self.llm.client
+    
+    @client.setter
+    def client(self, client):
+        self.llm.client = client
+        
     def setup_logging(self):
         """Setup logging for the agent's decisions and actions"""
         logging.basicConfig(
@@ -37,135 +292,325 @@ class AgenticReminderAgent:
         
     def setup_database(self):
         """Initialize database for storing user behavior and learning data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # User behavior tracking
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_behavior (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT,
-                task_name TEXT,
-                scheduled_time DATETIME,
-                completion_time DATETIME,
-                completion_status TEXT,
-                user_feedback TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Agent decisions and reasoning
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS agent_decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT,
-                decision_type TEXT,
-                reasoning TEXT,
-                action_taken TEXT,
-                outcome TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # User preferences and patterns
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE,
-                preferred_times TEXT,
-                task_categories TEXT,
-                productivity_patterns TEXT,
-                last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            migrate(conn)
         
     def analyze_user_patterns(self, email: str) -> Dict:
         """Analyze user's historical behavior to understand patterns"""
-        conn = sqlite3.connect(self.db_path)
-        
-        # Get user's task history
-        df = pd.read_sql_query('''
-            SELECT * FROM user_behavior 
-            WHERE email = ? 
-            ORDER BY created_at DESC
-        ''', conn, params=[email])
-        
-        conn.close()
-        
-        if df.empty:
-            return {"patterns": "new_user", "preferred_times": [], "productivity_score": 0.5}
-        
-        # Analyze completion patterns
-        completion_rate = len(df[df['completion_status'] == 'completed']) / len(df)
-        
-        # Analyze time patterns
-        df['hour'] = pd.to_datetime(df['scheduled_time']).dt.hour
-        df['day_of_week'] = pd.to_datetime(df['scheduled_time']).dt.dayofweek
-        
-        # Find preferred hours
-        hour_counts = df['hour'].value_counts()
-        preferred_hours = hour_counts.head(3).index.tolist()
-        
-        # Find preferred days
-        day_counts = df['day_of_week'].value_counts()
-        preferred_days = day_counts.head(3).index.tolist()
-        
-        # Calculate productivity score based on completion rate and timing
-        productivity_score = completion_rate * 0.7 + (1 - df['hour'].std() / 24) * 0.3
-        
+        version = self.cache_versions.current(email)
+        patterns = self.pattern_cache.get_or_compute((email, version), lambda: self._load_user_patterns(email))
+        # Callers get their own copy so the cached entry cannot be mutated
+        return copy.deepcopy(patterns)
+    
+    def _load_user_patterns(self, email: str) -> Dict:
+        """Fresh precomputed patterns if there are any, otherwise compute them"""
+        precomputed = self._precomputed(email)
+        if precomputed is not None:
+            return precomputed["patterns"]
+        return self._compute_user_patterns(email)
+    
+    def _precomputed(self, email: str) -> Optional[Dict]:
+        """The user's stored patterns and heuristic insights, unless stale"""
+        with self.db.connection() as conn:
+            row = conn.execute(PRECOMPUTED_PATTERNS_SQL, [email, time.time() - self.precomputed_max_age]).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+    
+    def _compute_user_patterns(self, email: str) -> Dict:
+        """Build the pattern summary from the user's materialized aggregates"""
+        # Read the user's materialized aggregates instead of the full history
+        with self.db.connection() as conn:
+            stats = conn.execute(PATTERN_STATS_SQL, [email]).fetchone()
+            bins = conn.execute(PATTERN_BINS_SQL, [email]).fetchall() if stats else []
+        
+        if not stats:
+            return summarize_patterns(0, 0, 0, 0, [])
+        return summarize_patterns(*stats, bins)
+    
+    def analyze_many(self, emails: List[str]) -> Dict[str, Dict]:
+        """analyze_user_patterns for many users at once, keyed by email"""
+        emails = list(dict.fromkeys(emails))
+        results = {}
+        for start in range(0, len(emails), ANALYTICS_EMAILS_PER_QUERY):
+            chunk = emails[start:start + ANALYTICS_EMAILS_PER_QUERY]
+            results.update(self._analyze_scan(f"AND email IN ({','.join('?' * len(chunk))})", chunk))
+        
+        new_user = summarize_patterns(0, 0, 0, 0, [])
+        return {email: results.get(email) or copy.deepcopy(new_user) for email in emails}
+    
+    def analyze_all(self) -> Dict[str, Dict]:
+        """analyze_user_patterns for every user with at least one task, keyed by email"""
+        return self._analyze_scan()
+    
+    def _analyze_scan(self, condition: str = "", params: List = ()) -> Dict[str, Dict]:
+        """
+        Pull the task columns once as NumPy arrays and compute every user's
+        patterns together: each per-user count, sum and histogram is one
+        bincount over the user codes, and the top-3 ranking one argsort.
+        Archived tasks come in from their rollup as weighted rows.
+        """
+        with self.db.connection() as conn:
+            # One snapshot for all reads
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            users = conn.execute(ANALYTICS_USERS_SQL.format(condition), params).fetchall()
+            columns = np.fromiter(conn.execute(ANALYTICS_SCAN_SQL.format(condition), params), dtype=ANALYTICS_COLUMNS)
+            rollup_users = conn.execute(ANALYTICS_ROLLUP_USERS_SQL.format(condition), params).fetchall()
+            rollup = np.fromiter(conn.execute(ANALYTICS_ROLLUP_SQL.format(condition), params),
+                                 dtype=ANALYTICS_ROLLUP_COLUMNS)
+        if not users and not rollup_users:
+            return {}
+        
+        emails = sorted({email for email, _ in users} | {email for email, _ in rollup_users})
+        n_users = len(emails)
+        index = {email: i for i, email in enumerate(emails)}
+        codes = np.concatenate([
+            np.repeat([index[email] for email, _ in users], [n for _, n in users]),
+            np.repeat([index[email] for email, _ in rollup_users], [n for _, n in rollup_users]),
+        ]).astype(np.int64)
+        weights = np.concatenate([np.ones(len(columns), dtype=np.int64), rollup["tasks"]])
+        ids = np.concatenate([columns["id"], rollup["last_task_id"]])
+        when = pd.to_datetime(pd.Series(columns["scheduled_time"]), format="ISO8601")
+        rollup_days = pd.to_datetime(pd.Series(rollup["day"]), format="%Y-%m-%d")
+        hours = np.concatenate([when.dt.hour.to_numpy(dtype=np.int64), rollup["hour"]])
+        days = np.concatenate([when.dt.dayofweek.to_numpy(dtype=np.int64),
+                               rollup_days.dt.dayofweek.to_numpy(dtype=np.int64)])
+        
+        total = np.bincount(codes, weights=weights, minlength=n_users).astype(np.int64)
+        done = np.bincount(codes, weights=np.concatenate([columns["completed"], rollup["completed"]]),
+                           minlength=n_users).astype(np.int64)
+        hour_sum = np.bincount(codes, weights=hours * weights, minlength=n_users).astype(np.int64)
+        hour_sum_sq = np.bincount(codes, weights=hours * hours * weights, minlength=n_users).astype(np.int64)
+        
+        # Same arithmetic as summarize_patterns, so results are bit-for-bit equal
+        completion_rate = done / total
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (total * hour_sum_sq - hour_sum ** 2) / (total * (total - 1))
+        hour_std = np.where(total > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+        productivity_score = completion_rate * 0.7 + (1 - hour_std / 24) * 0.3
+        
+        top_hours = self._top_bins(codes, hours, weights, ids, n_users, 24)
+        top_days = self._top_bins(codes, days, weights, ids, n_users, 7)
         return {
-            "patterns": "established_user",
-            "completion_rate": completion_rate,
-            "preferred_hours": preferred_hours,
-            "preferred_days": preferred_days,
-            "productivity_score": productivity_score,
-            "total_tasks": len(df)
+            email: {
+                "patterns": "established_user",
+                "completion_rate": rate,
+                "preferred_hours": preferred_hours,
+                "preferred_days": preferred_days,
+                "productivity_score": score,
+                "total_tasks": count
+            }
+            for email, rate, preferred_hours, preferred_days, score, count in zip(
+                emails, completion_rate.tolist(), top_hours, top_days, productivity_score, total.tolist())
         }
-        
+    
+    @staticmethod
+    def _top_bins(codes: np.ndarray, values: np.ndarray, weights: np.ndarray, ids: np.ndarray, n_users: int,
+                  n_bins: int) -> List[List[int]]:
+        """Each user's three most frequent bins, ties going to the bin with the newest task"""
+        flat = codes * n_bins + values
+        counts = np.bincount(flat, weights=weights, minlength=n_users * n_bins).astype(np.int64).reshape(n_users, n_bins)
+        newest = np.zeros(n_users * n_bins, dtype=np.int64)
+        np.maximum.at(newest, flat, ids)
+        
+        # Rank by count, then by newest task id, in one composite key; empty bins sort last
+        key = counts * (int(ids.max()) + 1) + newest.reshape(n_users, n_bins)
+        top = np.argsort(-key, axis=1)[:, :3]
+        used = np.minimum((counts > 0).sum(axis=1), 3)
+        return [row[:n] for row, n in zip(top.tolist(), used.tolist())]
+    
+    def precompute_patterns(self, active_days: int = 30, users_per_chunk: int = 500) -> int:
+        """
+        Batch job: recompute patterns and heuristic insights for every user
+        with a task created in the last `active_days` and store them in
+        user_preferences.productivity_patterns. Users are read in email
+        ranges so memory stays bounded by the chunk. Returns users stored.
+        """
+        # created_at is stored in UTC by CURRENT_TIMESTAMP
+        cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - active_days * 86400))
+        stored = 0
+        last_email = ''
+        while True:
+            # Anything written after this instant marks the user dirty again
+            computed_at = time.time()
+            with self.db.connection() as conn:
+                emails = [row[0] for row in conn.execute(PATTERN_SCAN_USERS_SQL, [last_email, users_per_chunk])]
+                if not emails:
+                    return stored
+                rows = conn.execute(PATTERN_SCAN_SQL, [last_email, emails[-1]]).fetchall()
+                rolled = {email: list(user_rows) for email, user_rows in itertools.groupby(
+                    conn.execute(ROLLUP_SCAN_SQL, [last_email, emails[-1]]), key=lambda row: row[0])}
+            last_email = emails[-1]
+            
+            results = []
+            for email, user_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                summary = self._summarize_scanned(list(user_rows), cutoff, rolled.get(email, []))
+                if summary is not None:
+                    results.append((email, json.dumps(summary), computed_at))
+            
+            with self.db.connection() as conn:
+                conn.executemany('''
+                    INSERT INTO user_preferences (email, productivity_patterns, patterns_updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (email) DO UPDATE SET
+                        productivity_patterns = excluded.productivity_patterns,
+                        patterns_updated_at = excluded.patterns_updated_at
+                ''', results)
+            stored += len(results)
+    
+    def _summarize_scanned(self, rows: List[Tuple], cutoff: str, rolled: List[Tuple] = ()) -> Optional[Dict]:
+        """
+        Patterns and heuristic insights from one user's scanned rows and
+        rolled-up archived tasks; None if the user is inactive
+        """
+        if max(row[5] or '' for row in rows) < cutoff:
+            return None
+        # A live row is one task; a rollup row carries its task count
+        weighted = [(hour, day, bool(is_completed), task_id, 1) for _, hour, day, is_completed, task_id, _ in rows]
+        weighted += [(hour, day, done, last_id, tasks) for _, hour, day, done, last_id, tasks in rolled]
+        total = completed = hour_sum = hour_sum_sq = 0
+        bins = {}
+        for hour, day, done, task_id, tasks in weighted:
+            total += tasks
+            completed += done
+            hour_sum += hour * tasks
+            hour_sum_sq += hour * hour * tasks
+            for key in (('hour', hour), ('day', day)):
+                count, last_id = bins.get(key, (0, task_id))
+                bins[key] = (count + tasks, max(last_id, task_id))
+        
+        # Same ranking as PATTERN_BINS_SQL
+        ranked = sorted(bins.items(), key=lambda item: (item[0][0], -item[1][0], -item[1][1]))
+        patterns = summarize_patterns(total, completed, hour_sum, hour_sum_sq, [key for key, _ in ranked])
+        return {"patterns": patterns, "insights": self._fallback_productivity_insights(patterns)}
+    
+    def record_task(self, email: str, task_name: str, scheduled_dt: datetime) -> int:
+        """Store a new task and fold it into the user's pattern aggregates"""
+        return self.record_tasks([(email, task_name, scheduled_dt)])[0]
+
+    def record_tasks(self, tasks: List[Tuple[str, str, datetime]]) -> List[int]:
+        """Store many (email, task_name, scheduled_dt) tasks in one transaction; returns their ids in order"""
+        if not tasks:
+            return []
+        with self.db.connection() as conn:
+            conn.executemany('''
+                INSERT INTO user_behavior (email, task_name, scheduled_time)
+                VALUES (?, ?, ?)
+            ''', tasks)
+            # AUTOINCREMENT ids from one write transaction are consecutive
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            task_ids = list(range(last_id - len(tasks) + 1, last_id + 1))
+            self._add_tasks_to_patterns(conn, [(email, task_id, scheduled_dt)
+                                               for (email, _, scheduled_dt), task_id in zip(tasks, task_ids)])
+            emails = {email for email, _, _ in tasks}
+            now = time.time()
+            conn.executemany(MARK_PATTERNS_DIRTY_SQL, [(email, now) for email in emails])
+            self.cache_versions.bump(conn, emails)
+
+        for email in emails:
+            self._invalidate_user_caches(email)
+        return task_ids
+
+    def _add_tasks_to_patterns(self, conn: sqlite3.Connection, tasks: List[Tuple[str, int, datetime]]):
+        """Incrementally update the hour/weekday histograms and running sums, one upsert per user and bin"""
+        stats = {}
+        bins = {}
+        for email, task_id, scheduled_dt in tasks:
+            hour = scheduled_dt.hour
+            total = stats.setdefault(email, [0, 0, 0])
+            total[0] += 1
+            total[1] += hour
+            total[2] += hour * hour
+            for key in ((email, 'hour', hour), (email, 'day', scheduled_dt.weekday())):
+                count, last_id = bins.get(key, (0, task_id))
+                bins[key] = (count + 1, max(last_id, task_id))
+
+        conn.executemany('''
+            INSERT INTO user_pattern_stats (email, total_tasks, hour_sum, hour_sum_sq)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (email) DO UPDATE SET
+                total_tasks = total_tasks + excluded.total_tasks,
+                hour_sum = hour_sum + excluded.hour_sum,
+                hour_sum_sq = hour_sum_sq + excluded.hour_sum_sq
+        ''', [(email, *total) for email, total in stats.items()])
+        conn.executemany('''
+            INSERT INTO user_pattern_bins (email, kind, bin, task_count, last_task_id)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (email, kind, bin) DO UPDATE SET
+                task_count = task_count + excluded.task_count,
+                last_task_id = MAX(last_task_id, excluded.last_task_id)
+        ''', [(*key, count, last_id) for key, (count, last_id) in bins.items()])
+        
+    def cohort_prior(self, email: str, patterns: Dict) -> Optional[Dict]:
+        """The cohort and its best hours for a new or sparse user, if a cohort model is loaded"""
+        if self.cohorts is None:
+            return None
+        if patterns["patterns"] == "new_user":
+            return self.cohorts.prior()
+        if patterns["total_tasks"] >= self.cohort_sparse_tasks:
+            return None
+        
+        with self.db.connection() as conn:
+            bins = conn.execute(COHORT_BINS_SQL, [email]).fetchall()
+        hour_counts, day_counts = bin_counts(bins)
+        return self.cohorts.prior(hour_counts, day_counts, patterns["completion_rate"])
+    
     def suggest_optimal_time(self, email: str, task_name: str, user_preferred_time: str = None) -> str:
         """Use AI to suggest the optimal time for a task based on user patterns"""
+        # The user's own completion record answers first
+        local = self.slot_model.suggest(email, user_preferred_time)
+        if local is not None and local["confidence"] >= self.slot_model.min_confidence:
+            self.logger.info(f"Slot model suggested time for {task_name}: {local}")
+            return local
+        
         patterns = self.analyze_user_patterns(email)
+        prior = self.cohort_prior(email, patterns)
+        if prior is not None:
+            patterns["cohort_best_hours"] = prior["best_hours"]
         
         # Try AI first, fallback to heuristics if quota exceeded
         try:
-            prompt = f"""
-            As an intelligent task scheduling agent, suggest the optimal time for this task:
-            
-            Task: {task_name}
-            User Email: {email}
-            User Patterns: {json.dumps(patterns, indent=2)}
-            User's Preferred Time: {user_preferred_time if user_preferred_time else "Not specified"}
-            Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-            
-            Consider:
-            1. User's historical completion patterns
-            2. Preferred working hours
-            3. Task complexity and estimated duration
-            4. Current workload and schedule
-            5. Optimal productivity windows
-            
-            Return ONLY a JSON object: {{"suggested_time": "YYYY-MM-DD HH:MM", "reasoning": "explanation", "confidence": 0.0-1.0}}
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.3
-            )
-            
-            result = json.loads(response.choices[0].message.content.strip())
+            result = self._cached_completion(
+                "suggest_optimal_time", email, task=task_name, preferred=user_preferred_time or "Not specified",
+                now=datetime.now().strftime('%Y-%m-%d %H:%M'), patterns=patterns)
             self.logger.info(f"AI suggested time for {task_name}: {result}")
             return result
             
         except Exception as e:
             self.logger.error(f"Error suggesting optimal time: {e}")
+            # A less confident slot-model answer still beats the frequency heuristics
+            if local is not None:
+                return local
             # Fallback to intelligent heuristics
             return self._fallback_time_suggestion(email, task_name, user_preferred_time, patterns)
     
+    def _completion_request(self, call_site: str, email: str, **values) -> Tuple[PromptRequest, str]:
+        """The call site's compiled prompt and its response-cache key"""
+        request = self.prompts.request(call_site, **values)
+        # The adaptive max_tokens is left out of the key: it bounds the reply, it does not change it
+        return request, self.llm_cache.make_key(DEFAULT_MODEL, request.cache_params, request.messages,
+                                                self.cache_versions.current(email))
+    
+    def _cached_completion(self, call_site: str, email: str, **values):
+        """Send a call site's prompt to the LLM and parse the JSON reply, serving repeats from the response cache"""
+        request, key = self._completion_request(call_site, email, **values)
+        
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Only replies that parse are cached
+        result = json.loads(self.prompts.complete(request).strip())
+        self.llm_cache.set(key, call_site, email, result)
+        return result
+    
+    def _invalidate_user_caches(self, email: str):
+        """
+        Drop the user's stored LLM responses after their data changed. Lookups
+        already miss them, in every process, since the cache version moved on;
+        this only frees the space before they expire.
+        """
+        self.llm_cache.invalidate_user(email)
+    
     def _fallback_time_suggestion(self, email: str, task_name: str, user_preferred_time: str, patterns: Dict) -> Dict:
         """Fallback time suggestion using heuristics when AI is unavailable"""
         now = datetime.now()
@@ -182,6 +627,19 @@ class AgenticReminderAgent:
             except:
                 pass
         
+        # New and sparse users start from the hours their cohort is most productive in
+        if patterns.get("cohort_best_hours"):
+            cohort_hour = patterns["cohort_best_hours"][0]
+            suggested_dt = now.replace(hour=cohort_hour, minute=0, second=0, microsecond=0)
+            if suggested_dt <= now:
+                suggested_dt += timedelta(days=1)
+            
+            return {
+                "suggested_time": suggested_dt.strftime('%Y-%m-%d %H:%M'),
+                "reasoning": f"Users with similar habits get the most done around {cohort_hour}:00",
+                "confidence": 0.6
+            }
+        
         # Use user's preferred hours if available
         if patterns.get("preferred_hours") and patterns["patterns"] == "established_user":
             # Get the most preferred hour
@@ -208,18 +666,65 @@ class AgenticReminderAgent:
             "confidence": 0.5
         }
                 
-    def make_intelligent_decisions(self, email: str, task_name: str, scheduled_time: str) -> Dict:
-        """Make autonomous decisions about task management"""
+    def plan_task(self, email: str, user_input: str) -> Dict:
+        """
+        Parse, schedule, decide and confirm in one function-calling LLM
+        call. Only the fields of the reply that match PLAN_SCHEMA are
+        returned; the caller fills in the others with the per-step heuristics.
+        """
+        patterns = self.analyze_user_patterns(email)
+        prior = self.cohort_prior(email, patterns)
+        if prior is not None:
+            patterns["cohort_best_hours"] = prior["best_hours"]
+
+        request = self.prompts.request("plan_task", user_input=user_input,
+                                       now=datetime.now().strftime('%Y-%m-%d %H:%M'),
+                                       pending=str(self._pending_task_count(email)), patterns=patterns)
+        plan = conforming(json.loads(self.prompts.complete(request).strip()), PLAN_SCHEMA)
+        # The reply's confirmation names this time; it only holds while the task stays there
+        plan["confirmation_time"] = plan.get("suggested_time")
+
+        # The user's own completion record still answers first, as in suggest_optimal_time
+        local = self.slot_model.suggest(email, plan.get("suggested_time"))
+        if local is not None and local["confidence"] >= self.slot_model.min_confidence:
+            plan["suggested_time"] = local["suggested_time"]
+            plan["reasoning"] = local["reasoning"]
+            plan["confidence"] = local["confidence"]
+
+        self.logger.info(f"Planned task for {email}: {plan}")
+        return plan
+
+    def make_intelligent_decisions(self, email: str, task_name: str, scheduled_time: str, log: bool = True) -> Dict:
+        """Make autonomous decisions about task management (log=False leaves logging to the caller)"""
         patterns = self.analyze_user_patterns(email)
+        current_task_count = self._pending_task_count(email)
+        decisions = self._base_decisions(patterns, current_task_count, scheduled_time)
+            
+        # Use AI for complex decision making
+        ai_decisions = self._get_ai_decisions(email, task_name, scheduled_time, patterns, current_task_count)
+        decisions.update(ai_decisions)
         
-        # Analyze current workload
-        conn = sqlite3.connect(self.db_path)
-        current_tasks = pd.read_sql_query('''
-            SELECT * FROM user_behavior 
-            WHERE email = ? AND scheduled_time > ? AND completion_status IS NULL
-        ''', conn, params=[email, datetime.now().strftime('%Y-%m-%d %H:%M')])
-        conn.close()
+        # Log the decision
+        if log:
+            self._log_decision(email, "task_scheduling", decisions["reasoning"], decisions)
         
+        return decisions
+    
+    def heuristic_decisions(self, email: str, task_name: str, scheduled_time: str) -> Dict:
+        """The decisions make_intelligent_decisions falls back to, without an LLM call"""
+        patterns = self.analyze_user_patterns(email)
+        current_task_count = self._pending_task_count(email)
+        decisions = self._base_decisions(patterns, current_task_count, scheduled_time)
+        decisions.update(self._fallback_decisions(email, task_name, scheduled_time, patterns, current_task_count))
+        return decisions
+    
+    def _pending_task_count(self, email: str) -> int:
+        with self.db.connection() as conn:
+            return conn.execute(
+                PENDING_TASK_COUNT_SQL, [email, datetime.now().strftime('%Y-%m-%d %H:%M')]
+            ).fetchone()[0]
+    
+    def _base_decisions(self, patterns: Dict, current_task_count: int, scheduled_time: str) -> Dict:
         decisions = {
             "should_reschedule": False,
             "priority_level": "normal",
@@ -229,7 +734,7 @@ class AgenticReminderAgent:
         }
         
         # Decision 1: Check if user is overbooked
-        if len(current_tasks) > 5:
+        if current_task_count > 5:
             decisions["should_reschedule"] = True
             decisions["reasoning"] = "User has too many pending tasks. Suggesting rescheduling."
             
@@ -242,51 +747,14 @@ class AgenticReminderAgent:
         scheduled_dt = datetime.strptime(scheduled_time, '%Y-%m-%d %H:%M')
         if scheduled_dt.hour >= 14:  # Afternoon tasks
             decisions["suggested_breaks"].append("Take a 15-minute break before this task")
-            
-        # Use AI for complex decision making
-        ai_decisions = self._get_ai_decisions(email, task_name, scheduled_time, patterns, len(current_tasks))
-        decisions.update(ai_decisions)
-        
-        # Log the decision
-        self._log_decision(email, "task_scheduling", decisions["reasoning"], str(decisions))
         
         return decisions
         
     def _get_ai_decisions(self, email: str, task_name: str, scheduled_time: str, patterns: Dict, current_task_count: int) -> Dict:
         """Get AI-powered decisions for task management"""
         try:
-            prompt = f"""
-            As an intelligent task management agent, analyze this situation and make recommendations:
-            
-            Task: {task_name}
-            Scheduled Time: {scheduled_time}
-            User Patterns: {json.dumps(patterns, indent=2)}
-            Current Pending Tasks: {current_task_count}
-            
-            Provide recommendations for:
-            1. Task priority (low/medium/high)
-            2. Whether to suggest rescheduling
-            3. Productivity tips
-            4. Break suggestions
-            5. Task optimization ideas
-            
-            Return JSON: {{
-                "priority_level": "low/medium/high",
-                "should_reschedule": true/false,
-                "productivity_tips": ["tip1", "tip2"],
-                "suggested_breaks": ["break1", "break2"],
-                "task_optimization": "suggestion"
-            }}
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=400,
-                temperature=0.4
-            )
-            
-            return json.loads(response.choices[0].message.content.strip())
+            return self._cached_completion("ai_decisions", email, task=task_name, scheduled_time=scheduled_time,
+                                           pending=str(current_task_count), patterns=patterns)
             
         except Exception as e:
             self.logger.error(f"Error getting AI decisions: {e}")
@@ -321,122 +789,148 @@ class AgenticReminderAgent:
         
         return decisions
             
-    def learn_from_outcome(self, email: str, task_name: str, outcome: str, feedback: str = None):
-        """Learn from task outcomes to improve future decisions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Update task completion status
-        cursor.execute('''
-            UPDATE user_behavior 
-            SET completion_status = ?, user_feedback = ?, completion_time = ?
-            WHERE email = ? AND task_name = ? AND completion_status IS NULL
-            ORDER BY created_at DESC LIMIT 1
-        ''', [outcome, feedback, datetime.now(), email, task_name])
-        
-        # Update user preferences based on outcome
-        if outcome == "completed":
-            # Learn successful patterns
-            self._update_user_preferences(email, "successful_completion", task_name)
-        else:
-            # Learn from failures
-            self._update_user_preferences(email, "failed_completion", task_name)
-            
-        conn.commit()
-        conn.close()
-        
-        self.logger.info(f"Learned from outcome: {email} - {task_name} - {outcome}")
-        
-    def _update_user_preferences(self, email: str, outcome_type: str, task_name: str):
-        """Update user preferences based on task outcomes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get current preferences
-        cursor.execute('SELECT * FROM user_preferences WHERE email = ?', [email])
-        result = cursor.fetchone()
-        
-        if result:
-            # Update existing preferences
-            preferences = json.loads(result[3]) if result[3] else {}
-        else:
-            # Create new preferences
-            preferences = {}
-            cursor.execute('''
-                INSERT INTO user_preferences (email, task_categories, productivity_patterns)
-                VALUES (?, ?, ?)
-            ''', [email, '{}', '{}'])
-            
-        # Update based on outcome
-        if outcome_type == "successful_completion":
-            if "successful_tasks" not in preferences:
-                preferences["successful_tasks"] = []
-            preferences["successful_tasks"].append(task_name)
-        else:
-            if "challenging_tasks" not in preferences:
-                preferences["challenging_tasks"] = []
-            preferences["challenging_tasks"].append(task_name)
-            
-        # Update database
-        cursor.execute('''
-            UPDATE user_preferences 
-            SET task_categories = ?, last_updated = ?
-            WHERE email = ?
-        ''', [json.dumps(preferences), datetime.now(), email])
-        
-        conn.commit()
-        conn.close()
-        
-    def _log_decision(self, email: str, decision_type: str, reasoning: str, action: str):
-        """Log agent decisions for transparency and learning"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO agent_decisions (email, decision_type, reasoning, action_taken)
-            VALUES (?, ?, ?, ?)
-        ''', [email, decision_type, reasoning, action])
+    def learn_from_outcome(self, email: str, task_name: str, outcome: str, feedback: str = None,
+                           task_id: int = None) -> bool:
+        """
+        Learn from task outcomes to improve future decisions. The task is
+        identified by task_id; without one, the user's newest pending task
+        with that name is used. Returns whether an outcome was recorded.
+        """
+        if task_id is None:
+            with self.db.connection() as conn:
+                row = conn.execute(PENDING_TASK_BY_NAME_SQL, [email, task_name]).fetchone()
+            if row is None:
+                self.logger.info(f"No pending task to learn from: {email} - {task_name} - {outcome}")
+                return False
+            task_id = row[0]
+        return self.record_outcomes([(email, task_id, outcome, feedback)])[0]
+    
+    def record_outcomes(self, outcomes: List[Tuple[str, int, str, Optional[str]]]) -> List[bool]:
+        """
+        Record (email, task_id, outcome, feedback) outcomes in one transaction,
+        refreshing aggregates, preference counters and caches once per user.
+        Returns, per outcome, whether it applied: unknown tasks, other users'
+        tasks and tasks that already have an outcome are skipped.
+        """
+        now = datetime.now()
+        applied = []
+        by_user = {}
+        with self.db.connection() as conn:
+            for email, task_id, outcome, feedback in outcomes:
+                row = conn.execute(RECORD_OUTCOME_SQL, [outcome, feedback, now, task_id, email]).fetchone()
+                applied.append(row is not None)
+                if row is not None:
+                    task_name, scheduled_time = row
+                    scheduled_dt = datetime.fromisoformat(scheduled_time) if scheduled_time else None
+                    by_user.setdefault(email, []).append((task_name, scheduled_dt, outcome == "completed"))
+            
+            for email, recorded in by_user.items():
+                # Keep the completed count of the pattern aggregates in step
+                completed = sum(done for _, _, done in recorded)
+                if completed:
+                    conn.execute('''
+                        UPDATE user_pattern_stats SET completed_tasks = completed_tasks + ?
+                        WHERE email = ?
+                    ''', [completed, email])
+                    conn.execute(MARK_PATTERNS_DIRTY_SQL, [email, time.time()])
+                
+                # Update user preferences based on outcome (same transaction)
+                self._update_user_preferences(conn, email, [(name, done) for name, _, done in recorded])
+            
+            self.slot_model.record(conn, [(email, when, done) for email, recorded in by_user.items()
+                                          for _, when, done in recorded if when is not None])
+            versions = self.cache_versions.bump(conn, by_user)
+        
+        # Invalidate only after the outcomes have been committed
+        for email, recorded in by_user.items():
+            self._invalidate_user_caches(email)
+            self.slot_model.observe(email, [(when, done) for _, when, done in recorded if when is not None],
+                                    versions[email])
+            self.logger.info(f"Learned from {len(recorded)} outcome(s): {email} - "
+                             f"{sum(done for _, _, done in recorded)} completed")
+        return applied
+        
+    def _update_user_preferences(self, conn: sqlite3.Connection, email: str, outcomes: List[Tuple[str, bool]]):
+        """
+        Count (task_name, completed) outcomes against each task in the user's
+        bounded sketch: constant work per distinct task, whatever the history
+        """
+        counts = {}
+        for task_name, completed in outcomes:
+            key_counts = counts.setdefault(task_name.strip().lower(), [0, 0])
+            key_counts[0 if completed else 1] += 1
+        
+        for key, (successes, failures) in counts.items():
+            bumped = conn.execute(TASK_OUTCOME_BUMP_SQL, [successes, failures, successes, failures, email, key])
+            if bumped.rowcount:
+                continue
+            tracked = conn.execute(TASK_OUTCOME_KEYS_SQL, [email]).fetchone()[0]
+            if tracked < self.task_outcome_keys:
+                conn.execute(TASK_OUTCOME_INSERT_SQL, [email, key, successes, failures, successes, failures])
+            else:
+                conn.execute(TASK_OUTCOME_REPLACE_SQL, [key, successes, failures, successes, failures, email, email])
+    
+    def task_preferences(self, email: str) -> Dict:
+        """The user's most frequent tasks, split by whether they mostly get done"""
+        with self.db.connection() as conn:
+            rows = conn.execute(TASK_OUTCOMES_SQL, [email]).fetchall()
+        tasks = [{"task": key, "outcomes": outcomes, "error": error, "successes": successes, "failures": failures}
+                 for key, outcomes, error, successes, failures in rows]
+        return {
+            "successful_tasks": [t for t in tasks if t["successes"] >= t["failures"]],
+            "challenging_tasks": [t for t in tasks if t["successes"] < t["failures"]],
+        }
         
-        conn.commit()
-        conn.close()
+    def _log_decision(self, email: str, decision_type: str, reasoning: str, action):
+        """Log agent decisions for transparency and learning; the action is stored as JSON"""
+        self.decision_log.log(email, decision_type, reasoning, action)
         
     def get_productivity_insights(self, email: str) -> Dict:
         """Provide intelligent insights about user's productivity patterns"""
         patterns = self.analyze_user_patterns(email)
         
         try:
-            prompt = f"""
-            Based on this user's productivity data, provide actionable insights:
-            
-            User Patterns: {json.dumps(patterns, indent=2)}
-            
-            Provide insights about:
-            1. Best working hours
-            2. Task completion patterns
-            3. Areas for improvement
-            4. Personalized recommendations
-            
-            Return JSON: {{
-                "best_hours": "analysis",
-                "completion_patterns": "analysis", 
-                "improvement_areas": ["area1", "area2"],
-                "recommendations": ["rec1", "rec2"],
-                "productivity_score": 0.0-1.0
-            }}
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.3
-            )
-            
-            return json.loads(response.choices[0].message.content.strip())
+            return self._cached_completion("productivity_insights", email, patterns=patterns)
             
         except Exception as e:
             self.logger.error(f"Error getting productivity insights: {e}")
-            return self._fallback_productivity_insights(patterns)
+            return self._heuristic_insights(email, patterns)
+    
+    def stream_productivity_insights(self, email: str) -> Iterator[Tuple[str, object]]:
+        """
+        Yield (event, data) while insights are produced: a cached answer at
+        once, otherwise heuristic "preliminary" insights, then each streamed
+        "token" and finally the parsed "insights".
+        """
+        patterns = self.analyze_user_patterns(email)
+        request, key = self._completion_request("productivity_insights", email, patterns=patterns)
+        
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            yield "insights", cached
+            return
+        
+        fallback = self._heuristic_insights(email, patterns)
+        yield "preliminary", fallback
+        
+        try:
+            parts = []
+            for delta in self.prompts.stream(request):
+                parts.append(delta)
+                yield "token", delta
+            result = json.loads("".join(parts).strip())
+            self.llm_cache.set(key, "productivity_insights", email, result)
+        except Exception as e:
+            self.logger.error(f"Error streaming productivity insights: {e}")
+            result = fallback
+        yield "insights", result
+    
+    def _heuristic_insights(self, email: str, patterns: Dict) -> Dict:
+        """Precomputed heuristic insights when fresh, otherwise computed from the patterns"""
+        precomputed = self._precomputed(email)
+        if precomputed is not None:
+            return precomputed["insights"]
+        return self._fallback_productivity_insights(patterns)
     
     def _fallback_productivity_insights(self, patterns: Dict) -> Dict:
         """Fallback productivity insights using heuristics"""
@@ -478,30 +972,8 @@ class AgenticReminderAgent:
         patterns = self.analyze_user_patterns(email)
         
         try:
-            prompt = f"""
-            Suggest intelligent modifications for this task to improve success rate:
-            
-            Task: {task_name}
-            Scheduled Time: {scheduled_time}
-            User Patterns: {json.dumps(patterns, indent=2)}
-            
-            Consider:
-            1. Breaking down complex tasks
-            2. Optimal timing adjustments
-            3. Preparation suggestions
-            4. Related task grouping
-            
-            Return JSON array of suggestions: ["suggestion1", "suggestion2", "suggestion3"]
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.4
-            )
-            
-            return json.loads(response.choices[0].message.content.strip())
+            return self._cached_completion("task_modifications", email, task=task_name,
+                                           scheduled_time=scheduled_time, patterns=patterns)
             
         except Exception as e:
             self.logger.error(f"Error suggesting task modifications: {e}")
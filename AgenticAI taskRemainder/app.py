@@ -1,13 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context
 from apscheduler.schedulers.background import BackgroundScheduler
 import yagmail
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import json
-from openai import OpenAI
-from agentic_ai_agent import AgenticReminderAgent
-import sqlite3
-import re
+from agentic_ai_agent import AgenticReminderAgent, RECENT_TASKS_SQL
+from pipeline import TaskCreationFlow, TaskInputError, default_confirmation
+from dispatch import SMTPPool, ReminderDispatcher
+from poller import ReminderPoller
+from pregen import ContentPregenerator
+from ingest import BulkTaskIngest, read_rows
+from retention import Retention
+from jobs import TaskJobs, QueueFull, UserLimitReached
+from leader import LeaderLease
+import nl_time
+import atexit
+import threading
 
 app = Flask(__name__)
 app.secret_key = 'secret_key'
@@ -19,187 +27,210 @@ GMAIL_APP_PASSWORD = os.environ.get('GMAIL_APP_PASSWORD','app_password')
 # Configure OpenAI API
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', 'your_key')
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 # Initialize agentic AI agent
-agentic_agent = AgenticReminderAgent(OPENAI_API_KEY)
+DB_PATH = os.environ.get('AGENTIC_DB_PATH', 'agentic_reminders.db')
+agentic_agent = AgenticReminderAgent(OPENAI_API_KEY, DB_PATH)
+
+# All OpenAI calls share the agent's gateway (timeouts, latency budget, circuit breaker)
+# and its compiled prompts (token accounting per call site)
+llm_gateway = agentic_agent.llm
+prompts = agentic_agent.prompts
+LLM_REQUEST_BUDGET = float(os.environ.get('LLM_REQUEST_BUDGET', 15))
+
+# "sequential" or "concurrent" execution of the task-creation steps, or
+# "planned": one structured LLM call for the whole task
+TASK_PIPELINE_MODE = os.environ.get('TASK_PIPELINE_MODE', 'sequential')
+
+# Set LEADER_ELECTION=1 when running several worker processes: every process
+# serves HTTP, one elected process dispatches reminders and runs the background
+# jobs. Reminders then have to be queued in the database, not in memory.
+LEADER_ELECTION = os.environ.get('LEADER_ELECTION', '0') == '1'
+
+# "apscheduler" (one in-memory job per task) or "poller" (user_behavior is the queue)
+REMINDER_SCHEDULER = os.environ.get('REMINDER_SCHEDULER', 'poller' if LEADER_ELECTION else 'apscheduler')
+if LEADER_ELECTION and REMINDER_SCHEDULER != 'poller':
+    raise ValueError("LEADER_ELECTION=1 needs REMINDER_SCHEDULER=poller: in-memory reminder jobs are per process")
+
+leader = LeaderLease(
+    agentic_agent.db,
+    'reminder_dispatch',
+    ttl=float(os.environ.get('LEADER_LEASE_TTL', 15)),
+    renew_interval=float(os.environ.get('LEADER_RENEW_INTERVAL', 5))
+) if LEADER_ELECTION else None
+if leader is not None:
+    leader.start()
+
+def leader_only(job):
+    """A background job that runs only in the elected process (always, without leader election)"""
+    return leader.only_when_leader(job) if leader is not None else job
 
 # Initialize email and scheduler
-yag = yagmail.SMTP(GMAIL_USER, GMAIL_APP_PASSWORD)
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 4))
+smtp_pool = SMTPPool(lambda: yagmail.SMTP(GMAIL_USER, GMAIL_APP_PASSWORD), size=SMTP_POOL_SIZE)
 scheduler = BackgroundScheduler()
 scheduler.start()
 
-def send_intelligent_reminder(email, task_name, task_id):
-    """Send intelligent email reminder with AI-generated content"""
+# Recompute every active user's patterns and heuristic insights in the background
+scheduler.add_job(
+    leader_only(agentic_agent.precompute_patterns),
+    'interval',
+    seconds=float(os.environ.get('PATTERN_PRECOMPUTE_INTERVAL', 3600)),
+    kwargs={'active_days': int(os.environ.get('PATTERN_ACTIVE_DAYS', 30))},
+    id='precompute_patterns',
+    next_run_time=datetime.now(),
+    max_instances=1,
+    coalesce=True
+)
+
+# Archive old tasks and decisions into rollups and archive files, then reclaim space
+retention = Retention(
+    agentic_agent.db,
+    archive_dir=os.environ.get('RETENTION_ARCHIVE_DIR', 'archive'),
+    task_days=float(os.environ.get('RETENTION_TASK_DAYS', 365)),
+    decision_days=float(os.environ.get('RETENTION_DECISION_DAYS', 90)),
+    batch_size=int(os.environ.get('RETENTION_BATCH', 1000))
+)
+scheduler.add_job(
+    leader_only(retention.run),
+    'interval',
+    seconds=float(os.environ.get('RETENTION_INTERVAL', 86400)),
+    id='retention',
+    max_instances=1,
+    coalesce=True
+)
+
+# Release pooled database connections on interpreter exit
+atexit.register(agentic_agent.db.close)
+if leader is not None:
+    # Handed over before the pool closes, after the workers below have stopped
+    atexit.register(leader.stop)
+atexit.register(smtp_pool.close)
+
+# Decisions are written behind the request; flushed on exit before the pool closes
+agentic_agent.decision_log.start()
+atexit.register(agentic_agent.decision_log.stop)
+
+def send_intelligent_reminder(email, task_name, task_id, scheduled_time=None):
+    """Hand a due reminder to the dispatcher, which batches and sends it"""
+    reminder_dispatcher.submit(email, task_name, task_id, scheduled_time)
+
+def generate_reminder_content(email, task_names):
+    """Generate personalized reminder content with AI (a digest when several tasks are due)"""
+    content = personalized_reminder_content(email, task_names)
+    if content is None:
+        # Fallback to simple reminder
+        return default_reminder_subject(task_names), default_reminder_body(task_names)
+    return content
+
+def personalized_reminder_content(email, task_names):
+    """AI-written subject and body, or None when the AI is unavailable"""
     try:
         # Get user patterns for personalized messaging
         patterns = agentic_agent.analyze_user_patterns(email)
         
-        # Generate personalized reminder content using AI
-        prompt = f"""
-        Generate a personalized email reminder for this task:
-        
-        Task: {task_name}
-        User Email: {email}
-        User Patterns: {json.dumps(patterns, indent=2)}
-        
-        Create a friendly, motivating reminder that:
-        1. Acknowledges the user's productivity patterns
-        2. Provides context about why this time was chosen
-        3. Includes a productivity tip based on their history
-        4. Encourages completion
-        
-        Return JSON: {{"subject": "subject line", "body": "email body"}}
-        """
-        
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=400,
-            temperature=0.7
-        )
-        
-        ai_content = json.loads(response.choices[0].message.content.strip())
-        subject = ai_content.get("subject", f"Task Reminder: {task_name}")
-        body = ai_content.get("body", f"This is a reminder for your task: {task_name}")
-        
-        # Send the email
-        yag.send(email, subject, body)
-        
-        # Log the reminder sent
-        agentic_agent._log_decision(email, "reminder_sent", f"Sent reminder for {task_name}", f"Subject: {subject}")
+        if len(task_names) == 1:
+            # Generate personalized reminder content using AI
+            request = prompts.request("reminder", task=task_names[0], email=email, patterns=patterns)
+        else:
+            request = prompts.request("reminder_digest", items=len(task_names), tasks=task_names, email=email,
+                                      patterns=patterns)
         
-        print(f"Intelligent reminder sent to {email} for task: {task_name}")
+        ai_content = json.loads(prompts.complete(request).strip())
+        subject = ai_content.get("subject", default_reminder_subject(task_names))
+        body = ai_content.get("body", default_reminder_body(task_names))
+        return subject, body
         
     except Exception as e:
-        print(f"Failed to send intelligent email: {e}")
-        # Fallback to simple reminder
-        try:
-            yag.send(email, f"Task Reminder: {task_name}", f"This is a reminder for your task: {task_name}")
-        except Exception as fallback_error:
-            print(f"Fallback email also failed: {fallback_error}")
+        print(f"Failed to generate intelligent email: {e}")
+        return None
 
-def parse_natural_language_with_agent(user_input, email):
-    """Use agentic AI to parse natural language and make intelligent decisions"""
-    try:
-        prompt = f"""
-        As an intelligent task scheduling agent, extract task details and make scheduling decisions:
-        
-        User Input: "{user_input}"
-        User Email: {email}
-        Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-        
-        Analyze the input and provide:
-        1. Task name
-        2. Suggested optimal time (consider user patterns)
-        3. Priority level
-        4. Any special considerations
-        
-        Return JSON: {{
-            "task": "task_name",
-            "suggested_time": "YYYY-MM-DD HH:MM",
-            "priority": "low/medium/high",
-            "reasoning": "explanation",
-            "confidence": 0.0-1.0
-        }}
-        """
-        
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300,
-            temperature=0.3
-        )
-        
-        result = json.loads(response.choices[0].message.content.strip())
-        
-        # Use agentic AI to suggest optimal time based on user patterns
-        ai_suggestion = agentic_agent.suggest_optimal_time(email, result["task"], result["suggested_time"])
-        
-        # Combine AI parsing with agentic suggestions
-        final_result = {
-            "task": result["task"],
-            "suggested_time": ai_suggestion["suggested_time"],
-            "priority": result["priority"],
-            "reasoning": f"{result['reasoning']} + {ai_suggestion['reasoning']}",
-            "confidence": (result["confidence"] + ai_suggestion["confidence"]) / 2
-        }
-        
-        return final_result, None
-        
-    except Exception as e:
-        # Fallback to simple parsing when AI is unavailable
-        return parse_natural_language_fallback(user_input, email), None
+def default_reminder_subject(task_names):
+    if len(task_names) == 1:
+        return f"Task Reminder: {task_names[0]}"
+    return f"Task Reminder: {len(task_names)} tasks due"
 
-def parse_natural_language_fallback(user_input, email):
-    """Simple fallback parsing when AI is unavailable"""
-    # Simple keyword-based parsing
-    user_input_lower = user_input.lower()
-    
-    # Extract common time keywords
-    time_keywords = {
-        'today': 0,
-        'tomorrow': 1,
-        'morning': 9,
-        'afternoon': 14,
-        'evening': 18,
-        'night': 20
-    }
-    
-    # Default to tomorrow at 9 AM
-    days_ahead = 1
-    hour = 9
-    minute = 0
-    
-    # Check for specific time patterns like "12pm", "3:30pm", etc.
-    time_pattern = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)'
-    time_match = re.search(time_pattern, user_input_lower)
-    
-    if time_match:
-        hour = int(time_match.group(1))
-        if time_match.group(3) == 'pm' and hour != 12:
-            hour += 12
-        elif time_match.group(3) == 'am' and hour == 12:
-            hour = 0
-        if time_match.group(2):
-            minute = int(time_match.group(2))
-    
-    # Check for day keywords
-    for keyword, value in time_keywords.items():
-        if keyword in user_input_lower:
-            if keyword in ['today', 'tomorrow']:
-                days_ahead = value
-            elif hour == 9:  # Only use default hour if no specific time was found
-                hour = value
-    
-    # Calculate suggested time
-    suggested_time = datetime.now() + timedelta(days=days_ahead)
-    suggested_time = suggested_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    
-    # If the suggested time is in the past, move to next day
-    if suggested_time <= datetime.now():
-        suggested_time += timedelta(days=1)
-    
-    # Extract task name (remove time-related words)
-    task_words = []
-    for word in user_input.split():
-        word_lower = word.lower()
-        if (word_lower not in time_keywords and 
-            not re.match(time_pattern, word_lower) and
-            word_lower not in ['at', 'on', 'by', 'for', 'to']):
-            task_words.append(word)
-    
-    task_name = ' '.join(task_words) if task_words else "Task"
-    
+def default_reminder_body(task_names):
+    if len(task_names) == 1:
+        return f"This is a reminder for your task: {task_names[0]}"
+    return "This is a reminder for your tasks:\n" + "\n".join(f"- {name}" for name in task_names)
+
+def log_reminder_sent(reminder, subject):
+    """Log the reminder sent"""
+    reminder_poller.mark_sent(reminder.task_id)
+    reminder_pregen.discard(reminder.task_id)
+    agentic_agent._log_decision(reminder.email, "reminder_sent", f"Sent reminder for {reminder.task_name}", {"subject": subject})
+    print(f"Intelligent reminder sent to {reminder.email} for task: {reminder.task_name}")
+
+def log_reminder_failed(reminder):
+    reminder_poller.mark_failed(reminder.task_id)
+
+def start_reminder_send(reminders):
+    """Record the send before SMTP; only reminders this process still holds a claim on go out"""
+    sending = reminder_poller.mark_sending([reminder.task_id for reminder in reminders])
+    return [reminder for reminder in reminders if reminder.task_id in sending]
+
+# Reminder content is generated ahead of time so sending is a database read plus SMTP;
+# the generic fallback is not stored, so the next pass retries once the AI is back
+reminder_pregen = ContentPregenerator(
+    agentic_agent.db,
+    agentic_agent.analyze_user_patterns,
+    personalized_reminder_content,
+    lead_time=float(os.environ.get('REMINDER_PREGEN_LEAD', 900)),
+    interval=float(os.environ.get('REMINDER_PREGEN_INTERVAL', 60)),
+    active=leader.is_leader if leader is not None else None
+)
+reminder_pregen.start()
+atexit.register(reminder_pregen.stop)
+
+# Reminders due within the same window are sent together through the SMTP pool
+reminder_dispatcher = ReminderDispatcher(
+    smtp_pool,
+    generate_content=generate_reminder_content,
+    on_sent=log_reminder_sent,
+    on_failed=log_reminder_failed,
+    pregenerated=reminder_pregen.lookup,
+    # APScheduler jobs hand reminders over without a claim
+    before_send=start_reminder_send if REMINDER_SCHEDULER == 'poller' else None,
+    window=float(os.environ.get('REMINDER_BATCH_WINDOW', 2)),
+    digest=os.environ.get('REMINDER_DIGEST', '0') == '1',
+    workers=int(os.environ.get('REMINDER_WORKERS', 8))
+)
+reminder_dispatcher.start()
+atexit.register(reminder_dispatcher.stop)
+
+# Polls user_behavior for due reminders; also records delivery state in both modes
+reminder_poller = ReminderPoller(
+    agentic_agent.db,
+    reminder_dispatcher,
+    interval=float(os.environ.get('REMINDER_POLL_INTERVAL', 5)),
+    batch_size=int(os.environ.get('REMINDER_POLL_BATCH', 200)),
+    max_per_second=float(os.environ.get('REMINDER_MAX_PER_SECOND', 50)),
+    catchup_horizon=float(os.environ.get('REMINDER_CATCHUP_HOURS', 6)) * 3600,
+    active=leader.is_leader if leader is not None else None
+)
+if REMINDER_SCHEDULER == 'poller':
+    reminder_poller.start()
+    atexit.register(reminder_poller.stop)
+
+def parse_with_llm(user_input, email):
+    """Ask the LLM to extract task details from natural language"""
+    request = prompts.request("parse_task", user_input=user_input, now=datetime.now().strftime('%Y-%m-%d %H:%M'))
+    return json.loads(prompts.complete(request).strip())
+
+def merge_time_suggestion(result, ai_suggestion):
+    """Combine AI parsing with agentic suggestions"""
     return {
-        "task": task_name,
-        "suggested_time": suggested_time.strftime('%Y-%m-%d %H:%M'),
-        "priority": "normal",
-        "reasoning": f"Parsed '{user_input}' - scheduled for {suggested_time.strftime('%Y-%m-%d %H:%M')}",
-        "confidence": 0.5
+        "task": result["task"],
+        "suggested_time": ai_suggestion["suggested_time"],
+        "priority": result["priority"],
+        "reasoning": f"{result['reasoning']} + {ai_suggestion['reasoning']}",
+        "confidence": (result["confidence"] + ai_suggestion["confidence"]) / 2
     }
 
+def parse_natural_language_fallback(user_input, email):
+    """Simple fallback parsing when AI is unavailable"""
+    return nl_time.parse(user_input)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
@@ -208,82 +239,23 @@ def index():
         # Check if user provided natural language input
         natural_input = request.form.get('natural_input', '').strip()
         
-        if natural_input:
-            # Use agentic AI to parse and make decisions
-            result, error = parse_natural_language_with_agent(natural_input, email)
-            if error:
-                flash(f"AI couldn't understand your request: {error}", 'danger')
-                return redirect(url_for('index'))
-            
-            task_name = result["task"]
-            reminder_time = result["suggested_time"]
-            priority = result["priority"]
-            reasoning = result["reasoning"]
-            
-        else:
-            # Use manual form inputs
-            task_name = request.form['task_name']
-            reminder_time = request.form['reminder_time']
-            priority = "normal"
-            reasoning = "Manual input"
-        
-        # Validate inputs
-        if not task_name or not reminder_time:
-            flash('Please provide both task name and reminder time.', 'danger')
-            return redirect(url_for('index'))
-        
         try:
-            # Parse the reminder time - handle different formats
-            try:
-                reminder_dt = datetime.strptime(reminder_time, '%Y-%m-%d %H:%M')
-            except ValueError:
-                # Try alternative formats
-                try:
-                    reminder_dt = datetime.strptime(reminder_time, '%Y-%m-%dT%H:%M')
-                except ValueError:
-                    try:
-                        reminder_dt = datetime.strptime(reminder_time, '%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        flash('Invalid date/time format. Please use YYYY-MM-DD HH:MM format.', 'danger')
-                        return redirect(url_for('index'))
-            
-            # Check if time is in the future
-            if reminder_dt <= datetime.now():
-                flash(f'Reminder time ({reminder_dt.strftime("%Y-%m-%d %H:%M")}) must be in the future. Current time is {datetime.now().strftime("%Y-%m-%d %H:%M")}.', 'danger')
-                return redirect(url_for('index'))
-            
-            # Use agentic AI to make intelligent decisions
-            decisions = agentic_agent.make_intelligent_decisions(email, task_name, reminder_time)
-            
-            # Store task in database for learning
-            conn = sqlite3.connect(agentic_agent.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO user_behavior (email, task_name, scheduled_time)
-                VALUES (?, ?, ?)
-            ''', [email, task_name, reminder_dt])
-            task_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            # Schedule the intelligent reminder
-            scheduler.add_job(
-                send_intelligent_reminder, 
-                'date', 
-                run_date=reminder_dt, 
-                args=[email, task_name, task_id],
-                id=f"reminder_{task_id}"
-            )
+            if natural_input:
+                # Use agentic AI to parse and make decisions
+                result = create_task(email, natural_input=natural_input)
+            else:
+                # Use manual form inputs
+                result = create_task(email, task_name=request.form['task_name'],
+                                     reminder_time=request.form['reminder_time'])
             
-            # Generate AI confirmation with agentic insights
-            confirmation_message = generate_agentic_confirmation(email, task_name, reminder_time, decisions)
-            flash(confirmation_message, 'success')
+            # Show the AI confirmation with agentic insights
+            flash(result["confirmation"], 'success')
             
             # Store session data for dashboard
             session['user_email'] = email
             
-        except ValueError:
-            flash('Invalid date/time format. Please use YYYY-MM-DD HH:MM format.', 'danger')
+        except TaskInputError as e:
+            flash(str(e), 'danger')
         except Exception as e:
             flash(f'Error scheduling reminder: {e}', 'danger')
         
@@ -291,35 +263,156 @@ def index():
     
     return render_template('index.html')
 
+def schedule_reminder(email, task_name, reminder_dt):
+    """Store the task for learning and schedule its intelligent reminder"""
+    task_id = agentic_agent.record_task(email, task_name, reminder_dt)
+    
+    # In poller mode the stored row is the schedule
+    if REMINDER_SCHEDULER == 'apscheduler':
+        scheduler.add_job(
+            send_intelligent_reminder, 
+            'date', 
+            run_date=reminder_dt, 
+            args=[email, task_name, task_id, reminder_dt],
+            id=f"reminder_{task_id}"
+        )
+    
+    return task_id
+
+# Batches being added while the scheduler is paused; concurrent uploads share
+# one pause, which only the last batch to finish lifts
+scheduler_pause_lock = threading.Lock()
+scheduler_pauses = 0
+
+def pause_scheduler():
+    global scheduler_pauses
+    with scheduler_pause_lock:
+        if scheduler_pauses == 0:
+            scheduler.pause()
+        scheduler_pauses += 1
+
+def resume_scheduler():
+    global scheduler_pauses
+    with scheduler_pause_lock:
+        scheduler_pauses -= 1
+        if scheduler_pauses == 0:
+            scheduler.resume()
+
+def schedule_reminders(reminders):
+    """Register reminders for tasks that are already stored, given as (email, task_name, reminder_dt, task_id)"""
+    if REMINDER_SCHEDULER != 'apscheduler':
+        return
+    # While paused the scheduler does not wake up once per added job
+    pause_scheduler()
+    try:
+        for email, task_name, reminder_dt, task_id in reminders:
+            scheduler.add_job(
+                send_intelligent_reminder,
+                'date',
+                run_date=reminder_dt,
+                args=[email, task_name, task_id, reminder_dt],
+                id=f"reminder_{task_id}"
+            )
+    finally:
+        resume_scheduler()
+
+bulk_ingest = BulkTaskIngest(
+    agentic_agent,
+    schedule_reminders,
+    chunk_size=int(os.environ.get('BULK_CHUNK_SIZE', 1000))
+)
+
 def generate_agentic_confirmation(email, task_name, reminder_time, decisions):
     """Generate intelligent confirmation message with agentic insights"""
-    prompt = f"""
-    Generate a friendly, intelligent confirmation message for a task reminder:
+    request = prompts.request("confirmation", task=task_name, time=str(reminder_time), decisions=decisions)
+    
+    try:
+        return prompts.complete(request).strip()
+    except:
+        return default_confirmation(task_name, reminder_time)
+
+# Task creation steps shared by the form handler
+task_flow = TaskCreationFlow(
+    agentic_agent,
+    parse_llm=parse_with_llm,
+    parse_fallback=parse_natural_language_fallback,
+    merge_suggestion=merge_time_suggestion,
+    confirm=generate_agentic_confirmation,
+    schedule=schedule_reminder,
+    mode=TASK_PIPELINE_MODE
+)
+
+def create_task(email, natural_input='', task_name=None, reminder_time=None):
+    """Run the task-creation steps for one request within the request's LLM latency budget"""
+    with llm_gateway.latency_budget(LLM_REQUEST_BUDGET):
+        return task_flow.run(email, natural_input=natural_input, task_name=task_name, reminder_time=reminder_time)
+
+def run_task_job(email, **task_request):
+    """A task API job; errors read as they do for the form"""
+    try:
+        return create_task(email, **task_request)
+    except TaskInputError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f'Error scheduling reminder: {e}') from e
+
+# Background workers for the task API: the request returns a job id at once.
+# Jobs are stored in the database, so a poll can land on any worker process
+task_jobs = TaskJobs(
+    agentic_agent.db,
+    run_task_job,
+    workers=int(os.environ.get('TASK_JOB_WORKERS', 4)),
+    max_queue=int(os.environ.get('TASK_JOB_QUEUE', 1000)),
+    per_user=int(os.environ.get('TASK_JOB_PER_USER', 3)),
+    result_ttl=float(os.environ.get('TASK_JOB_RESULT_TTL', 600)),
+    job_timeout=float(os.environ.get('TASK_JOB_TIMEOUT', 600))
+)
+task_jobs.start()
+atexit.register(task_jobs.stop)
+TASK_JOB_MAX_WAIT = float(os.environ.get('TASK_JOB_MAX_WAIT', 25))
+
+@app.route('/api/tasks', methods=['POST'])
+def create_task_job():
+    """Accept a task request and return 202 with a job to poll for the result"""
+    data = request.get_json(silent=True) or request.form
+    email = (data.get('email') or '').strip()
+    natural_input = (data.get('natural_input') or '').strip()
+    task_name = (data.get('task_name') or '').strip()
+    reminder_time = (data.get('reminder_time') or '').strip()
     
-    Task: {task_name}
-    Time: {reminder_time}
-    Email: {email}
-    Agent Decisions: {json.dumps(decisions, indent=2)}
+    if not email:
+        return jsonify({"status": "error", "message": "Email is required"}), 400
+    if not natural_input and not (task_name and reminder_time):
+        return jsonify({"status": "error", "message": "Please provide both task name and reminder time."}), 400
     
-    Include:
-    1. Confirmation of the scheduled reminder
-    2. Any intelligent suggestions from the agent
-    3. Productivity tips if applicable
-    4. Encouragement based on user patterns
+    try:
+        if natural_input:
+            job = task_jobs.submit(email, natural_input=natural_input)
+        else:
+            job = task_jobs.submit(email, task_name=task_name, reminder_time=reminder_time)
+    except UserLimitReached as e:
+        return jsonify({"status": "error", "message": str(e)}), 429, {"Retry-After": "2"}
+    except QueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 503, {"Retry-After": "5"}
     
-    Keep it conversational and helpful.
-    """
+    # Store session data for dashboard
+    session['user_email'] = email
     
+    job["status_url"] = url_for('task_job', job_id=job["job_id"])
+    return jsonify(job), 202, {"Location": job["status_url"]}
+
+@app.route('/api/tasks/<job_id>')
+def task_job(job_id):
+    """A task job's status and result; ?wait=seconds long-polls until it finishes"""
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
-    except:
-        return f"✅ Intelligent reminder set! I'll remind you about '{task_name}' at {reminder_time}"
+        wait = min(max(float(request.args.get('wait', 0)), 0), TASK_JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({"status": "error", "message": "wait must be a number of seconds"}), 400
+    
+    job = task_jobs.wait(job_id, wait) if wait else task_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown or expired job"}), 404
+    return jsonify(job)
 
 @app.route('/dashboard')
 def dashboard():
@@ -330,25 +423,40 @@ def dashboard():
         return redirect(url_for('index'))
     
     # Get user's task history
-    conn = sqlite3.connect(agentic_agent.db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT task_name, scheduled_time, completion_status, created_at
-        FROM user_behavior 
-        WHERE email = ? 
-        ORDER BY created_at DESC
-        LIMIT 10
-    ''', [email])
-    tasks = cursor.fetchall()
-    conn.close()
-    
-    # Get agentic insights
-    insights = agentic_agent.get_productivity_insights(email)
+    with agentic_agent.db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(RECENT_TASKS_SQL, [email])
+        tasks = cursor.fetchall()
     
+    # Insights arrive separately over /dashboard/insights so the page never waits on the LLM
     return render_template('dashboard.html', 
                          email=email, 
-                         tasks=tasks, 
-                         insights=insights)
+                         tasks=tasks)
+
+@app.route('/dashboard/insights')
+def dashboard_insights():
+    """Stream the dashboard's agentic insights as server-sent events"""
+    email = session.get('user_email')
+    if not email:
+        return jsonify({"error": "No user session"}), 401
+    
+    def generate():
+        with llm_gateway.latency_budget(LLM_REQUEST_BUDGET):
+            for event, data in agentic_agent.stream_productivity_insights(email):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def outcome_task_id(value):
+    """A task id from a JSON body, or None when it is missing or not an integer"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 @app.route('/complete_task', methods=['POST'])
 def complete_task():
@@ -356,14 +464,41 @@ def complete_task():
     data = request.get_json()
     email = data.get('email')
     task_name = data.get('task_name')
+    task_id = outcome_task_id(data.get('task_id'))
     outcome = data.get('outcome', 'completed')
     feedback = data.get('feedback', '')
     
-    # Let the agentic AI learn from the outcome
-    agentic_agent.learn_from_outcome(email, task_name, outcome, feedback)
+    # Let the agentic AI learn from the outcome (by task id; the name is for older clients)
+    if not agentic_agent.learn_from_outcome(email, task_name, outcome, feedback, task_id=task_id):
+        return jsonify({"status": "error", "message": "No pending task found"}), 404
     
     return jsonify({"status": "success", "message": "Task outcome recorded"})
 
+@app.route('/complete_tasks', methods=['POST'])
+def complete_tasks():
+    """Record many task outcomes in one transaction: {"email", "outcomes": [{"task_id", "outcome", "feedback"}]}"""
+    data = request.get_json() or {}
+    email = data.get('email')
+    items = data.get('outcomes')
+    if not isinstance(items, list):
+        return jsonify({"status": "error", "message": "outcomes must be a list"}), 400
+    
+    outcomes = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        outcomes.append((item.get('email', email), outcome_task_id(item.get('task_id')),
+                         item.get('outcome', 'completed'), item.get('feedback', '')))
+    valid = [outcome for outcome in outcomes if outcome[0] and outcome[1] is not None]
+    applied = iter(agentic_agent.record_outcomes(valid))
+    
+    results = [{"task_id": task_id, "recorded": next(applied) if task_email and task_id is not None else False}
+               for task_email, task_id, _, _ in outcomes]
+    return jsonify({
+        "status": "success",
+        "recorded": sum(result["recorded"] for result in results),
+        "results": results
+    })
+
 @app.route('/get_suggestions', methods=['POST'])
 def get_suggestions():
     """Get intelligent task suggestions from the agent"""
@@ -393,5 +528,36 @@ def reschedule_task():
         "confidence": suggestion["confidence"]
     })
 
+@app.route('/bulk_tasks', methods=['POST'])
+def bulk_tasks():
+    """Create tasks from a JSON-lines or CSV upload, streaming back one JSON result per row"""
+    rows = read_rows(request.stream, request.content_type)
+
+    def generate():
+        for result in bulk_ingest.run(rows):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/agent_stats')
+def agent_stats():
+    """Expose the agent's internal counters for monitoring"""
+    return jsonify({
+        "pattern_cache": agentic_agent.pattern_cache.stats(),
+        "llm_cache": agentic_agent.llm_cache.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "prompts": prompts.stats(),
+        "task_flow": task_flow.stats(),
+        "task_jobs": task_jobs.stats(),
+        "reminder_dispatch": reminder_dispatcher.stats(),
+        "reminder_poller": reminder_poller.stats(),
+        "reminder_pregen": reminder_pregen.stats(),
+        "cohorts": agentic_agent.cohorts.stats() if agentic_agent.cohorts is not None else None,
+        "slot_model": agentic_agent.slot_model.stats(),
+        "decision_log": agentic_agent.decision_log.stats(),
+        "retention": retention.stats(),
+        "leader": leader.stats() if leader is not None else None
+    })
+
 if __name__ == '__main__':
     app.run(debug=True) 
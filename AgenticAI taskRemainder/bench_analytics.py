@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Multi-user pattern analytics: one analyze_user_patterns call per user
+against the vectorized analyze_many / analyze_all.
+Usage: python bench_analytics.py [users] [tasks_per_user]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agentic_ai_agent import AgenticReminderAgent
+
+
+def populate(agent, users, tasks_per_user, chunk=50000):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 6)
+    tasks = []
+    for u in range(users):
+        favourite = rng.randrange(24)
+        for t in range(rng.randint(1, 2 * tasks_per_user - 1)):
+            hour = favourite if rng.random() < 0.6 else rng.randrange(24)
+            tasks.append((f"user{u}@example.com", f"task {t}", start + timedelta(days=rng.randrange(90), hours=hour)))
+            if len(tasks) >= chunk:
+                agent.record_tasks(tasks)
+                tasks = []
+    if tasks:
+        agent.record_tasks(tasks)
+
+    # Mark roughly half the tasks completed, keeping the per-user aggregates in step
+    with agent.db.connection() as conn:
+        conn.execute("UPDATE user_behavior SET completion_status = 'completed' WHERE id % 2 = 0")
+        conn.execute('''
+            UPDATE user_pattern_stats SET completed_tasks = (
+                SELECT COUNT(*) FROM user_behavior
+                WHERE user_behavior.email = user_pattern_stats.email AND completion_status = 'completed')
+        ''')
+    return rng
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tasks_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    # Keep agent logging out of the timings and the log file
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("bench-key", os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        rng = populate(agent, users, tasks_per_user)
+        with agent.db.connection() as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM user_behavior").fetchone()[0]
+        print(f"{users} users, {rows} tasks (populated in {time.perf_counter() - start:.1f}s)")
+
+        # The per-user path on a sample, extrapolated; caches are bypassed
+        sample = [f"user{u}@example.com" for u in rng.sample(range(users), min(users, 5000))]
+        start = time.perf_counter()
+        singles = {email: agent._compute_user_patterns(email) for email in sample}
+        per_user = (time.perf_counter() - start) / len(sample)
+
+        start = time.perf_counter()
+        many = agent.analyze_many(sample)
+        many_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        everyone = agent.analyze_all()
+        all_elapsed = time.perf_counter() - start
+
+        mismatches = sum(
+            1 for email in sample
+            for result in (many[email], everyone[email])
+            if any(result[k] != singles[email][k] for k in singles[email] if k != "productivity_score")
+            or not (result["productivity_score"] == singles[email]["productivity_score"]
+                    or np.isnan(singles[email]["productivity_score"])))
+
+        print(f"{'method':<34}{'total s':>10}{'us/user':>10}")
+        print(f"{'analyze_user_patterns (est.)':<34}{per_user * users:>10.2f}{per_user * 1e6:>10.1f}")
+        print(f"{f'analyze_many ({len(sample)} users)':<34}{many_elapsed:>10.2f}"
+              f"{many_elapsed / len(sample) * 1e6:>10.1f}")
+        print(f"{'analyze_all':<34}{all_elapsed:>10.2f}{all_elapsed / users * 1e6:>10.1f}")
+        print(f"speedup {per_user * users / all_elapsed:.1f}x, "
+              f"{mismatches} mismatches on {len(sample)} sampled users")
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    main()
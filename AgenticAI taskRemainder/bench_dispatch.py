@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Reminder delivery throughput against a local SMTP stand-in.
+
+Compares the original delivery (one scheduler job per reminder, a new SMTP
+login per message) with the coalescing dispatcher and its connection pool.
+Usage: python bench_dispatch.py [reminders] [users] [content_latency_seconds]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yagmail
+
+from dispatch import SMTPPool, ReminderDispatcher
+from llm_stub import LatencyStubClient
+from smtp_stub import LocalSMTPServer
+
+
+def smtp_factory(server):
+    return lambda: yagmail.SMTP("agent@example.com", host="127.0.0.1", port=server.port,
+                                smtp_ssl=False, smtp_starttls=False, smtp_skip_login=True)
+
+
+def content_generator(latency):
+    stub = LatencyStubClient(median_latency=latency, seed=1)
+
+    def generate(email, task_names):
+        stub.create(messages=[{"role": "user", "content": "personalized email reminder"}])
+        return "Time for your task", "Here is your reminder: " + ", ".join(task_names)
+
+    return generate, stub
+
+
+def bench_per_job(reminders, latency):
+    """Ten APScheduler-style workers, each opening its own SMTP session per reminder"""
+    with LocalSMTPServer() as server:
+        factory = smtp_factory(server)
+        generate, stub = content_generator(latency)
+
+        def job(reminder):
+            email, task_name = reminder
+            subject, body = generate(email, [task_name])
+            factory().send(email, subject, body)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(job, reminders))
+        elapsed = time.perf_counter() - start
+        return elapsed, len(server.messages), server.connections, stub.calls
+
+
+def bench_dispatcher(reminders, latency, digest):
+    with LocalSMTPServer() as server:
+        generate, stub = content_generator(latency)
+        pool = SMTPPool(smtp_factory(server), size=4)
+        dispatcher = ReminderDispatcher(pool, generate, window=0.05, digest=digest, workers=32)
+
+        start = time.perf_counter()
+        for i, (email, task_name) in enumerate(reminders):
+            dispatcher.submit(email, task_name, i)
+        dispatcher.flush()
+        elapsed = time.perf_counter() - start
+        pool.close()
+        return elapsed, len(server.messages), server.connections, stub.calls
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+    reminders = [(f"user{i % users}@example.com", f"task {i}") for i in range(count)]
+
+    print(f"{count} reminders for {users} users due in the same minute, content latency {latency * 1000:.0f} ms")
+    print(f"{'mode':<22}{'seconds':>9}{'reminders/s':>13}{'emails':>8}{'SMTP conns':>12}{'LLM calls':>11}")
+    for name, run in (("per-job (original)", lambda: bench_per_job(reminders, latency)),
+                      ("dispatcher", lambda: bench_dispatcher(reminders, latency, digest=False)),
+                      ("dispatcher + digest", lambda: bench_dispatcher(reminders, latency, digest=True))):
+        elapsed, emails, connections, calls = run()
+        print(f"{name:<22}{elapsed:>9.2f}{count / elapsed:>13.0f}{emails:>8}{connections:>12}{calls:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Fallback time-parser throughput and accuracy.
+
+Compares the original keyword/regex fallback with the compiled single-pass
+parser in nl_time on the test corpus.
+Usage: python bench_parsing.py [repeats]
+"""
+
+import re
+import sys
+import time
+from datetime import timedelta
+
+from nl_time import parse, parse_many
+from test_nl_time import CORPUS, NOW
+
+
+def legacy_parse(user_input, now):
+    """The original parse_natural_language_fallback, with the current time passed in"""
+    user_input_lower = user_input.lower()
+
+    time_keywords = {
+        'today': 0,
+        'tomorrow': 1,
+        'morning': 9,
+        'afternoon': 14,
+        'evening': 18,
+        'night': 20
+    }
+
+    days_ahead = 1
+    hour = 9
+    minute = 0
+
+    time_pattern = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)'
+    time_match = re.search(time_pattern, user_input_lower)
+
+    if time_match:
+        hour = int(time_match.group(1))
+        if time_match.group(3) == 'pm' and hour != 12:
+            hour += 12
+        elif time_match.group(3) == 'am' and hour == 12:
+            hour = 0
+        if time_match.group(2):
+            minute = int(time_match.group(2))
+
+    for keyword, value in time_keywords.items():
+        if keyword in user_input_lower:
+            if keyword in ['today', 'tomorrow']:
+                days_ahead = value
+            elif hour == 9:
+                hour = value
+
+    suggested_time = now + timedelta(days=days_ahead)
+    suggested_time = suggested_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    if suggested_time <= now:
+        suggested_time += timedelta(days=1)
+
+    task_words = []
+    for word in user_input.split():
+        word_lower = word.lower()
+        if (word_lower not in time_keywords and
+            not re.match(time_pattern, word_lower) and
+            word_lower not in ['at', 'on', 'by', 'for', 'to']):
+            task_words.append(word)
+
+    task_name = ' '.join(task_words) if task_words else "Task"
+
+    return {
+        "task": task_name,
+        "suggested_time": suggested_time.strftime('%Y-%m-%d %H:%M'),
+        "priority": "normal",
+        "reasoning": f"Parsed '{user_input}' - scheduled for {suggested_time.strftime('%Y-%m-%d %H:%M')}",
+        "confidence": 0.5
+    }
+
+
+def accuracy(fn):
+    correct = 0
+    for text, task, when in CORPUS:
+        result = fn(text)
+        correct += (result["task"], result["suggested_time"]) == (task, when)
+    return correct / len(CORPUS)
+
+
+def throughput(fn, texts):
+    start = time.perf_counter()
+    fn(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = [text for text, _, _ in CORPUS] * repeats
+
+    print(f"{len(CORPUS)} corpus inputs, {len(texts)} parses per run")
+    print(f"{'parser':<24}{'time accuracy':>15}{'parses/s':>12}")
+    for name, single, batch in (
+            ("original fallback", lambda t: legacy_parse(t, NOW), lambda ts: [legacy_parse(t, NOW) for t in ts]),
+            ("nl_time.parse", lambda t: parse(t, NOW), lambda ts: [parse(t, NOW) for t in ts]),
+            ("nl_time.parse_many", lambda t: parse(t, NOW), lambda ts: parse_many(ts, NOW))):
+        print(f"{name:<24}{accuracy(single):>15.0%}{throughput(batch, texts):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
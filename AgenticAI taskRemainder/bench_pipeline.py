@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare sequential, concurrent and planned (one structured call) task
+creation against a latency-injecting OpenAI stub. Usage: python bench_pipeline.py [requests] [median_latency_seconds]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from llm_stub import LatencyStubClient
+from pipeline import TaskCreationFlow
+
+
+def run_mode(app, mode, requests, latency):
+    stub = LatencyStubClient(median_latency=latency, seed=42)
+    app.agentic_agent.client = stub
+
+    flow = TaskCreationFlow(
+        app.agentic_agent,
+        parse_llm=app.parse_with_llm,
+        parse_fallback=app.parse_natural_language_fallback,
+        merge_suggestion=app.merge_time_suggestion,
+        confirm=app.generate_agentic_confirmation,
+        schedule=app.schedule_reminder,
+        mode=mode
+    )
+
+    def tokens():
+        return sum(site["prompt_tokens"] + site["completion_tokens"]
+                   for name, site in app.prompts.stats().items() if name != "tokenizer")
+
+    before = tokens()
+    timings = []
+    for i in range(requests):
+        start = time.perf_counter()
+        flow.run(f"bench{i % 20}@example.com", natural_input=f"{mode} benchmark task {i} tomorrow at 10am")
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings) * 1000
+    return (np.percentile(timings, 50), np.percentile(timings, 99), stub.calls / requests,
+            (tokens() - before) / requests)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    # Keep per-request agent logging out of the timings and the log file
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['AGENTIC_DB_PATH'] = os.path.join(tmp, "bench.db")
+        import app
+
+        print(f"{requests} requests, median LLM latency {latency * 1000:.0f} ms")
+        print(f"{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}{'LLM calls/req':>16}{'tokens/req':>12}")
+        results = {}
+        for mode in ("sequential", "concurrent", "planned"):
+            results[mode] = run_mode(app, mode, requests, latency)
+            p50, p99, calls, tokens = results[mode]
+            print(f"{mode:<12}{p50:>10.1f}{p99:>10.1f}{calls:>16.2f}{tokens:>12.0f}")
+
+        seq = results["sequential"]
+        for mode in ("concurrent", "planned"):
+            other = results[mode]
+            print(f"{mode}: p50 speedup {seq[0] / other[0]:.2f}x, p99 speedup {seq[1] / other[1]:.2f}x")
+        app.scheduler.shutdown(wait=False)
+        app.agentic_agent.decision_log.stop()
+        app.agentic_agent.db.close()
+
+
+if __name__ == "__main__":
+    main()
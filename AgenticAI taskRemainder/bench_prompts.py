@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Prompt size per call site: the previous inline f-string prompts (indented
+JSON patterns and numbered instruction lists) against the compiled
+templates, counted with prompts.count_tokens. Also replays calls through
+the stub client to show max_tokens adapting to the replies.
+Usage: python bench_prompts.py [calls]
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from agentic_ai_agent import AgenticReminderAgent
+from llm_stub import LatencyStubClient
+from prompts import TEMPLATES, count_tokens
+
+NOW = "2025-01-06 09:00"
+TASK = "Prepare the quarterly report"
+EMAIL = "user@example.com"
+DECISIONS = {"should_reschedule": False, "priority_level": "medium", "suggested_breaks": [],
+             "productivity_tips": ["Start with the hardest part"], "reasoning": "",
+             "task_optimization": "Split it into two sessions"}
+
+
+def legacy_prompts(patterns):
+    """The prompts as they were built inline before the compiler, per call site"""
+    dumped = json.dumps(patterns, indent=2)
+    return {
+        "suggest_optimal_time": f"""
+            As an intelligent task scheduling agent, suggest the optimal time for this task:
+
+            Task: {TASK}
+            User Email: {EMAIL}
+            User Patterns: {dumped}
+            User's Preferred Time: Not specified
+            Current Time: {NOW}
+
+            Consider:
+            1. User's historical completion patterns
+            2. Preferred working hours
+            3. Task complexity and estimated duration
+            4. Current workload and schedule
+            5. Optimal productivity windows
+
+            Return ONLY a JSON object: {{"suggested_time": "YYYY-MM-DD HH:MM", "reasoning": "explanation", "confidence": 0.0-1.0}}
+            """,
+        "ai_decisions": f"""
+            As an intelligent task management agent, analyze this situation and make recommendations:
+
+            Task: {TASK}
+            Scheduled Time: {NOW}
+            User Patterns: {dumped}
+            Current Pending Tasks: 3
+
+            Provide recommendations for:
+            1. Task priority (low/medium/high)
+            2. Whether to suggest rescheduling
+            3. Productivity tips
+            4. Break suggestions
+            5. Task optimization ideas
+
+            Return JSON: {{
+                "priority_level": "low/medium/high",
+                "should_reschedule": true/false,
+                "productivity_tips": ["tip1", "tip2"],
+                "suggested_breaks": ["break1", "break2"],
+                "task_optimization": "suggestion"
+            }}
+            """,
+        "productivity_insights": f"""
+            Based on this user's productivity data, provide actionable insights:
+
+            User Patterns: {dumped}
+
+            Provide insights about:
+            1. Best working hours
+            2. Task completion patterns
+            3. Areas for improvement
+            4. Personalized recommendations
+
+            Return JSON: {{
+                "best_hours": "analysis",
+                "completion_patterns": "analysis",
+                "improvement_areas": ["area1", "area2"],
+                "recommendations": ["rec1", "rec2"],
+                "productivity_score": 0.0-1.0
+            }}
+            """,
+        "task_modifications": f"""
+            Suggest intelligent modifications for this task to improve success rate:
+
+            Task: {TASK}
+            Scheduled Time: {NOW}
+            User Patterns: {dumped}
+
+            Consider:
+            1. Breaking down complex tasks
+            2. Optimal timing adjustments
+            3. Preparation suggestions
+            4. Related task grouping
+
+            Return JSON array of suggestions: ["suggestion1", "suggestion2", "suggestion3"]
+            """,
+        "reminder": f"""
+            Generate a personalized email reminder for this task:
+
+            Task: {TASK}
+            User Email: {EMAIL}
+            User Patterns: {dumped}
+
+            Create a friendly, motivating reminder that:
+            1. Acknowledges the user's productivity patterns
+            2. Provides context about why this time was chosen
+            3. Includes a productivity tip based on their history
+            4. Encourages completion
+
+            Return JSON: {{"subject": "subject line", "body": "email body"}}
+            """,
+        "parse_task": f"""
+    As an intelligent task scheduling agent, extract task details and make scheduling decisions:
+
+    User Input: "remind me to {TASK.lower()} tomorrow morning"
+    User Email: {EMAIL}
+    Current Time: {NOW}
+
+    Analyze the input and provide:
+    1. Task name
+    2. Suggested optimal time (consider user patterns)
+    3. Priority level
+    4. Any special considerations
+
+    Return JSON: {{
+        "task": "task_name",
+        "suggested_time": "YYYY-MM-DD HH:MM",
+        "priority": "low/medium/high",
+        "reasoning": "explanation",
+        "confidence": 0.0-1.0
+    }}
+    """,
+        "confirmation": f"""
+    Generate a friendly, intelligent confirmation message for a task reminder:
+
+    Task: {TASK}
+    Time: {NOW}
+    Email: {EMAIL}
+    Agent Decisions: {json.dumps(DECISIONS, indent=2)}
+
+    Include:
+    1. Confirmation of the scheduled reminder
+    2. Any intelligent suggestions from the agent
+    3. Productivity tips if applicable
+    4. Encouragement based on user patterns
+
+    Keep it conversational and helpful.
+    """,
+    }
+
+
+def compiled_prompts(patterns):
+    values = {
+        "suggest_optimal_time": dict(task=TASK, preferred="Not specified", now=NOW, patterns=patterns),
+        "ai_decisions": dict(task=TASK, scheduled_time=NOW, pending="3", patterns=patterns),
+        "productivity_insights": dict(patterns=patterns),
+        "task_modifications": dict(task=TASK, scheduled_time=NOW, patterns=patterns),
+        "reminder": dict(task=TASK, email=EMAIL, patterns=patterns),
+        "parse_task": dict(user_input=f"remind me to {TASK.lower()} tomorrow morning", now=NOW),
+        "confirmation": dict(task=TASK, time=NOW, decisions=DECISIONS),
+    }
+    return {site: TEMPLATES[site].render(**v)[1] for site, v in values.items()}
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    # Keep agent logging out of the timings and the log file
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("bench-key", os.path.join(tmp, "bench.db"))
+        agent.client = LatencyStubClient()
+        start = datetime(2025, 1, 6, 9, 0)
+        agent.record_tasks([(EMAIL, f"task {i}", start + timedelta(hours=7 * i)) for i in range(40)])
+        patterns = agent.analyze_user_patterns(EMAIL)
+
+        legacy = {site: count_tokens(prompt) for site, prompt in legacy_prompts(patterns).items()}
+        compiled = compiled_prompts(patterns)
+        print(f"prompt tokens per call site ({agent.prompts.stats()['tokenizer']})")
+        print(f"  {'call site':<24}{'before':>8}{'after':>8}{'saved':>8}")
+        for site in legacy:
+            print(f"  {site:<24}{legacy[site]:>8}{compiled[site]:>8}{1 - compiled[site] / legacy[site]:>8.0%}")
+        print(f"  {'total':<24}{sum(legacy.values()):>8}{sum(compiled.values()):>8}"
+              f"{1 - sum(compiled.values()) / sum(legacy.values()):>8.0%}")
+
+        began = time.perf_counter()
+        for i in range(calls):
+            # A new task each time so the response cache does not answer
+            agent.suggest_optimal_time(EMAIL, f"{TASK} {i}")
+        elapsed = time.perf_counter() - began
+        stats = agent.prompts.stats()["suggest_optimal_time"]
+        print(f"suggest_optimal_time x{calls}: max_tokens 300 -> {stats['max_tokens']}, "
+              f"avg reply {stats['avg_completion_tokens']:.0f} tokens, {elapsed / calls * 1e3:.2f} ms/call local")
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Replay synthetic task history through the hour-of-week slot model.
+
+Each user has hidden completion probabilities per slot and schedules
+mostly at habitual hours, which are not always their best ones. Before
+each task's outcome is learned, the slot model and the most-frequent-hour
+heuristic each suggest a time; quality is the true completion probability
+of the suggested slot. Usage: python bench_slots.py [users] [weeks]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agentic_ai_agent import AgenticReminderAgent
+from slots import SLOTS, slot_of
+
+WARMUP_WEEKS = 4
+TASKS_PER_WEEK = 6
+
+
+def make_user(rng):
+    """Hidden completion probability per slot, and the hours the user habitually picks"""
+    truth = np.full(SLOTS, rng.uniform(0.3, 0.6))
+    for _ in range(3):
+        day, hour = rng.randrange(5), rng.randrange(8, 20)
+        truth[day * 24 + hour:day * 24 + hour + 2] = rng.uniform(0.8, 0.95)
+    habits = [rng.randrange(SLOTS) for _ in range(2)] + [int(np.argmax(truth))]
+    return truth, habits
+
+
+def history(rng, habits, start, weeks):
+    tasks = []
+    for week in range(weeks):
+        for _ in range(TASKS_PER_WEEK):
+            slot = rng.choice(habits) if rng.random() < 0.7 else rng.randrange(SLOTS)
+            tasks.append(start + timedelta(weeks=week, hours=slot))
+    return sorted(tasks)
+
+
+def heuristic_time(patterns, now):
+    """_fallback_time_suggestion's choice: the most frequent hour, today or tomorrow"""
+    hour = patterns["preferred_hours"][0] if patterns.get("preferred_hours") else 9
+    suggested = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return suggested if suggested > now else suggested + timedelta(days=1)
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    # Keep agent logging out of the timings and the log file
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(42)
+    start = datetime(2025, 1, 6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("bench-key", os.path.join(tmp, "bench.db"))
+        model = agent.slot_model
+        events = []
+        truths = {}
+        for u in range(users):
+            email = f"user{u}@example.com"
+            truths[email], habits = make_user(rng)
+            events.extend((when, email) for when in history(rng, habits, start, weeks))
+        events.sort()
+
+        warmup_end = start + timedelta(weeks=WARMUP_WEEKS)
+        latencies, confident, local_q, heuristic_q, actual_q, oracle_q = [], [], [], [], [], []
+        for n, (when, email) in enumerate(events):
+            truth = truths[email]
+            now = when - timedelta(hours=1)
+            if when >= warmup_end:
+                began = time.perf_counter()
+                suggestion = model.suggest(email, now=now)
+                latencies.append(time.perf_counter() - began)
+                if suggestion is not None:
+                    suggested = datetime.strptime(suggestion["suggested_time"], '%Y-%m-%d %H:%M')
+                    confident.append(suggestion["confidence"] >= model.min_confidence)
+                    local_q.append(truth[slot_of(suggested)])
+                    heuristic_q.append(truth[slot_of(heuristic_time(agent.analyze_user_patterns(email), now))])
+                    actual_q.append(truth[slot_of(when)])
+                    oracle_q.append(truth.max())
+
+            name = f"task {n}"
+            agent.record_task(email, name, when)
+            agent.learn_from_outcome(email, name, "completed" if rng.random() < truth[slot_of(when)] else "missed")
+
+        latencies = np.array(latencies) * 1e6
+        confident = np.array(confident)
+        local_q = np.array(local_q)
+        print(f"{users} users, {len(events)} tasks, {len(local_q)} suggestions replayed after "
+              f"{WARMUP_WEEKS} warm-up weeks")
+        print(f"slot model latency: p50 {np.percentile(latencies, 50):.0f} us, "
+              f"p99 {np.percentile(latencies, 99):.0f} us")
+        print(f"answered without the LLM: {confident.mean():.0%}")
+        print(f"{'expected completion of the suggested slot':<44}{'all':>8}{'confident':>11}")
+        for label, quality in (("slot model", local_q), ("most frequent hour", np.array(heuristic_q)),
+                               ("time the user picked", np.array(actual_q)), ("oracle", np.array(oracle_q))):
+            print(f"  {label:<42}{quality.mean():>8.2f}{quality[confident].mean():>11.2f}")
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    main()
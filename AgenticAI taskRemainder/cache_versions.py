@@ -0,0 +1,36 @@
+from typing import Dict, Iterable
+
+from db import ConnectionManager
+
+CURRENT_VERSION_SQL = '''
+    SELECT version FROM user_cache_versions WHERE email = ?
+'''
+
+BUMP_VERSION_SQL = '''
+    INSERT INTO user_cache_versions (email, version) VALUES (?, 1)
+    ON CONFLICT (email) DO UPDATE SET version = version + 1
+    RETURNING version
+'''
+
+
+class CacheVersions:
+    """
+    A per-user counter in the database that moves on with every write to
+    the user's data, in the writing transaction. In-memory caches key their
+    entries by it, so a write made by any process sharing the database
+    file is seen by every other process's next lookup, at the cost of one
+    primary-key read; entries for older versions are never looked up again
+    and age out of the LRU.
+    """
+
+    def __init__(self, db: ConnectionManager):
+        self.db = db
+
+    def current(self, email: str) -> int:
+        with self.db.connection() as conn:
+            row = conn.execute(CURRENT_VERSION_SQL, [email]).fetchone()
+        return row[0] if row is not None else 0
+
+    def bump(self, conn, emails: Iterable[str]) -> Dict[str, int]:
+        """Move the users' versions on inside the caller's write transaction; returns the new versions"""
+        return {email: conn.execute(BUMP_VERSION_SQL, [email]).fetchone()[0] for email in emails}
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Cohort model for cold-start scheduling.
+
+Users with enough history are clustered on their hour and weekday mix and
+completion rate. A new or sparse user is assigned to the nearest cohort
+and the hours where that cohort completes the most tasks serve as the
+scheduling prior. Train or update offline with:
+python cohorts.py [db_path] [model_path] [cohorts]
+"""
+
+import itertools
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from db import ConnectionManager
+
+# Feature vector: share of tasks per hour (24), per weekday (7), completion rate (1)
+N_FEATURES = 24 + 7 + 1
+
+# Users with enough history to train on, grouped by email
+TRAINING_SCAN_SQL = '''
+    SELECT s.email, s.total_tasks, s.completed_tasks, b.kind, b.bin, b.task_count
+    FROM user_pattern_stats s
+    JOIN user_pattern_bins b ON b.email = s.email
+    WHERE s.total_tasks >= ?
+    ORDER BY s.email
+'''
+
+# A random sample of them to seed the centres; the scan's email order says
+# nothing about habits, so its first chunk would be a biased seed
+TRAINING_SAMPLE_SQL = '''
+    SELECT s.email, s.total_tasks, s.completed_tasks, b.kind, b.bin, b.task_count
+    FROM (SELECT * FROM user_pattern_stats WHERE total_tasks >= ? ORDER BY random() LIMIT ?) s
+    JOIN user_pattern_bins b ON b.email = s.email
+    ORDER BY s.email
+'''
+
+
+def user_features(hour_counts: np.ndarray, day_counts: np.ndarray, completion_rate: float) -> np.ndarray:
+    """One user's feature vector from their hour and weekday task counts"""
+    total = hour_counts.sum()
+    features = np.empty(N_FEATURES)
+    features[:24] = hour_counts / total
+    features[24:31] = day_counts / total
+    features[31] = completion_rate
+    return features
+
+
+def bin_counts(bins: List[Tuple[str, int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hour and weekday count vectors from (kind, bin, task_count) rows"""
+    hours = np.zeros(24)
+    days = np.zeros(7)
+    for kind, b, count in bins:
+        (hours if kind == 'hour' else days)[b] = count
+    return hours, days
+
+
+class CohortModel:
+    """A fitted MiniBatchKMeans plus each cohort's most productive hours"""
+
+    def __init__(self, kmeans: MiniBatchKMeans, best_hours: List[List[int]], sizes: np.ndarray,
+                 trained_at: float):
+        self.kmeans = kmeans
+        self.best_hours = best_hours
+        self.sizes = sizes
+        self.trained_at = trained_at
+        # Assignment is a nearest-centre lookup done in NumPy, without
+        # sklearn's per-call validation
+        self._centers = np.ascontiguousarray(kmeans.cluster_centers_, dtype=np.float64)
+        self.default_cohort = int(np.argmax(sizes))
+
+    def assign(self, features: np.ndarray) -> int:
+        """Nearest cohort for one feature vector"""
+        return int(np.argmin(((self._centers - features) ** 2).sum(axis=1)))
+
+    def prior(self, hour_counts: Optional[np.ndarray] = None, day_counts: Optional[np.ndarray] = None,
+              completion_rate: float = 0.0) -> Dict:
+        """Cohort and its best hours for a user; users without tasks get the largest cohort"""
+        if hour_counts is None or not hour_counts.sum():
+            cohort = self.default_cohort
+        else:
+            cohort = self.assign(user_features(hour_counts, day_counts, completion_rate))
+        return {"cohort": cohort, "best_hours": list(self.best_hours[cohort])}
+
+    def save(self, path: str):
+        joblib.dump({"kmeans": self.kmeans, "best_hours": self.best_hours, "sizes": self.sizes,
+                     "trained_at": self.trained_at}, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CohortModel":
+        state = joblib.load(path)
+        return cls(state["kmeans"], state["best_hours"], state["sizes"], state["trained_at"])
+
+    def stats(self) -> Dict:
+        return {
+            "cohorts": len(self.best_hours),
+            "users": int(self.sizes.sum()),
+            "trained_at": self.trained_at,
+            "best_hours": self.best_hours,
+        }
+
+
+def load_cohort_model(path: str) -> Optional[CohortModel]:
+    """The persisted model, or None when it has not been trained yet"""
+    if not path or not os.path.exists(path):
+        return None
+    return CohortModel.load(path)
+
+
+def _training_chunks(db: ConnectionManager, min_tasks: int, chunk_size: int,
+                     sample: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (features, completed tasks per hour) for the training users, chunk by
+    chunk; with `sample`, one chunk of randomly chosen users
+    """
+    features, productive = [], []
+    with db.connection() as conn:
+        if sample:
+            rows = conn.execute(TRAINING_SAMPLE_SQL, [min_tasks, chunk_size])
+        else:
+            rows = conn.execute(TRAINING_SCAN_SQL, [min_tasks])
+        for _, user_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            user_rows = list(user_rows)
+            _, total, completed, _, _, _ = user_rows[0]
+            hours, days = bin_counts([row[3:] for row in user_rows])
+            features.append(user_features(hours, days, completed / total))
+            # Smoothed so users whose tasks are still pending count for something
+            productive.append(hours * (completed + 1) / (total + 2))
+            if len(features) == chunk_size:
+                yield np.array(features), np.array(productive)
+                features, productive = [], []
+    if features:
+        yield np.array(features), np.array(productive)
+
+
+def train_cohort_model(db: ConnectionManager, model: Optional[CohortModel] = None, n_cohorts: int = 8,
+                       min_tasks: int = 10, chunk_size: int = 1024, seed: int = 0) -> Optional[CohortModel]:
+    """
+    Fit cohorts with partial_fit over the users in chunks, continuing from
+    `model`'s centres when given. Returns None if there are fewer training
+    users than cohorts.
+    """
+    if model is not None:
+        kmeans = model.kmeans
+    else:
+        kmeans = MiniBatchKMeans(n_clusters=n_cohorts, batch_size=chunk_size, n_init=3, random_state=seed)
+        # Seed the centres (k-means++) from a random sample of users
+        seed_chunk = next(_training_chunks(db, min_tasks, chunk_size, sample=True), None)
+        if seed_chunk is None or len(seed_chunk[0]) < n_cohorts:
+            return None
+        kmeans.partial_fit(seed_chunk[0])
+    n_clusters = kmeans.n_clusters
+
+    for features, _ in _training_chunks(db, min_tasks, chunk_size):
+        kmeans.partial_fit(features)
+
+    # Second pass: expected completed tasks per hour for each cohort
+    productive = np.zeros((n_clusters, 24))
+    sizes = np.zeros(n_clusters, dtype=np.int64)
+    for features, completed_by_hour in _training_chunks(db, min_tasks, chunk_size):
+        labels = kmeans.predict(features)
+        np.add.at(productive, labels, completed_by_hour)
+        sizes += np.bincount(labels, minlength=n_clusters)
+
+    order = np.argsort(-productive, axis=1, kind='stable')[:, :3]
+    best_hours = [[int(h) for h in row if productive[c, h] > 0] for c, row in enumerate(order)]
+    return CohortModel(kmeans, best_hours, sizes, time.time())
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "agentic_reminders.db"
+    model_path = sys.argv[2] if len(sys.argv) > 2 else os.environ.get('COHORT_MODEL_PATH', 'cohort_model.joblib')
+    n_cohorts = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    db = ConnectionManager(db_path)
+    existing = load_cohort_model(model_path)
+    model = train_cohort_model(db, model=existing, n_cohorts=n_cohorts,
+                               min_tasks=int(os.environ.get('COHORT_MIN_TASKS', 10)))
+    db.close()
+    if model is None:
+        print("Not enough users with history to train cohorts")
+        return
+
+    model.save(model_path)
+    print(f"{'Updated' if existing else 'Trained'} {len(model.best_hours)} cohorts "
+          f"over {int(model.sizes.sum())} users -> {model_path}")
+    for cohort, (size, hours) in enumerate(zip(model.sizes, model.best_hours)):
+        print(f"  cohort {cohort}: {size} users, best hours {hours}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ConnectionManager:
+    """
+    Pool of long-lived SQLite connections shared by the Flask request
+    threads and the APScheduler worker threads.
+    """
+
+    # Applied once to every new connection. auto_vacuum only takes effect on
+    # a file that has no tables yet (and before WAL is enabled); existing
+    # files are converted with `python retention.py --convert`
+    PRAGMAS = (
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, pool_size: int = 8, statement_cache_size: int = 128):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.statement_cache_size = statement_cache_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._all = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection with the tuned pragmas applied"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5.0,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection from the pool, opening one if below the limit"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+                self._all.append(conn)
+                return conn
+
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a pooled connection for the current thread.
+
+        Nested calls on the same thread reuse the same connection, so helper
+        methods share their caller's transaction. The outermost block commits
+        on success and rolls back on error before returning the connection.
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.held = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.held = None
+            self._local.depth = 0
+            self._pool.put(conn)
+
+    def close(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self._created = 0
+            self._pool = queue.LifoQueue()
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from db import ConnectionManager
+
+INSERT_DECISION_SQL = '''
+    INSERT INTO agent_decisions (email, decision_type, reasoning, action_taken, created_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+Record = Tuple[str, str, str, str, str]
+
+
+class DecisionLog:
+    """
+    Write-behind log of agent decisions. log() only queues the record; a
+    background thread inserts queued records in batches, one commit per
+    batch, once `batch_size` are waiting or the oldest has waited
+    `interval` seconds. When `max_queue` records are waiting, log() blocks
+    until the writer catches up. Before start() and after stop(), records
+    are written immediately.
+    """
+
+    def __init__(self, db: ConnectionManager, max_queue: int = 10000, batch_size: int = 500,
+                 interval: float = 1.0):
+        self.db = db
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self._buffer = deque()
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats_counters = {"logged": 0, "written": 0, "batches": 0, "blocked": 0, "failed": 0}
+
+    def start(self):
+        with self._cond:
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="decision-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write everything still queued and stop the background thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def log(self, email: str, decision_type: str, reasoning: str, action: Any):
+        """Queue one decision; `action` is stored as JSON"""
+        # Stamped now, in the same UTC format as CURRENT_TIMESTAMP, not when the batch is written
+        record = (email, decision_type, reasoning, json.dumps(action, default=str),
+                  datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+        self._count("logged")
+        with self._cond:
+            if self._running and len(self._buffer) >= self.max_queue:
+                self._count("blocked")
+                while self._running and len(self._buffer) >= self.max_queue:
+                    self._cond.wait()
+            if self._running:
+                if not self._buffer:
+                    self._oldest = time.monotonic()
+                self._buffer.append(record)
+                self._cond.notify_all()
+                return
+        self._write([record])
+
+    def backlog(self) -> int:
+        """Decisions queued but not yet written"""
+        with self._cond:
+            return len(self._buffer)
+
+    def _take_batch(self) -> List[Record]:
+        batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+        self._oldest = time.monotonic() if self._buffer else None
+        # Wake producers waiting for room
+        self._cond.notify_all()
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Hold the batch open until the interval is up or it is full;
+                # a concurrent flush() may empty it meanwhile
+                while self._buffer and len(self._buffer) < self.batch_size and self._running:
+                    remaining = self._oldest + self.interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+            if not batch:
+                continue
+            self._write(batch)
+
+    def flush(self) -> int:
+        """Write everything queued right now; returns decisions written"""
+        written = 0
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def _write(self, batch: List[Record]):
+        try:
+            with self.db.connection() as conn:
+                conn.executemany(INSERT_DECISION_SQL, batch)
+        except Exception as e:
+            # Audit data only: a failed batch is dropped rather than blocking the agent
+            print(f"Failed to write {len(batch)} agent decisions: {e}")
+            self._count("failed", len(batch))
+            return
+        self._count("written", len(batch))
+        self._count("batches")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats_counters[name] += amount
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats_counters)
+        with self._cond:
+            stats["queued"] = len(self._buffer)
+            stats["running"] = self._running
+        stats["max_queue"] = self.max_queue
+        stats["batch_size"] = self.batch_size
+        stats["interval"] = self.interval
+        return stats
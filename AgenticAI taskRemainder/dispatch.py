@@ -0,0 +1,292 @@
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Reminder(NamedTuple):
+    email: str
+    task_name: str
+    task_id: int
+    scheduled_time: Optional[datetime] = None
+
+
+class SendLag:
+    """Seconds between when reminders were scheduled and when they were sent"""
+
+    def __init__(self, window: int = 1000):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, worst = self.count, self.total, self.max
+
+        def percentile(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": worst,
+        }
+
+
+def is_permanent(error: BaseException) -> bool:
+    """A 5xx rejection of the message or all its recipients, which no retry can fix"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return bool(error.recipients) and all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class SMTPPool:
+    """
+    Bounded pool of reusable, logged-in yagmail connections.
+
+    yagmail.SMTP.send() opens a fresh connection on every call; the pool
+    logs each connection in once, builds messages with prepare_send() and
+    sends them on the open connection, reconnecting once on a dropped
+    connection or a transient (4xx) error. A permanent (5xx) rejection
+    fails at once and leaves the connection in the pool.
+    """
+
+    def __init__(self, factory: Callable, size: int = 4):
+        self.factory = factory
+        self.size = size
+        # Each slot holds an open connection, or None until it is first used
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self.reconnects = 0
+
+    def _connect(self):
+        conn = self.factory()
+        conn.login()
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def send(self, to: str, subject: str, contents: str):
+        """Send one message on a pooled connection, blocking while all are busy"""
+        conn = self._idle.get()
+        try:
+            if conn is None:
+                conn = self._connect()
+            recipients, message = conn.prepare_send(to=to, subject=subject, contents=contents)
+            try:
+                conn.smtp.sendmail(conn.user, recipients, message)
+            except (smtplib.SMTPException, OSError) as e:
+                if is_permanent(e):
+                    raise
+                # Stale or dropped connection, or a transient error: reconnect once and retry
+                self._discard(conn)
+                conn = None
+                with self._lock:
+                    self.reconnects += 1
+                conn = self._connect()
+                conn.smtp.sendmail(conn.user, recipients, message)
+        except BaseException as e:
+            # smtplib resets the session after a rejection, so the connection is still good
+            if conn is not None and not is_permanent(e):
+                self._discard(conn)
+                conn = None
+            self._idle.put(conn)
+            raise
+        self._idle.put(conn)
+
+    def close(self):
+        """Log out every idle connection; slots reconnect on next use"""
+        for _ in range(self.size):
+            conn = self._idle.get()
+            if conn is not None:
+                self._discard(conn)
+        for _ in range(self.size):
+            self._idle.put(None)
+
+
+class ReminderDispatcher:
+    """
+    Coalesces reminders that fall due within `window` seconds of each other,
+    generates their content concurrently (one digest per user when `digest`
+    is on) and sends them through a shared SMTPPool. Content returned by
+    `pregenerated` is used as-is instead of being generated at send time.
+    `before_send` is called just before SMTP and returns the reminders that
+    may still go out (see ReminderPoller.mark_sending).
+    """
+
+    def __init__(self, smtp_pool: SMTPPool, generate_content: Callable[[str, List[str]], Tuple[str, str]],
+                 on_sent: Optional[Callable[[Reminder, str], None]] = None,
+                 on_failed: Optional[Callable[[Reminder], None]] = None, window: float = 2.0,
+                 max_batch: int = 500, digest: bool = False, workers: int = 8,
+                 pregenerated: Optional[Callable[[List[Reminder]], Optional[Tuple[str, str]]]] = None,
+                 before_send: Optional[Callable[[List[Reminder]], List[Reminder]]] = None,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.smtp_pool = smtp_pool
+        self.generate_content = generate_content
+        self.pregenerated = pregenerated
+        self.before_send = before_send
+        self.clock = clock
+        self.send_lag = SendLag()
+        self.on_sent = on_sent
+        self.on_failed = on_failed
+        self.window = window
+        self.max_batch = max_batch
+        self.digest = digest
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder-dispatch")
+        self._buffer = []
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats_counters = {"submitted": 0, "sent": 0, "failed": 0, "skipped": 0, "emails": 0, "batches": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="reminder-coalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush anything still buffered and stop the background thread"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+    def submit(self, email: str, task_name: str, task_id: int, scheduled_time: Optional[datetime] = None):
+        """Queue a reminder that is due now"""
+        with self._cond:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(Reminder(email, task_name, task_id, scheduled_time))
+            self._count("submitted")
+            self._cond.notify()
+
+    def backlog(self) -> int:
+        """Reminders submitted but not yet taken into a batch"""
+        with self._cond:
+            return len(self._buffer)
+
+    def _take_batch(self) -> List[Reminder]:
+        batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+        self._oldest = time.monotonic() if self._buffer else None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Hold the batch open until the window closes or it is full
+                while len(self._buffer) < self.max_batch and not self._stopped:
+                    remaining = self._oldest + self.window - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+            self._dispatch(batch)
+
+    def flush(self) -> int:
+        """Dispatch everything buffered right now and wait for it; returns reminders handled"""
+        handled = 0
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return handled
+            self._dispatch(batch)
+            handled += len(batch)
+
+    def _dispatch(self, batch: List[Reminder]):
+        # Group by user, keeping arrival order
+        by_user = OrderedDict()
+        for reminder in batch:
+            by_user.setdefault(reminder.email, []).append(reminder)
+
+        if self.digest:
+            jobs = list(by_user.values())
+        else:
+            jobs = [[reminder] for reminders in by_user.values() for reminder in reminders]
+
+        self._count("batches")
+        for future in [self.executor.submit(self._deliver, job) for job in jobs]:
+            future.result()
+
+    def _content(self, reminders: List[Reminder]) -> Tuple[str, str]:
+        content = self.pregenerated(reminders) if self.pregenerated is not None else None
+        return content if content is not None else self.generate_content(
+            reminders[0].email, [r.task_name for r in reminders])
+
+    def _deliver(self, reminders: List[Reminder]):
+        email = reminders[0].email
+        try:
+            subject, body = self._content(reminders)
+            if self.before_send is not None:
+                sendable = self.before_send(reminders)
+                if len(sendable) < len(reminders):
+                    self._count("skipped", len(reminders) - len(sendable))
+                    if not sendable:
+                        return
+                    # A digest must not list tasks that are no longer this process's to send
+                    reminders = sendable
+                    subject, body = self._content(reminders)
+            self.smtp_pool.send(email, subject, body)
+        except Exception as e:
+            print(f"Failed to send reminder email to {email}: {e}")
+            self._count("failed", len(reminders))
+            if self.on_failed is not None:
+                for reminder in reminders:
+                    self.on_failed(reminder)
+            return
+
+        self._count("emails")
+        self._count("sent", len(reminders))
+        sent_at = self.clock()
+        for reminder in reminders:
+            if reminder.scheduled_time is not None:
+                self.send_lag.record((sent_at - reminder.scheduled_time).total_seconds())
+        if self.on_sent is not None:
+            for reminder in reminders:
+                self.on_sent(reminder, subject)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats_counters[name] += amount
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats_counters)
+        with self._cond:
+            stats["buffered"] = len(self._buffer)
+        stats["window"] = self.window
+        stats["digest"] = self.digest
+        stats["smtp_reconnects"] = self.smtp_pool.reconnects
+        stats["send_lag"] = self.send_lag.stats()
+        return stats
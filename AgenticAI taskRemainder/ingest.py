@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline import REMINDER_TIME_FORMATS
+
+# Accepted spellings of each column
+FIELD_ALIASES = {
+    "email": ("email",),
+    "task_name": ("task_name", "task"),
+    "reminder_time": ("reminder_time", "time", "scheduled_time"),
+}
+
+
+def _normalize(record: Dict) -> Dict:
+    row = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((record[a] for a in aliases if record.get(a) not in (None, "")), None)
+        row[field] = value.strip() if isinstance(value, str) else value
+    return row
+
+
+def _type_error(row: Dict) -> Optional[str]:
+    """JSON values can be numbers, lists or objects; every field must be text"""
+    wrong = [field for field, value in row.items() if value is not None and not isinstance(value, str)]
+    return f"Field {wrong[0]} must be a string" if wrong else None
+
+
+def read_rows(stream, content_type: str = "") -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Lazily read (row number, row, error) from a JSON-lines or CSV byte
+    stream; the whole upload is never held in memory. JSON rows are
+    numbered by line, blank lines included, so errors point at the line.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if "csv" in (content_type or ""):
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, _normalize(record), None
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Each line must be a JSON object"
+            continue
+        row = _normalize(record)
+        error = _type_error(row)
+        yield number, None if error else row, error
+
+
+def validate_times(rows: List[Dict], now: datetime) -> Tuple[List[Optional[datetime]], List[Optional[str]]]:
+    """Parse and check every reminder time of a chunk at once; returns (times, errors) per row"""
+    frame = pd.DataFrame(rows, columns=list(FIELD_ALIASES))
+    text = frame["reminder_time"].astype("string").str.strip()
+
+    times = pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+    for fmt in REMINDER_TIME_FORMATS:
+        times = times.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+
+    missing = frame["email"].isna() | frame["task_name"].isna() | text.isna()
+    unparsed = times.isna()
+    past = ~unparsed & (times <= pd.Timestamp(now))
+    errors = np.select(
+        [missing.to_numpy(), unparsed.to_numpy(), past.to_numpy()],
+        ['Please provide email, task name and reminder time.',
+         'Invalid date/time format. Please use YYYY-MM-DD HH:MM format.',
+         'Reminder time must be in the future.'],
+        default='')
+
+    return (
+        [None if error else ts.to_pydatetime() for ts, error in zip(times, errors)],
+        [error or None for error in errors],
+    )
+
+
+class BulkTaskIngest:
+    """
+    Ingests tasks in chunks: validates the chunk's times together, stores
+    it with one executemany transaction, registers its reminders in bulk
+    and makes one scheduling decision per user instead of one per task.
+    Results are yielded per row as each chunk completes.
+    """
+
+    def __init__(self, agent, schedule_many: Callable[[List[Tuple[str, str, datetime, int]]], None],
+                 chunk_size: int = 1000, max_workers: int = 8, clock: Callable[[], datetime] = datetime.now):
+        self.agent = agent
+        self.schedule_many = schedule_many
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.clock = clock
+
+    def run(self, rows: Iterable[Tuple[int, Optional[Dict], Optional[str]]]) -> Iterator[Dict]:
+        """Yield one result per input row, then a summary"""
+        totals = {"rows": 0, "scheduled": 0, "failed": 0, "users": 0}
+        decided = set()
+        rows = iter(rows)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bulk-decide") as executor:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                for result in self._ingest_chunk(chunk, decided, executor):
+                    totals["rows"] += 1
+                    totals["scheduled" if result["status"] == "scheduled" else "failed"] += 1
+                    yield result
+        totals["users"] = len(decided)
+        yield {"summary": totals}
+
+    def _ingest_chunk(self, chunk, decided: set, executor: ThreadPoolExecutor) -> List[Dict]:
+        results = {}
+        readable = []
+        for number, row, error in chunk:
+            if error is not None:
+                results[number] = {"row": number, "status": "error", "error": error}
+            else:
+                readable.append((number, row))
+
+        times, errors = validate_times([row for _, row in readable], self.clock()) if readable else ([], [])
+        valid = []
+        for (number, row), when, error in zip(readable, times, errors):
+            if error is not None:
+                results[number] = {"row": number, "status": "error", "error": error}
+            else:
+                valid.append((number, row["email"], row["task_name"], when))
+
+        if valid:
+            task_ids = self.agent.record_tasks([(email, task_name, when) for _, email, task_name, when in valid])
+            self.schedule_many([(email, task_name, when, task_id)
+                                for (_, email, task_name, when), task_id in zip(valid, task_ids)])
+            for (number, email, task_name, when), task_id in zip(valid, task_ids):
+                results[number] = {"row": number, "status": "scheduled", "task_id": task_id, "email": email,
+                                   "scheduled_time": when.strftime('%Y-%m-%d %H:%M')}
+            self._decide_for_new_users(valid, decided, executor)
+
+        return [results[number] for number, _, _ in chunk]
+
+    def _decide_for_new_users(self, valid, decided: set, executor: ThreadPoolExecutor):
+        by_user = {}
+        for _, email, task_name, when in valid:
+            if email not in decided:
+                by_user.setdefault(email, []).append((when, task_name))
+        decided.update(by_user)
+
+        def decide(email, tasks):
+            first_time, first_task = min(tasks)
+            try:
+                decisions = self.agent.make_intelligent_decisions(
+                    email, f"{first_task} (+{len(tasks) - 1} more imported)" if len(tasks) > 1 else first_task,
+                    first_time.strftime('%Y-%m-%d %H:%M'), log=False)
+                self.agent._log_decision(email, "bulk_scheduling", decisions["reasoning"], decisions)
+            except Exception as e:
+                print(f"Bulk scheduling decision failed for {email}: {e}")
+
+        list(executor.map(lambda item: decide(*item), by_user.items()))
@@ -0,0 +1,252 @@
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from db import ConnectionManager
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+# Accepts a job unless the user already has `per_user` unfinished ones, in one
+# statement, so workers in different processes cannot both pass the check
+SUBMIT_JOB_SQL = '''
+    INSERT INTO task_jobs (job_id, email, status, request, submitted_at, expires_at)
+    SELECT ?, ?, 'queued', ?, ?, ?
+    WHERE (SELECT COUNT(*) FROM task_jobs WHERE email = ? AND status IN ('queued', 'running')) < ?
+'''
+
+# A job starts only while still queued, not once it was given up on as interrupted
+START_JOB_SQL = '''
+    UPDATE task_jobs SET status = 'running', started_at = ?
+    WHERE job_id = ? AND status = 'queued'
+'''
+
+FINISH_JOB_SQL = '''
+    UPDATE task_jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ?
+    WHERE job_id = ?
+'''
+
+GET_JOB_SQL = '''
+    SELECT job_id, status, result, error, submitted_at, finished_at FROM task_jobs
+    WHERE job_id = ? AND expires_at > ?
+'''
+
+# The jobs of a process that died never finish; after the job timeout they
+# fail, so polls end and the user's limit frees up
+INTERRUPT_JOBS_SQL = '''
+    UPDATE task_jobs SET status = 'failed', error = ?, finished_at = ?, expires_at = ?
+    WHERE status IN ('queued', 'running') AND submitted_at < ?
+'''
+
+EXPIRE_JOBS_SQL = '''
+    DELETE FROM task_jobs WHERE expires_at <= ?
+'''
+
+UNFINISHED_JOBS_SQL = '''
+    SELECT COUNT(*), COUNT(DISTINCT email) FROM task_jobs WHERE status IN ('queued', 'running')
+'''
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at its bound (or shutting down)"""
+
+
+class UserLimitReached(Exception):
+    """Raised when the user already has as many unfinished jobs as allowed"""
+
+
+def _job_dict(row) -> Dict:
+    job_id, status, result, error, submitted_at, finished_at = row
+    job = {"job_id": job_id, "status": status}
+    if status == DONE:
+        job["result"] = json.loads(result)
+    elif status == FAILED:
+        job["error"] = error
+    if finished_at is not None:
+        job["seconds"] = round(finished_at - submitted_at, 3)
+    return job
+
+
+class TaskJobs:
+    """
+    A bounded pool of background workers running task requests, so the
+    web request can return a job id at once. `run(email, **request)` does
+    the work; its return value is the job's result and an exception's
+    message its error. Jobs are rows in task_jobs, so any worker process
+    sharing the database answers polls for them and the per-user limit
+    (`per_user` unfinished jobs) holds across processes; the process that
+    accepted a job runs it. At most `max_queue` jobs wait per process,
+    finished jobs can be polled for `result_ttl` seconds, and jobs left
+    unfinished for `job_timeout` seconds (their process died) fail.
+    Without started workers, submit() runs the job inline.
+    """
+
+    def __init__(self, db: ConnectionManager, run: Callable[..., Dict], workers: int = 4, max_queue: int = 1000,
+                 per_user: int = 3, result_ttl: float = 600, job_timeout: float = 600, poll_interval: float = 0.25,
+                 clock: Callable[[], float] = time.time):
+        self.db = db
+        self.run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.result_ttl = result_ttl
+        self.job_timeout = job_timeout
+        # How often a long poll re-reads a job that another process runs
+        self.poll_interval = poll_interval
+        # Wall-clock time, which every process on the host shares
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Workers wait for jobs on one condition, pollers for finished jobs on the other
+        self._work = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+        self._queue = deque()
+        # Queue slots taken by submissions still being stored
+        self._reserved = 0
+        self._in_progress = 0
+        self._finishes = 0
+        self._stopped = False
+        self._threads = []
+        self.stats_counters = {"submitted": 0, "done": 0, "failed": 0, "interrupted": 0, "queue_full": 0,
+                               "user_limit": 0, "queue_seconds": 0.0, "run_seconds": 0.0}
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._worker, name=f"task-job-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop taking jobs, let the workers finish the queued ones and wait for them"""
+        with self._lock:
+            self._stopped = True
+            self._work.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, email: str, **request) -> Dict:
+        """Queue a request and return its job; raises QueueFull or UserLimitReached"""
+        with self._lock:
+            if self._stopped or len(self._queue) + self._reserved >= self.max_queue:
+                self.stats_counters["queue_full"] += 1
+                raise QueueFull("Too many task requests are waiting; try again shortly")
+            self._reserved += 1
+        job_id = uuid.uuid4().hex
+        now = self.clock()
+        try:
+            with self.db.connection() as conn:
+                self._sweep(conn, now)
+                accepted = conn.execute(SUBMIT_JOB_SQL, [
+                    job_id, email, json.dumps(request), now, now + self.job_timeout + self.result_ttl,
+                    email, self.per_user
+                ]).rowcount
+        except BaseException:
+            with self._lock:
+                self._reserved -= 1
+            raise
+
+        with self._lock:
+            self._reserved -= 1
+            if not accepted:
+                self.stats_counters["user_limit"] += 1
+                raise UserLimitReached(f"At most {self.per_user} task requests per user can be in progress")
+            self.stats_counters["submitted"] += 1
+            self._in_progress += 1
+            if self._threads and not self._stopped:
+                self._queue.append((job_id, email, request, now))
+                self._work.notify()
+                return {"job_id": job_id, "status": QUEUED}
+        return self._execute(job_id, email, request, now)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.db.connection() as conn:
+            row = conn.execute(GET_JOB_SQL, [job_id, self.clock()]).fetchone()
+        return _job_dict(row) if row is not None else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """The job once it finishes, or as it stands after `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                seen = self._finishes
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            # Woken at once by this process's workers; another process's job is re-read each interval
+            with self._lock:
+                self._done.wait_for(lambda: self._finishes != seen, min(remaining, self.poll_interval))
+
+    def backlog(self) -> int:
+        """Jobs queued but not yet picked up by a worker"""
+        with self._lock:
+            return len(self._queue)
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                self._work.wait_for(lambda: self._queue or self._stopped)
+                if not self._queue:
+                    return
+                job = self._queue.popleft()
+            self._execute(*job)
+
+    def _execute(self, job_id: str, email: str, request: Dict, submitted: float) -> Optional[Dict]:
+        """Run a job and return it as polls will see it; None if it was given up on while queued"""
+        started = self.clock()
+        with self.db.connection() as conn:
+            claimed = conn.execute(START_JOB_SQL, [started, job_id]).rowcount
+        if not claimed:
+            self._finish(None)
+            return None
+
+        try:
+            result, error = self.run(email, **request), None
+        except Exception as e:
+            result, error = None, str(e)
+        finished = self.clock()
+        status = DONE if error is None else FAILED
+        result = json.dumps(result, default=str) if error is None else None
+        with self.db.connection() as conn:
+            conn.execute(FINISH_JOB_SQL, [status, result, error, finished, finished + self.result_ttl, job_id])
+        self._finish(status, started - submitted, finished - started)
+        return _job_dict((job_id, status, result, error, submitted, finished))
+
+    def _finish(self, status: Optional[str], queue_seconds: float = 0.0, run_seconds: float = 0.0):
+        with self._lock:
+            self._in_progress -= 1
+            self._finishes += 1
+            self.stats_counters[status or "interrupted"] += 1
+            self.stats_counters["queue_seconds"] += queue_seconds
+            self.stats_counters["run_seconds"] += run_seconds
+            self._done.notify_all()
+
+    def _sweep(self, conn, now: float):
+        """Fail jobs left unfinished past the job timeout and delete expired ones"""
+        conn.execute(INTERRUPT_JOBS_SQL, ["The task request was interrupted; please try again", now,
+                                          now + self.result_ttl, now - self.job_timeout])
+        conn.execute(EXPIRE_JOBS_SQL, [now])
+
+    def stats(self) -> Dict:
+        with self.db.connection() as conn:
+            unfinished, users = conn.execute(UNFINISHED_JOBS_SQL).fetchone()
+        with self._lock:
+            stats = dict(self.stats_counters)
+            stats["queued"] = len(self._queue)
+            stats["in_progress_here"] = self._in_progress
+        # Across every process sharing the database
+        stats["in_progress"] = unfinished
+        stats["users_in_progress"] = users
+        finished = stats["done"] + stats["failed"]
+        stats["avg_queue_seconds"] = stats.pop("queue_seconds") / finished if finished else 0.0
+        stats["avg_run_seconds"] = stats.pop("run_seconds") / finished if finished else 0.0
+        stats["workers"] = self.workers
+        stats["max_queue"] = self.max_queue
+        stats["per_user"] = self.per_user
+        return stats
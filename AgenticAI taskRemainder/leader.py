@@ -0,0 +1,149 @@
+import functools
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from db import ConnectionManager
+
+# Takes the lease when it is free, expired or already ours, in one statement;
+# SET expressions see the row as it was, so term counts changes of holder
+ACQUIRE_LEASE_SQL = '''
+    INSERT INTO leader_leases (name, holder, expires_at, term, acquired_at)
+    VALUES (?, ?, ?, 1, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        term = term + (holder IS NOT excluded.holder),
+        acquired_at = CASE WHEN holder IS excluded.holder THEN acquired_at ELSE excluded.acquired_at END,
+        holder = excluded.holder,
+        expires_at = excluded.expires_at
+    WHERE leader_leases.holder = excluded.holder OR leader_leases.expires_at < ?
+    RETURNING term
+'''
+
+# Hands the lease over at once on a clean shutdown
+RELEASE_LEASE_SQL = '''
+    UPDATE leader_leases SET expires_at = 0 WHERE name = ? AND holder = ?
+'''
+
+CURRENT_LEASE_SQL = '''
+    SELECT holder, expires_at, term FROM leader_leases WHERE name = ?
+'''
+
+
+class LeaderLease:
+    """
+    Elects one process among those sharing the database file, through a
+    row in leader_leases. The holder renews the lease every
+    `renew_interval` seconds; when it stops (crash, hang, stuck writes),
+    another process takes over once `ttl` seconds have passed since the
+    last renewal. The holder counts itself leader only until
+    `ttl - renew_interval` after its last renewal, so its leadership has
+    lapsed before anyone else's can start. Leadership decides which
+    process looks for work; the work itself is still claimed atomically
+    (see poller.py), so a lapsed leader finishing a batch never doubles it.
+    """
+
+    def __init__(self, db: ConnectionManager, name: str, ttl: float = 15.0, renew_interval: float = 5.0,
+                 holder: Optional[str] = None, clock: Callable[[], float] = time.time):
+        if ttl < 2 * renew_interval:
+            raise ValueError("The lease TTL must be at least twice the renew interval")
+        self.db = db
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        # Wall-clock time, which every process on the host shares
+        self.clock = clock
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.term = None
+        # Whether the last renewal succeeded, and until when that makes this process leader
+        self._held = False
+        self._leader_until = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats_counters = {"renewals": 0, "elected": 0, "lost": 0, "errors": 0}
+
+    def start(self):
+        # Contend once before returning, so jobs started next already know the outcome
+        self.renew()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop renewing and release the lease so another process can take over at once"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.release()
+
+    def _run(self):
+        while not self._stop.wait(self.renew_interval):
+            self.renew()
+
+    def is_leader(self) -> bool:
+        with self._lock:
+            return self.clock() < self._leader_until
+
+    def renew(self) -> bool:
+        """Take or renew the lease; returns whether this process leads"""
+        now = self.clock()
+        try:
+            with self.db.connection() as conn:
+                rows = conn.execute(ACQUIRE_LEASE_SQL, [self.name, self.holder, now + self.ttl, now, now]).fetchall()
+        except sqlite3.Error as e:
+            # Leadership runs out on its own if renewals keep failing
+            print(f"Leader lease renewal failed: {e}")
+            with self._lock:
+                self.stats_counters["errors"] += 1
+            return self.is_leader()
+
+        with self._lock:
+            if not rows:
+                if self._held:
+                    self.stats_counters["lost"] += 1
+                self._held = False
+                self._leader_until = 0.0
+                return False
+            term = rows[0][0]
+            if not self._held or term != self.term:
+                self.stats_counters["elected"] += 1
+            self._held = True
+            self.term = term
+            self._leader_until = now + self.ttl - self.renew_interval
+            self.stats_counters["renewals"] += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._held = False
+            self._leader_until = 0.0
+        try:
+            with self.db.connection() as conn:
+                conn.execute(RELEASE_LEASE_SQL, [self.name, self.holder])
+        except sqlite3.Error as e:
+            print(f"Leader lease release failed: {e}")
+
+    def only_when_leader(self, job: Callable) -> Callable:
+        """Wrap a periodic job so it only runs in the leading process"""
+        @functools.wraps(job)
+        def run(*args, **kwargs):
+            if self.is_leader():
+                return job(*args, **kwargs)
+            return None
+        return run
+
+    def stats(self) -> Dict:
+        with self.db.connection() as conn:
+            row = conn.execute(CURRENT_LEASE_SQL, [self.name]).fetchone()
+        with self._lock:
+            stats = dict(self.stats_counters)
+        stats["name"] = self.name
+        stats["holder"] = self.holder
+        stats["leader"] = self.is_leader()
+        stats["term"] = self.term
+        stats["current_holder"] = row[0] if row is not None and row[1] > self.clock() else None
+        stats["ttl"] = self.ttl
+        return stats
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cache import TTLCache
+from db import ConnectionManager
+
+# Seconds a response stays valid, per agent call site
+DEFAULT_TTLS = {
+    "suggest_optimal_time": 600,
+    "ai_decisions": 900,
+    "productivity_insights": 3600,
+    "task_modifications": 1800,
+}
+
+_MISSING = object()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for parsed chat completion responses: a bounded
+    in-memory LRU in front of the llm_response_cache SQLite table.
+    """
+
+    def __init__(self, db: ConnectionManager, memory_size: int = 512, ttls: Dict[str, float] = None,
+                 clock=time.time, purge_every: int = 256):
+        self.db = db
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.memory = TTLCache(max_size=memory_size, ttl=max(self.ttls.values()))
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+
+    @staticmethod
+    def make_key(model: str, params: Dict, messages: Any, version: int = 0) -> str:
+        """
+        Canonical hash of the model, sampling parameters and prompt, and of
+        the user's cache version (cache_versions.py): after a write to the
+        user's data, by any process, both tiers miss
+        """
+        canonical = json.dumps(
+            {"model": model, "params": params, "messages": messages, "version": version},
+            sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, call_site: str) -> float:
+        return self.ttls.get(call_site, 300)
+
+    def get(self, key: str) -> Any:
+        """Return a cached response, or None on a miss in both tiers"""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        now = self.clock()
+        with self.db.connection() as conn:
+            row = conn.execute('''
+                SELECT response, expires_at FROM llm_response_cache
+                WHERE cache_key = ? AND expires_at > ?
+            ''', [key, now]).fetchone()
+        if row is None:
+            return None
+
+        value = json.loads(row[0])
+        with self._lock:
+            self.disk_hits += 1
+        # Promote to memory for the rest of its lifetime
+        self.memory.set(key, value, ttl=row[1] - now)
+        return value
+
+    def set(self, key: str, call_site: str, email: Optional[str], value: Any):
+        """Store a parsed response in both tiers with the call site's TTL"""
+        ttl = self.ttl_for(call_site)
+        self.memory.set(key, value, ttl=ttl)
+        with self.db.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_response_cache (cache_key, call_site, email, response, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [key, call_site, email, json.dumps(value), self.clock() + ttl])
+
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def invalidate_user(self, email: str):
+        """Drop every cached response that was generated for this user"""
+        with self.db.connection() as conn:
+            keys = [row[0] for row in conn.execute(
+                'SELECT cache_key FROM llm_response_cache WHERE email = ?', [email])]
+            conn.execute('DELETE FROM llm_response_cache WHERE email = ?', [email])
+        for key in keys:
+            self.memory.invalidate(key)
+
+    def purge_expired(self):
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM llm_response_cache WHERE expires_at <= ?', [self.clock()])
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["ttls"] = self.ttls
+        return stats
@@ -0,0 +1,233 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised instead of calling the LLM; callers fall back to their heuristics"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The circuit breaker is open after repeated failures"""
+
+
+class LatencyBudgetExceeded(LLMUnavailableError):
+    """The current request has no time left for another LLM call"""
+
+
+# Statuses the API also returns for a healthy request: timeouts, conflicts, rate limits
+TRANSIENT_CLIENT_STATUSES = (408, 409, 429)
+
+# Absolute deadline (time.monotonic) of the request being served, if any
+_deadline = contextvars.ContextVar("llm_request_deadline", default=None)
+
+
+def is_client_error(error: Exception) -> bool:
+    """
+    A 4xx from the API other than the transient ones: the request itself
+    was rejected (bad parameter, unsupported model feature), so the
+    service is up and the error says nothing about its health
+    """
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in TRANSIENT_CLIENT_STATUSES
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. Opens after `failure_threshold` consecutive
+    failures, short-circuits for `cooldown` seconds, then lets a single
+    probe through (half-open) to decide whether to close again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self.clock() - self._opened_at < self.cooldown:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown": self.cooldown,
+                "times_opened": self.times_opened,
+            }
+
+
+class LLMGateway:
+    """
+    Single entry point for chat completions shared by the agent and the app.
+    Applies a per-call timeout, the current request's latency budget and a
+    circuit breaker, raising LLMUnavailableError instead of waiting on a
+    service that is known to be failing. A request the API rejects as
+    invalid (see is_client_error) is raised to the caller without counting
+    against the breaker, so one bad call site cannot cut off the others.
+    """
+
+    def __init__(self, client, timeout: float = 8.0, min_call_time: float = 0.5,
+                 breaker: Optional[CircuitBreaker] = None, clock=time.monotonic):
+        self.client = client
+        self.timeout = timeout
+        self.min_call_time = min_call_time
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.short_circuited = 0
+        self.budget_exhausted = 0
+
+    @contextmanager
+    def latency_budget(self, seconds: float):
+        """Bound the total time LLM calls may take within this block (propagates to graph steps)"""
+        deadline = self.clock() + seconds
+        outer = _deadline.get()
+        token = _deadline.set(deadline if outer is None else min(outer, deadline))
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    def _call_timeout(self) -> float:
+        deadline = _deadline.get()
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - self.clock()
+        if remaining < self.min_call_time:
+            with self._lock:
+                self.requests += 1
+                self.budget_exhausted += 1
+            raise LatencyBudgetExceeded(f"{max(remaining, 0):.2f}s left in the request budget")
+        return min(self.timeout, remaining)
+
+    def _admit(self) -> float:
+        """Check the budget and the breaker before a call; returns the call's timeout"""
+        timeout = self._call_timeout()
+
+        if not self.breaker.allow():
+            with self._lock:
+                self.requests += 1
+                self.short_circuited += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        with self._lock:
+            self.requests += 1
+        return timeout
+
+    def _record_failure(self):
+        self.breaker.record_failure()
+        with self._lock:
+            self.failures += 1
+
+    def _record_error(self, error: Exception):
+        if not is_client_error(error):
+            self._record_failure()
+            return
+        # The service answered; a half-open probe may close the breaker
+        self.breaker.record_success()
+        with self._lock:
+            self.rejected += 1
+
+    def _record_success(self):
+        self.breaker.record_success()
+        with self._lock:
+            self.successes += 1
+
+    def create(self, **kwargs):
+        """Drop-in for client.chat.completions.create"""
+        timeout = self._admit()
+        try:
+            response = self.client.chat.completions.create(timeout=timeout, **kwargs)
+        except Exception as e:
+            self._record_error(e)
+            raise
+
+        self._record_success()
+        return response
+
+    def stream(self, **kwargs) -> Iterator[str]:
+        """Streaming completion: yields the reply's text deltas as they arrive"""
+        timeout = self._admit()
+        try:
+            for chunk in self.client.chat.completions.create(timeout=timeout, stream=True, **kwargs):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except GeneratorExit:
+            # The consumer stopped reading; the service itself was fine
+            self._record_success()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        self._record_success()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            fallbacks = self.failures + self.rejected + self.short_circuited + self.budget_exhausted
+            stats = {
+                "timeout": self.timeout,
+                "requests": self.requests,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "short_circuited": self.short_circuited,
+                "budget_exhausted": self.budget_exhausted,
+                "fallback_rate": fallbacks / self.requests if self.requests else 0.0,
+            }
+        stats["breaker"] = self.breaker.stats()
+        return stats
@@ -0,0 +1,116 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+
+class LatencyStubClient:
+    """
+    Offline stand-in for the OpenAI client used by tests and benchmarks.
+    Recognises each of the app's prompts, answers with plausible JSON and
+    sleeps for a log-normally distributed latency to mimic a round trip.
+    """
+
+    def __init__(self, median_latency: float = 0.0, sigma: float = 0.35, seed: int = 0):
+        self.median_latency = median_latency
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _latency(self) -> float:
+        if self.median_latency <= 0:
+            return 0.0
+        with self._lock:
+            return self.median_latency * self._rng.lognormvariate(0, self.sigma)
+
+    def create(self, model=None, messages=None, stream=False, **params):
+        with self._lock:
+            self.calls += 1
+        prompt = messages[-1]["content"]
+        if stream:
+            return self._stream(self.reply_for(prompt), self._latency())
+        time.sleep(self._latency())
+        if params.get("tools"):
+            # A forced function call: the reply is the call's arguments, with no message text
+            name = params["tool_choice"]["function"]["name"]
+            function = SimpleNamespace(name=name, arguments=self.reply_for(prompt))
+            message = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(type="function", function=function)])
+        else:
+            message = SimpleNamespace(content=self.reply_for(prompt), tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    @staticmethod
+    def _stream(reply: str, latency: float, pieces: int = 8):
+        # Spread the latency over the chunks, like tokens arriving from the API
+        size = max(1, -(-len(reply) // pieces))
+        for start in range(0, len(reply), size):
+            time.sleep(latency / pieces)
+            delta = SimpleNamespace(content=reply[start:start + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    @staticmethod
+    def _field(prompt: str, label: str) -> str:
+        match = re.search(rf'{label}:\s*"?([^"\n]*)"?', prompt)
+        return match.group(1).strip() if match else ""
+
+    def reply_for(self, prompt: str) -> str:
+        tomorrow = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0)
+        if "extract task details" in prompt:
+            return json.dumps({
+                "task": self._field(prompt, "User Input"),
+                "suggested_time": tomorrow.strftime('%Y-%m-%d %H:%M'),
+                "priority": "medium",
+                "reasoning": "Parsed from your request",
+                "confidence": 0.9,
+            })
+        if "plan this task in one step" in prompt:
+            user_input = self._field(prompt, "User Input")
+            fixed = re.search(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}', user_input)
+            return json.dumps({
+                "task": re.sub(r'\s+at\s+\d{4}-.*$', '', user_input),
+                "suggested_time": fixed.group(0).replace("T", " ") if fixed else tomorrow.strftime('%Y-%m-%d %H:%M'),
+                "priority": "medium",
+                "reasoning": "Parsed and scheduled from your request",
+                "confidence": 0.85,
+                "decisions": {
+                    "priority_level": "medium",
+                    "should_reschedule": False,
+                    "productivity_tips": ["Start with the hardest part"],
+                    "suggested_breaks": [],
+                    "task_optimization": "Split it into two sessions",
+                },
+                "confirmation": "Reminder set - you've got this!",
+            })
+        if "suggest the optimal time" in prompt:
+            preferred = self._field(prompt, "User's Preferred Time")
+            suggested = preferred if re.match(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}$', preferred) \
+                else tomorrow.strftime('%Y-%m-%d %H:%M')
+            return json.dumps({"suggested_time": suggested, "reasoning": "Matches your pattern", "confidence": 0.8})
+        if "make recommendations" in prompt:
+            return json.dumps({
+                "priority_level": "medium",
+                "should_reschedule": False,
+                "productivity_tips": ["Start with the hardest part"],
+                "suggested_breaks": [],
+                "task_optimization": "Split it into two sessions",
+            })
+        if "confirmation message" in prompt:
+            return "Reminder set - you've got this!"
+        if "personalized email reminder" in prompt:
+            return json.dumps({"subject": "Time for your task", "body": "Here is your reminder."})
+        if "actionable insights" in prompt:
+            return json.dumps({
+                "best_hours": "Mornings",
+                "completion_patterns": "Steady",
+                "improvement_areas": ["Plan ahead"],
+                "recommendations": ["Keep going"],
+                "productivity_score": 0.7,
+            })
+        if "Suggest intelligent modifications" in prompt:
+            return json.dumps(["Break it down", "Prepare materials"])
+        return "{}"
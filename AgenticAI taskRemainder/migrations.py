@@ -0,0 +1,365 @@
+import sqlite3
+from typing import List, Tuple
+
+# Distinct tasks tracked per user by the outcome sketch, unless TASK_OUTCOME_KEYS
+# says otherwise; migration 9 folds the old lists into a sketch of this size
+DEFAULT_TASK_OUTCOME_KEYS = 50
+
+# Each migration is (version, description, statements). Versions are applied
+# in order and recorded in PRAGMA user_version, so existing database files
+# are upgraded in place.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "base tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS user_behavior (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            task_name TEXT,
+            scheduled_time DATETIME,
+            completion_time DATETIME,
+            completion_status TEXT,
+            user_feedback TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS agent_decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            decision_type TEXT,
+            reasoning TEXT,
+            action_taken TEXT,
+            outcome TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE,
+            preferred_times TEXT,
+            task_categories TEXT,
+            productivity_patterns TEXT,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, "per-user access path indexes", [
+        # History and dashboard: WHERE email = ? ORDER BY created_at DESC
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_behavior_email_created
+        ON user_behavior (email, created_at, scheduled_time, completion_status)
+        ''',
+        # Pending workload: WHERE email = ? AND scheduled_time > ? AND completion_status IS NULL
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_behavior_pending
+        ON user_behavior (email, scheduled_time)
+        WHERE completion_status IS NULL
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_agent_decisions_email_created
+        ON agent_decisions (email, created_at)
+        ''',
+    ]),
+    (3, "materialized per-user pattern aggregates", [
+        # Totals and running hour sums for the completion rate and hour std
+        '''
+        CREATE TABLE IF NOT EXISTS user_pattern_stats (
+            email TEXT PRIMARY KEY,
+            total_tasks INTEGER NOT NULL DEFAULT 0,
+            completed_tasks INTEGER NOT NULL DEFAULT 0,
+            hour_sum INTEGER NOT NULL DEFAULT 0,
+            hour_sum_sq INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        # 24 hour bins and 7 weekday bins (Monday = 0) per user
+        '''
+        CREATE TABLE IF NOT EXISTS user_pattern_bins (
+            email TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            bin INTEGER NOT NULL,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            last_task_id INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (email, kind, bin)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO user_pattern_stats (email, total_tasks, completed_tasks, hour_sum, hour_sum_sq)
+        SELECT email, COUNT(*), COALESCE(SUM(completion_status = 'completed'), 0), SUM(hour), SUM(hour * hour)
+        FROM (
+            SELECT email, completion_status, CAST(strftime('%H', scheduled_time) AS INTEGER) AS hour
+            FROM user_behavior
+            WHERE email IS NOT NULL AND scheduled_time IS NOT NULL
+        )
+        GROUP BY email
+        ''',
+        '''
+        INSERT OR REPLACE INTO user_pattern_bins (email, kind, bin, task_count, last_task_id)
+        SELECT email, 'hour', CAST(strftime('%H', scheduled_time) AS INTEGER), COUNT(*), MAX(id)
+        FROM user_behavior
+        WHERE email IS NOT NULL AND scheduled_time IS NOT NULL
+        GROUP BY 1, 3
+        ''',
+        '''
+        INSERT OR REPLACE INTO user_pattern_bins (email, kind, bin, task_count, last_task_id)
+        SELECT email, 'day', (CAST(strftime('%w', scheduled_time) AS INTEGER) + 6) % 7, COUNT(*), MAX(id)
+        FROM user_behavior
+        WHERE email IS NOT NULL AND scheduled_time IS NOT NULL
+        GROUP BY 1, 3
+        ''',
+    ]),
+    (4, "persistent LLM response cache", [
+        '''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            call_site TEXT NOT NULL,
+            email TEXT,
+            response TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_llm_response_cache_email
+        ON llm_response_cache (email)
+        ''',
+    ]),
+    (5, "reminder delivery state for the due-reminder poller", [
+        # NULL = waiting, then 'claimed' -> 'sent' / 'failed', or 'expired' if missed for too long
+        "ALTER TABLE user_behavior ADD COLUMN reminder_status TEXT",
+        "ALTER TABLE user_behavior ADD COLUMN reminder_claimed_at DATETIME",
+        "ALTER TABLE user_behavior ADD COLUMN reminder_sent_at DATETIME",
+        # Reminders already due were APScheduler's to send (or lost with its
+        # in-memory jobs on restart); keep the poller from sending them again.
+        # scheduled_time is stored in local time
+        '''
+        UPDATE user_behavior SET reminder_status = 'expired'
+        WHERE scheduled_time <= datetime('now', 'localtime')
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_behavior_due
+        ON user_behavior (scheduled_time)
+        WHERE reminder_status IS NULL
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_behavior_claimed
+        ON user_behavior (reminder_claimed_at)
+        WHERE reminder_status = 'claimed'
+        ''',
+    ]),
+    (6, "pre-generated reminder content", [
+        '''
+        CREATE TABLE IF NOT EXISTS reminder_content (
+            task_id INTEGER PRIMARY KEY,
+            email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            patterns_hash TEXT NOT NULL,
+            generated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (7, "precomputed productivity pattern freshness", [
+        # Epoch seconds: when the stored patterns were computed, and when the user's data last changed
+        "ALTER TABLE user_preferences ADD COLUMN patterns_updated_at REAL",
+        "ALTER TABLE user_preferences ADD COLUMN patterns_dirty_at REAL",
+    ]),
+    (8, "outcome counts per hour-of-week slot", [
+        # slot = weekday * 24 + hour, Monday = 0
+        '''
+        CREATE TABLE IF NOT EXISTS user_slot_outcomes (
+            email TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            missed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (email, slot)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO user_slot_outcomes (email, slot, completed, missed)
+        SELECT email, slot, SUM(completion_status = 'completed'), SUM(completion_status != 'completed')
+        FROM (
+            SELECT email, completion_status,
+                   ((CAST(strftime('%w', scheduled_time) AS INTEGER) + 6) % 7) * 24
+                   + CAST(strftime('%H', scheduled_time) AS INTEGER) AS slot
+            FROM user_behavior
+            WHERE email IS NOT NULL AND scheduled_time IS NOT NULL AND completion_status IS NOT NULL
+        )
+        GROUP BY email, slot
+        ''',
+    ]),
+    (9, "bounded per-task outcome counters", [
+        # A Space-Saving top-k sketch per user over normalized task names:
+        # outcomes counts every outcome of the key (overestimated by at most
+        # error, from the entry it replaced) and splits it into successes and failures
+        '''
+        CREATE TABLE IF NOT EXISTS user_task_outcomes (
+            email TEXT NOT NULL,
+            task_key TEXT NOT NULL,
+            outcomes INTEGER NOT NULL DEFAULT 0,
+            error INTEGER NOT NULL DEFAULT 0,
+            successes INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (email, task_key)
+        ) WITHOUT ROWID
+        ''',
+        # Fold the unbounded successful_tasks / challenging_tasks lists into
+        # the sketch, keeping each user's most frequent tasks
+        '''
+        INSERT OR REPLACE INTO user_task_outcomes (email, task_key, outcomes, error, successes, failures)
+        SELECT email, task_key, successes + failures, 0, successes, failures
+        FROM (
+            SELECT email, task_key, SUM(success) AS successes, SUM(1 - success) AS failures,
+                   ROW_NUMBER() OVER (PARTITION BY email ORDER BY COUNT(*) DESC, task_key) AS rank
+            FROM (
+                SELECT p.email, lower(trim(t.value)) AS task_key, 1 AS success
+                FROM user_preferences p, json_each(
+                    CASE WHEN json_valid(p.task_categories) THEN p.task_categories ELSE '{}' END,
+                    '$.successful_tasks') t
+                WHERE p.email IS NOT NULL AND t.type = 'text'
+                UNION ALL
+                SELECT p.email, lower(trim(t.value)), 0
+                FROM user_preferences p, json_each(
+                    CASE WHEN json_valid(p.task_categories) THEN p.task_categories ELSE '{}' END,
+                    '$.challenging_tasks') t
+                WHERE p.email IS NOT NULL AND t.type = 'text'
+            )
+            GROUP BY email, task_key
+        )
+        WHERE rank <= %d
+        ''' % DEFAULT_TASK_OUTCOME_KEYS,
+        "UPDATE user_preferences SET task_categories = '{}' WHERE task_categories IS NOT NULL",
+    ]),
+    (10, "rollups and archive ledger for retention", [
+        # Archived user_behavior rows per user, scheduled day and hour;
+        # last_task_id keeps the newest-task tie-break of the pattern bins
+        '''
+        CREATE TABLE IF NOT EXISTS user_daily_rollup (
+            email TEXT NOT NULL,
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            tasks INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            last_task_id INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (email, day, hour)
+        ) WITHOUT ROWID
+        ''',
+        # Archived agent_decisions rows per user, day (UTC) and decision type
+        '''
+        CREATE TABLE IF NOT EXISTS agent_decision_daily (
+            email TEXT NOT NULL,
+            day TEXT NOT NULL,
+            decision_type TEXT NOT NULL,
+            decisions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (email, day, decision_type)
+        ) WITHOUT ROWID
+        ''',
+        # One row per archive file, written in the transaction that deletes its rows
+        '''
+        CREATE TABLE IF NOT EXISTS retention_archives (
+            file TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (11, "leader leases for multi-process deployments", [
+        # One row per elected role; expires_at is Unix time, term counts changes of holder
+        '''
+        CREATE TABLE IF NOT EXISTS leader_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            term INTEGER NOT NULL DEFAULT 1,
+            acquired_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (12, "task API jobs shared by worker processes", [
+        # Times are Unix time; expires_at is when the job stops being served to polls
+        '''
+        CREATE TABLE IF NOT EXISTS task_jobs (
+            job_id TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            status TEXT NOT NULL,
+            request TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            submitted_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            expires_at REAL NOT NULL
+        )
+        ''',
+        # Per-user limit and the sweep of interrupted jobs only look at unfinished ones
+        '''
+        CREATE INDEX IF NOT EXISTS idx_task_jobs_unfinished_email
+        ON task_jobs (email)
+        WHERE status IN ('queued', 'running')
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_task_jobs_unfinished_submitted
+        ON task_jobs (submitted_at)
+        WHERE status IN ('queued', 'running')
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_task_jobs_expires
+        ON task_jobs (expires_at)
+        ''',
+    ]),
+    (13, "per-user cache versions shared by worker processes", [
+        # Moves on with every write to the user's data (see cache_versions.py)
+        '''
+        CREATE TABLE IF NOT EXISTS user_cache_versions (
+            email TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        ''',
+    ]),
+    (14, "at-most-once reminder sends", [
+        # A claim now belongs to one poller, and moves 'claimed' -> 'sending'
+        # just before SMTP; a 'sending' row left behind by a process that died
+        # may or may not have gone out, so it becomes 'interrupted', not resent
+        "ALTER TABLE user_behavior ADD COLUMN reminder_claimed_by TEXT",
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_behavior_sending
+        ON user_behavior (reminder_claimed_at)
+        WHERE reminder_status = 'sending'
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration, one transaction per version"""
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, description, statements in MIGRATIONS:
+        if get_schema_version(conn) >= version:
+            continue
+
+        # Take the write lock first so concurrent processes apply each version once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.execute("COMMIT")
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return get_schema_version(conn)
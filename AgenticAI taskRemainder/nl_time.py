@@ -0,0 +1,297 @@
+import calendar
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+# Hours used when only a part of the day is given
+PARTS_OF_DAY = {'morning': 9, 'afternoon': 14, 'evening': 18, 'night': 20, 'tonight': 20}
+AFTERNOON_PARTS = ('afternoon', 'evening', 'night', 'tonight')
+
+DAY_OFFSETS = {'today': 0, 'tomorrow': 1}
+
+WEEKDAYS = {name: i for i, name in enumerate(
+    ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'))}
+
+MONTHS = {}
+for _i, _name in enumerate(('january', 'february', 'march', 'april', 'may', 'june', 'july',
+                            'august', 'september', 'october', 'november', 'december'), start=1):
+    MONTHS[_name] = MONTHS[_name[:3]] = _i
+MONTHS['sept'] = 9
+
+NAMED_TIMES = {'noon': 12, 'midday': 12, 'midnight': 0}
+
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+                'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12}
+
+UNITS = {'min': 'minutes', 'mins': 'minutes', 'minute': 'minutes', 'minutes': 'minutes',
+         'hr': 'hours', 'hrs': 'hours', 'hour': 'hours', 'hours': 'hours',
+         'day': 'days', 'days': 'days', 'week': 'weeks', 'weeks': 'weeks'}
+
+MERIDIEMS = ('am', 'a.m', 'pm', 'p.m')
+
+# Relative offsets beyond this are not read as times ("in 99999999999 days")
+MAX_DELTA = timedelta(days=3660)
+
+# Words that introduce a time expression and go with it ("at 5pm", "on Friday")
+CONNECTIVES = {'at', 'on', 'by'}
+
+# Connectives left dangling at the edges of the task name
+EDGE_WORDS = {'at', 'on', 'by', 'this', 'next', 'in', 'for'}
+
+# Single-token patterns, only tried on tokens that start with a digit
+CLOCK_RE = re.compile(r'(\d{1,2})(?::(\d{2}))?(?:([ap])\.?m)?')
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+SLASH_DATE_RE = re.compile(r'(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?')
+DAY_OF_MONTH_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?')
+
+PUNCTUATION = ',;:!?()."\''
+
+# Words that can start a time expression; any other non-numeric token is part of the task name
+STARTERS = (set(DAY_OFFSETS) | set(PARTS_OF_DAY) | set(WEEKDAYS) | set(NAMED_TIMES) | set(MONTHS)
+            | {'this', 'next', 'in', 'the', 'day'})
+
+
+def parse(user_input: str, now: Optional[datetime] = None) -> Dict:
+    """Parse one request into the task dict the app expects (task, suggested_time, ...)"""
+    now = now or datetime.now()
+    words = user_input.split()
+    keys = [key.strip(PUNCTUATION) for key in user_input.lower().split()]
+
+    state = {}
+    task_words = []
+    i = 0
+    n = len(keys)
+    # One pass over the tokens: each position either starts a time expression
+    # (possibly after a connective) or belongs to the task name
+    while i < n:
+        key = keys[i]
+        consumed = 0
+        if key in STARTERS or key[:1].isdigit():
+            consumed = _expression(keys, i, state)
+        elif key in CONNECTIVES and i + 1 < n:
+            consumed = _expression(keys, i + 1, state, after_connective=True)
+            if consumed:
+                consumed += 1
+        if consumed:
+            i += consumed
+        else:
+            task_words.append(words[i])
+            i += 1
+
+    suggested_time = _resolve(now, **state).strftime('%Y-%m-%d %H:%M')
+    return {
+        "task": _task_name(task_words),
+        "suggested_time": suggested_time,
+        "priority": "normal",
+        "reasoning": f"Parsed '{user_input}' - scheduled for {suggested_time}",
+        "confidence": 0.5
+    }
+
+
+def parse_many(user_inputs: Iterable[str], now: Optional[datetime] = None) -> List[Dict]:
+    """Parse a batch of requests against the same reference time"""
+    now = now or datetime.now()
+    return [parse(user_input, now) for user_input in user_inputs]
+
+
+def _expression(keys: List[str], i: int, state: Dict, after_connective: bool = False) -> int:
+    """Match one time expression starting at keys[i]; record it in state and return its length"""
+    key = keys[i]
+    following = keys[i + 1] if i + 1 < len(keys) else ''
+
+    if key[:1].isdigit():
+        return _numeric(keys, i, state, after_connective)
+
+    if key in DAY_OFFSETS:
+        state['day_offset'] = DAY_OFFSETS[key]
+        return 1
+    if key in PARTS_OF_DAY:
+        state['part'] = key
+        if key == 'tonight':
+            state['day_offset'] = 0
+        return 1
+    if key in WEEKDAYS:
+        state['weekday'] = (WEEKDAYS[key], '')
+        return 1
+    if key in NAMED_TIMES:
+        state['hour'], state['minute'] = NAMED_TIMES[key], 0
+        return 1
+
+    if key == 'this':
+        if following in WEEKDAYS:
+            state['weekday'] = (WEEKDAYS[following], 'this')
+            return 2
+        if following in PARTS_OF_DAY and following != 'night':
+            state['part'] = following
+            state['day_offset'] = 0
+            return 2
+    elif key == 'next':
+        if following in WEEKDAYS:
+            state['weekday'] = (WEEKDAYS[following], 'next')
+            return 2
+        if following == 'week':
+            state['day_offset'] = 7
+            return 2
+    elif key == 'in':
+        return _relative(keys, i, state)
+    elif key == 'the':
+        consumed = _day_month(keys, i + 1, state)
+        return consumed + 1 if consumed else 0
+    elif key == 'day' and following == 'after' and keys[i + 2:i + 3] == ['tomorrow']:
+        state['day_offset'] = 2
+        return 3
+    elif key in MONTHS:
+        match = DAY_OF_MONTH_RE.fullmatch(following)
+        if match and _valid_date(None, MONTHS[key], int(match.group(1))):
+            state['date'] = (None, MONTHS[key], int(match.group(1)))
+            return 2
+    return 0
+
+
+def _numeric(keys: List[str], i: int, state: Dict, after_connective: bool) -> int:
+    """Clock times ('3:30pm', '7 pm', '14:00') and dates ('2025-02-01', '4/15', '3 March')"""
+    key = keys[i]
+    match = CLOCK_RE.fullmatch(key)
+    if match:
+        hour, minute, meridiem = match.groups()
+        consumed = 1
+        if meridiem is None and keys[i + 1:i + 2] and keys[i + 1] in MERIDIEMS:
+            meridiem, consumed = keys[i + 1][0], 2
+        hour, minute = int(hour), int(minute or 0)
+        # Out-of-range clocks ("25:00", "10:75", "13pm") stay part of the task name
+        if minute > 59:
+            return 0
+        if meridiem is not None:
+            if hour > 12:
+                return 0
+            state['hour'] = hour % 12 + (12 if meridiem == 'p' else 0)
+            state['minute'] = minute
+            return consumed
+        if match.group(2) is not None:
+            if hour > 23:
+                return 0
+            state['hour'], state['minute'] = hour, minute
+            return 1
+
+    match = ISO_DATE_RE.fullmatch(key)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        if not _valid_date(year, month, day):
+            return 0
+        state['date'] = (year, month, day)
+        return 1
+
+    match = SLASH_DATE_RE.fullmatch(key)
+    if match:
+        month, day, year = match.groups()
+        if year is not None:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+        if not _valid_date(year, int(month), int(day)):
+            return 0
+        state['date'] = (year, int(month), int(day))
+        return 1
+
+    consumed = _day_month(keys, i, state)
+    if consumed:
+        return consumed
+
+    # "at 7": a bare number is only an hour after a connective
+    if after_connective and key.isdigit() and int(key) <= 23:
+        state['bare_hour'] = int(key)
+        return 1
+    return 0
+
+
+def _day_month(keys: List[str], i: int, state: Dict) -> int:
+    """'14th of February', '3 March'"""
+    match = DAY_OF_MONTH_RE.fullmatch(keys[i]) if i + 1 < len(keys) else None
+    if not match:
+        return 0
+    j = i + 1
+    if keys[j] == 'of' and j + 1 < len(keys):
+        j += 1
+    if keys[j] not in MONTHS or not _valid_date(None, MONTHS[keys[j]], int(match.group(1))):
+        return 0
+    state['date'] = (None, MONTHS[keys[j]], int(match.group(1)))
+    return j - i + 1
+
+
+def _relative(keys: List[str], i: int, state: Dict) -> int:
+    """'in 2 hours', 'in an hour', 'in half an hour', 'in the evening'"""
+    rest = keys[i + 1:i + 4]
+    if len(rest) >= 2 and rest[0] == 'the' and rest[1] in PARTS_OF_DAY:
+        state['part'] = rest[1]
+        return 3
+    if rest == ['half', 'an', 'hour']:
+        state['delta'] = timedelta(minutes=30)
+        return 4
+    if len(rest) >= 2 and rest[1] in UNITS:
+        amount = int(rest[0]) if rest[0].isdigit() else NUMBER_WORDS.get(rest[0])
+        if amount is not None and amount <= MAX_DELTA / timedelta(**{UNITS[rest[1]]: 1}):
+            state['delta'] = timedelta(**{UNITS[rest[1]]: amount})
+            return 3
+    return 0
+
+
+def _valid_date(year: Optional[int], month: int, day: int) -> bool:
+    """Whether the date exists; without a year, Feb 29 counts (a later leap year may have it)"""
+    if not 1 <= month <= 12 or (year is not None and not 1 <= year <= 9998):
+        return False
+    return 1 <= day <= calendar.monthrange(year if year is not None else 2000, month)[1]
+
+
+def _resolve(now: datetime, date=None, day_offset=None, weekday=None, delta=None,
+             hour=None, minute=None, bare_hour=None, part=None) -> datetime:
+    if delta is not None:
+        return (now + delta).replace(second=0, microsecond=0)
+
+    if hour is None and bare_hour is not None:
+        hour, minute = bare_hour % 24, 0
+        if part in AFTERNOON_PARTS and hour < 12:
+            hour += 12
+    if hour is None and part is not None:
+        hour, minute = PARTS_OF_DAY[part], 0
+    timed = hour is not None
+    if not timed:
+        # Default to 9 AM
+        hour, minute = 9, 0
+    today = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    if date is not None:
+        year, month, day = date
+        if year is not None:
+            return today.replace(year=year, month=month, day=day)
+        # The next occurrence; Feb 29 waits for a leap year
+        year = now.year
+        while True:
+            if day <= calendar.monthrange(year, month)[1]:
+                when = today.replace(year=year, month=month, day=day)
+                if when > now:
+                    return when
+            year += 1
+
+    if weekday is not None:
+        target, modifier = weekday
+        days = (target - now.weekday()) % 7
+        if days == 0 and (modifier == 'next' or today <= now):
+            days = 7
+        return today + timedelta(days=days)
+
+    if day_offset is None:
+        # A bare time means its next occurrence; no time at all means tomorrow
+        day_offset = 0 if timed else 1
+    when = today + timedelta(days=day_offset)
+
+    # If the suggested time is in the past, move to next day
+    if when <= now:
+        when += timedelta(days=1)
+    return when
+
+
+def _task_name(words: List[str]) -> str:
+    while words and words[-1].lower().strip(PUNCTUATION) in EDGE_WORDS:
+        words.pop()
+    while words and words[0].lower().strip(PUNCTUATION) in EDGE_WORDS:
+        words.pop(0)
+    task_name = ' '.join(words).strip(' ,.;:-')
+    return task_name or "Task"
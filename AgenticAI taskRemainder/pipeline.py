@@ -0,0 +1,317 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Any, Callable, Dict, Sequence
+
+# Formats accepted for a reminder time (the manual form sends datetime-local values)
+REMINDER_TIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S')
+
+
+class TaskInputError(ValueError):
+    """Raised when a task request cannot be scheduled as given"""
+
+
+def parse_reminder_time(reminder_time: str) -> datetime:
+    """Parse a reminder time in any of the accepted formats"""
+    for fmt in REMINDER_TIME_FORMATS:
+        try:
+            return datetime.strptime(reminder_time, fmt)
+        except (TypeError, ValueError):
+            continue
+    raise TaskInputError('Invalid date/time format. Please use YYYY-MM-DD HH:MM format.')
+
+
+def default_confirmation(task_name: str, reminder_time: str) -> str:
+    """The confirmation shown when none could be generated"""
+    return f"✅ Intelligent reminder set! I'll remind you about '{task_name}' at {reminder_time}"
+
+
+def validate_task_time(task: Dict) -> datetime:
+    """The task's reminder time, which must be given, well-formed and in the future"""
+    if not task["task"] or not task["suggested_time"]:
+        raise TaskInputError('Please provide both task name and reminder time.')
+    reminder_dt = parse_reminder_time(task["suggested_time"])
+    now = datetime.now()
+    if reminder_dt <= now:
+        raise TaskInputError(
+            f'Reminder time ({reminder_dt.strftime("%Y-%m-%d %H:%M")}) must be in the future. '
+            f'Current time is {now.strftime("%Y-%m-%d %H:%M")}.'
+        )
+    return reminder_dt
+
+
+class TaskGraph:
+    """
+    A small dependency graph of steps. Each step is called with the results
+    of its dependencies, in order, once they are all available.
+    """
+
+    def __init__(self):
+        self._steps = {}
+
+    def add(self, name: str, fn: Callable, deps: Sequence[str] = ()):
+        for dep in deps:
+            if dep not in self._steps:
+                raise ValueError(f"Unknown dependency '{dep}' for step '{name}'")
+        self._steps[name] = (fn, tuple(deps))
+
+    def _call(self, name: str, results: Dict[str, Any]) -> Any:
+        fn, deps = self._steps[name]
+        return fn(*[results[dep] for dep in deps])
+
+    def run_sequential(self) -> Dict[str, Any]:
+        """Run every step in insertion order (which is always a valid topological order)"""
+        results = {}
+        for name in self._steps:
+            results[name] = self._call(name, results)
+        return results
+
+    def run(self, executor: ThreadPoolExecutor) -> Dict[str, Any]:
+        """Run each step as soon as its dependencies are done, independent steps in parallel"""
+        results = {}
+        waiting = dict(self._steps)
+        running = {}
+
+        while waiting or running:
+            for name in [n for n, (_, deps) in waiting.items() if all(d in results for d in deps)]:
+                del waiting[name]
+                # Carry context (e.g. the LLM latency budget) into the worker thread
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, self._call, name, results)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                # Re-raise the first failure; dependents of a failed step never start
+                results[name] = future.result()
+
+        return results
+
+
+class TaskCreationFlow:
+    """
+    The steps behind a task-creation request: parse, pick a time, decide,
+    store and schedule, confirm.
+
+    In "sequential" mode the steps run one after another. In "concurrent"
+    mode they run as a dependency graph: the pattern lookup overlaps the
+    parse call, decisions are computed speculatively for the parsed time
+    while the optimal-time call is in flight (and reused if the time is
+    kept), and the confirmation overlaps storing and scheduling.
+
+    In "planned" mode one structured call (agent.plan_task) returns the
+    parsed task, time, priority, decisions and confirmation together. Each
+    field the reply lacks, or gets wrong, comes from the same heuristics
+    the other modes fall back to; stats() counts how often that happens.
+    """
+
+    def __init__(self, agent, parse_llm: Callable, parse_fallback: Callable, merge_suggestion: Callable,
+                 confirm: Callable, schedule: Callable, mode: str = "sequential", max_workers: int = 8):
+        if mode not in ("sequential", "concurrent", "planned"):
+            raise ValueError(f"Unknown task pipeline mode: {mode}")
+        self.agent = agent
+        self.parse_llm = parse_llm
+        self.parse_fallback = parse_fallback
+        self.merge_suggestion = merge_suggestion
+        self.confirm = confirm
+        self.schedule = schedule
+        self.mode = mode
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-flow") \
+            if mode == "concurrent" else None
+        self._stats_lock = threading.Lock()
+        self._runs = 0
+        self._fallbacks = {}
+
+    def _count_fallbacks(self, fields):
+        with self._stats_lock:
+            self._runs += 1
+            for field in fields:
+                self._fallbacks[field] = self._fallbacks.get(field, 0) + 1
+
+    def stats(self) -> Dict:
+        """The mode, and in planned mode how often each field fell back to the heuristics"""
+        with self._stats_lock:
+            return {"mode": self.mode, "runs": self._runs, "fallbacks": dict(self._fallbacks)}
+
+    def run(self, email: str, natural_input: str = "", task_name: str = None, reminder_time: str = None) -> Dict:
+        """Create one task and return its task, time, decisions, task id and confirmation"""
+        graph = self.build_graph(email, natural_input, task_name, reminder_time)
+        if self.executor is None:
+            results = graph.run_sequential()
+        else:
+            results = graph.run(self.executor)
+
+        task = results["task"]
+        return {
+            "task": task["task"],
+            "suggested_time": task["suggested_time"],
+            "priority": task["priority"],
+            "reasoning": task["reasoning"],
+            "decisions": results["decisions"],
+            "task_id": results["task_id"],
+            "confirmation": results["confirmation"],
+        }
+
+    def build_graph(self, email: str, natural_input: str = "", task_name: str = None,
+                    reminder_time: str = None) -> TaskGraph:
+        if self.mode == "planned":
+            return self.build_planned_graph(email, natural_input, task_name, reminder_time)
+
+        agent = self.agent
+        speculate = self.mode == "concurrent"
+        graph = TaskGraph()
+
+        if speculate:
+            # Warm the pattern cache while the parse call is in flight
+            graph.add("patterns", lambda: agent.analyze_user_patterns(email))
+
+        if natural_input:
+            def parse():
+                try:
+                    return self.parse_llm(natural_input, email)
+                except Exception:
+                    return None
+
+            def suggest(parsed):
+                if parsed is None:
+                    return None
+                try:
+                    return agent.suggest_optimal_time(email, parsed["task"], parsed["suggested_time"])
+                except Exception:
+                    return None
+
+            def resolve_task(parsed, suggestion):
+                if parsed is not None and suggestion is not None:
+                    try:
+                        return self.merge_suggestion(parsed, suggestion)
+                    except Exception:
+                        pass
+                # Fallback to simple parsing when AI is unavailable
+                return self.parse_fallback(natural_input, email)
+
+            graph.add("parsed", parse)
+            graph.add("suggestion", suggest, ["parsed"])
+            graph.add("task", resolve_task, ["parsed", "suggestion"])
+        else:
+            graph.add("task", lambda: {
+                "task": task_name,
+                "suggested_time": reminder_time,
+                "priority": "normal",
+                "reasoning": "Manual input",
+            })
+
+        graph.add("reminder_dt", validate_task_time, ["task"])
+
+        def decide_for(name, when):
+            return agent.make_intelligent_decisions(email, name, when.strftime('%Y-%m-%d %H:%M'), log=False)
+
+        if speculate and natural_input:
+            def speculative_decisions(parsed):
+                # Decide for the parsed time before the optimal-time call returns
+                try:
+                    when = parse_reminder_time(parsed["suggested_time"])
+                    return (parsed["task"], when, decide_for(parsed["task"], when))
+                except Exception:
+                    return None
+
+            graph.add("speculative_decisions", speculative_decisions, ["parsed"])
+            decision_deps = ["task", "reminder_dt", "speculative_decisions"]
+        else:
+            decision_deps = ["task", "reminder_dt"]
+
+        def decide(task, reminder_dt, speculative=None):
+            if speculative is not None and speculative[:2] == (task["task"], reminder_dt):
+                decisions = speculative[2]
+            else:
+                decisions = decide_for(task["task"], reminder_dt)
+            agent._log_decision(email, "task_scheduling", decisions["reasoning"], decisions)
+            return decisions
+
+        graph.add("decisions", decide, decision_deps)
+        graph.add("task_id", lambda task, reminder_dt, decisions: self.schedule(email, task["task"], reminder_dt),
+                  ["task", "reminder_dt", "decisions"])
+        graph.add("confirmation",
+                  lambda task, reminder_dt, decisions: self.confirm(
+                      email, task["task"], reminder_dt.strftime('%Y-%m-%d %H:%M'), decisions),
+                  ["task", "reminder_dt", "decisions"])
+        return graph
+
+    def build_planned_graph(self, email: str, natural_input: str = "", task_name: str = None,
+                            reminder_time: str = None) -> TaskGraph:
+        agent = self.agent
+        graph = TaskGraph()
+
+        def plan():
+            # A manual task is planned too: its decisions and confirmation come from the same call
+            user_input = natural_input or f"{task_name} at {reminder_time}"
+            try:
+                return agent.plan_task(email, user_input)
+            except Exception:
+                return {}
+
+        def resolve_task(plan):
+            fallbacks = []
+            if natural_input:
+                task = {
+                    "task": plan.get("task"),
+                    "suggested_time": plan.get("suggested_time"),
+                    "priority": plan.get("priority"),
+                    "reasoning": plan.get("reasoning"),
+                }
+                # An unusable time is parsed from the input, like an unusable parse in the other
+                # modes; the reasoning given for the time goes with it
+                try:
+                    validate_task_time(task)
+                except TaskInputError:
+                    fallback = self.parse_fallback(natural_input, email)
+                    for field in ("task", "suggested_time", "reasoning"):
+                        if field != "task" or not task[field]:
+                            task[field] = fallback[field]
+                            fallbacks.append(field)
+                if not task["priority"]:
+                    task["priority"] = "normal"
+                    fallbacks.append("priority")
+            else:
+                task = {
+                    "task": task_name,
+                    "suggested_time": reminder_time,
+                    "priority": plan.get("priority", "normal"),
+                    "reasoning": "Manual input",
+                }
+            return task, fallbacks
+
+        graph.add("plan", plan)
+        graph.add("resolved", resolve_task, ["plan"])
+        graph.add("task", lambda resolved: resolved[0], ["resolved"])
+        graph.add("reminder_dt", validate_task_time, ["task"])
+
+        def decide(plan, task, reminder_dt):
+            decisions = agent.heuristic_decisions(email, task["task"], reminder_dt.strftime('%Y-%m-%d %H:%M'))
+            decisions.update(plan.get("decisions", {}))
+            agent._log_decision(email, "task_scheduling", decisions["reasoning"], decisions)
+            return decisions
+
+        graph.add("decisions", decide, ["plan", "task", "reminder_dt"])
+        graph.add("task_id", lambda task, reminder_dt, decisions: self.schedule(email, task["task"], reminder_dt),
+                  ["task", "reminder_dt", "decisions"])
+
+        def confirmed_time(plan):
+            try:
+                return parse_reminder_time(plan.get("confirmation_time"))
+            except TaskInputError:
+                return None
+
+        def confirm(plan, resolved, reminder_dt, decisions):
+            task, fallbacks = resolved
+            missing = [] if plan.get("decisions") else ["decisions"]
+            # The reply's confirmation is only shown for the time it names: not once the slot
+            # model, the fallback parse or a manual time put the task somewhere else
+            if plan.get("confirmation") and "suggested_time" not in fallbacks and confirmed_time(plan) == reminder_dt:
+                self._count_fallbacks(fallbacks + missing)
+                return plan["confirmation"]
+            self._count_fallbacks(fallbacks + missing + ["confirmation"])
+            return default_confirmation(task["task"], reminder_dt.strftime('%Y-%m-%d %H:%M'))
+
+        graph.add("confirmation", confirm, ["plan", "resolved", "reminder_dt", "decisions"])
+        return graph
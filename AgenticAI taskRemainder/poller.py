@@ -0,0 +1,181 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from db import ConnectionManager
+
+# Claims the earliest due reminders in one statement, so concurrent pollers
+# (threads or processes) never claim the same row twice
+CLAIM_DUE_SQL = '''
+    UPDATE user_behavior
+    SET reminder_status = 'claimed', reminder_claimed_at = ?, reminder_claimed_by = ?
+    WHERE id IN (
+        SELECT id FROM user_behavior
+        WHERE reminder_status IS NULL AND scheduled_time <= ?
+        ORDER BY scheduled_time
+        LIMIT ?
+    )
+    RETURNING id, email, task_name, scheduled_time
+'''
+
+# Reminders missed for longer than the catch-up horizon are not sent late
+EXPIRE_MISSED_SQL = '''
+    UPDATE user_behavior SET reminder_status = 'expired'
+    WHERE reminder_status IS NULL AND scheduled_time < ?
+'''
+
+# Claims held by a worker that died before sending are handed back to the queue
+RELEASE_STALE_CLAIMS_SQL = '''
+    UPDATE user_behavior SET reminder_status = NULL, reminder_claimed_at = NULL, reminder_claimed_by = NULL
+    WHERE reminder_status = 'claimed' AND reminder_claimed_at < ?
+'''
+
+# Recorded just before SMTP, only while the claim is still this poller's, so
+# a reminder is handed to SMTP at most once
+START_SENDING_SQL = '''
+    UPDATE user_behavior SET reminder_status = 'sending', reminder_claimed_at = ?
+    WHERE id IN ({}) AND reminder_status = 'claimed' AND reminder_claimed_by = ?
+    RETURNING id
+'''
+
+# A worker that died mid-send may or may not have sent; those are not sent again
+INTERRUPT_STALE_SENDS_SQL = '''
+    UPDATE user_behavior SET reminder_status = 'interrupted'
+    WHERE reminder_status = 'sending' AND reminder_claimed_at < ?
+'''
+
+
+def _timestamp(dt: datetime) -> str:
+    # Same text format the sqlite3 datetime adapter uses for scheduled_time
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ReminderPoller:
+    """
+    Treats user_behavior as the reminder queue: polls for due rows with an
+    indexed range query, claims them atomically and feeds them to the
+    dispatcher. Memory stays constant in the number of pending reminders,
+    and reminders missed during downtime are caught up at a bounded rate.
+    With `active` given, only polls while it returns True (the elected
+    process, see leader.py). Delivery is at most once: pass mark_sending
+    to the dispatcher so each send is recorded before SMTP. A process that
+    dies holding claims has them released after `claim_timeout` and sent
+    by the next leader; one that dies mid-send leaves those reminders
+    'interrupted' rather than risk sending them twice.
+    """
+
+    def __init__(self, db: ConnectionManager, dispatcher, interval: float = 5.0, batch_size: int = 200,
+                 max_per_second: float = 50.0, catchup_horizon: Optional[float] = 6 * 3600,
+                 claim_timeout: float = 300.0, clock: Callable[[], datetime] = datetime.now,
+                 active: Optional[Callable[[], bool]] = None):
+        self.db = db
+        self.dispatcher = dispatcher
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_per_second = max_per_second
+        self.catchup_horizon = catchup_horizon
+        self.claim_timeout = claim_timeout
+        self.clock = clock
+        self.active = active
+        # Claims are checked against it before sending
+        self.claimant = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats_counters = {"polls": 0, "claimed": 0, "sent": 0, "failed": 0, "expired": 0, "released": 0,
+                               "interrupted": 0, "lost_claims": 0}
+
+    def start(self):
+        # The first poll runs immediately and catches up on missed reminders
+        self._thread = threading.Thread(target=self._run, name="reminder-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.active is not None and not self.active():
+                self._stop.wait(self.interval)
+                continue
+            started = time.monotonic()
+            try:
+                claimed = self.poll_once()
+            except Exception as e:
+                print(f"Reminder poll failed: {e}")
+                claimed = 0
+
+            if claimed and self.max_per_second:
+                # Pace catch-up so a large backlog does not flood SMTP or the LLM
+                pause = claimed / self.max_per_second - (time.monotonic() - started)
+                if pause > 0 and self._stop.wait(pause):
+                    return
+            if claimed < self.batch_size:
+                self._stop.wait(self.interval)
+
+    def poll_once(self) -> int:
+        """Expire, release and claim due reminders once; returns how many were handed to the dispatcher"""
+        now = self.clock()
+        stale = _timestamp(now - timedelta(seconds=self.claim_timeout))
+        with self.db.connection() as conn:
+            if self.catchup_horizon is not None:
+                expired = conn.execute(EXPIRE_MISSED_SQL, [
+                    _timestamp(now - timedelta(seconds=self.catchup_horizon))]).rowcount
+                self._count("expired", expired)
+            self._count("released", conn.execute(RELEASE_STALE_CLAIMS_SQL, [stale]).rowcount)
+            self._count("interrupted", conn.execute(INTERRUPT_STALE_SENDS_SQL, [stale]).rowcount)
+        self._count("polls")
+
+        # Backpressure: leave rows in the table while the dispatcher is behind
+        room = self.batch_size - self.dispatcher.backlog()
+        if room <= 0:
+            return 0
+
+        rows = self.claim(now, room)
+        for task_id, email, task_name, scheduled_time in rows:
+            self.dispatcher.submit(email, task_name, task_id, datetime.fromisoformat(scheduled_time))
+        return len(rows)
+
+    def claim(self, now: datetime, limit: int) -> List[Tuple[int, str, str, str]]:
+        with self.db.connection() as conn:
+            rows = conn.execute(CLAIM_DUE_SQL, [_timestamp(now), self.claimant, _timestamp(now), limit]).fetchall()
+        self._count("claimed", len(rows))
+        return rows
+
+    def mark_sending(self, task_ids: List[int]) -> Set[int]:
+        """Record that these reminders are about to go to SMTP; returns the ids whose claim is still ours"""
+        with self.db.connection() as conn:
+            sending = {row[0] for row in conn.execute(START_SENDING_SQL.format(",".join("?" * len(task_ids))),
+                                                      [_timestamp(self.clock()), *task_ids, self.claimant])}
+        self._count("lost_claims", len(task_ids) - len(sending))
+        return sending
+
+    def mark_sent(self, task_id: int):
+        with self.db.connection() as conn:
+            conn.execute('''
+                UPDATE user_behavior SET reminder_status = 'sent', reminder_sent_at = ?
+                WHERE id = ?
+            ''', [_timestamp(self.clock()), task_id])
+        self._count("sent")
+
+    def mark_failed(self, task_id: int):
+        with self.db.connection() as conn:
+            conn.execute("UPDATE user_behavior SET reminder_status = 'failed' WHERE id = ?", [task_id])
+        self._count("failed")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats_counters[name] += amount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats_counters)
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        stats["active"] = self.active is None or self.active()
+        stats["interval"] = self.interval
+        stats["max_per_second"] = self.max_per_second
+        return stats
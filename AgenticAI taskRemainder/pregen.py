@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from db import ConnectionManager
+
+# Reminders due within the lead time, with the hash their stored content was built from
+UPCOMING_SQL = '''
+    SELECT b.id, b.email, b.task_name, c.patterns_hash
+    FROM user_behavior b
+    LEFT JOIN reminder_content c ON c.task_id = b.id
+    WHERE b.reminder_status IS NULL AND b.scheduled_time >= ? AND b.scheduled_time <= ?
+    ORDER BY b.scheduled_time
+    LIMIT ?
+'''
+
+
+def patterns_hash(patterns: Dict) -> str:
+    """Stable fingerprint of a user's patterns, used to spot stale content"""
+    canonical = json.dumps(patterns, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class ContentPregenerator:
+    """
+    Generates reminder subject and body ahead of time, `lead_time` seconds
+    before scheduled_time, so sending is a database read plus SMTP.
+    Content is regenerated when the user's patterns change before the
+    reminder goes out. `generate_content` returns None when it cannot
+    personalize (the LLM is down); nothing is stored then, so the next run
+    tries again and sending falls back to generating at send time. With
+    `active` given, only runs while it returns True.
+    """
+
+    def __init__(self, db: ConnectionManager, get_patterns: Callable[[str], Dict],
+                 generate_content: Callable[[str, List[str]], Optional[Tuple[str, str]]], lead_time: float = 900.0,
+                 interval: float = 60.0, batch_size: int = 500, clock: Callable[[], datetime] = datetime.now,
+                 active: Optional[Callable[[], bool]] = None):
+        self.db = db
+        self.get_patterns = get_patterns
+        self.generate_content = generate_content
+        self.lead_time = lead_time
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.active = active
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats_counters = {"generated": 0, "regenerated": 0, "unavailable": 0, "send_hits": 0, "send_misses": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="reminder-pregen", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.active is not None and not self.active():
+                self._stop.wait(self.interval)
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Reminder pre-generation failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> int:
+        """Generate missing or stale content for reminders inside the lead time"""
+        now = self.clock()
+        with self.db.connection() as conn:
+            rows = conn.execute(UPCOMING_SQL, [
+                now.strftime('%Y-%m-%d %H:%M:%S'),
+                (now + timedelta(seconds=self.lead_time)).strftime('%Y-%m-%d %H:%M:%S'),
+                self.batch_size
+            ]).fetchall()
+
+        current_hashes = {}
+        produced = 0
+        for task_id, email, task_name, stored_hash in rows:
+            if email not in current_hashes:
+                current_hashes[email] = patterns_hash(self.get_patterns(email))
+            current = current_hashes[email]
+            if stored_hash == current:
+                continue
+
+            content = self.generate_content(email, [task_name])
+            if content is None:
+                self._count("unavailable")
+                continue
+            subject, body = content
+            with self.db.connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO reminder_content (task_id, email, subject, body, patterns_hash, generated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [task_id, email, subject, body, current, now.strftime('%Y-%m-%d %H:%M:%S')])
+            self._count("generated" if stored_hash is None else "regenerated")
+            produced += 1
+        return produced
+
+    def lookup(self, reminders) -> Optional[Tuple[str, str]]:
+        """Stored content for a single reminder, or None to generate it at send time"""
+        if len(reminders) != 1:
+            return None
+        with self.db.connection() as conn:
+            row = conn.execute('SELECT subject, body FROM reminder_content WHERE task_id = ?',
+                               [reminders[0].task_id]).fetchone()
+        self._count("send_hits" if row else "send_misses")
+        return tuple(row) if row else None
+
+    def discard(self, task_id: int):
+        """Drop stored content once its reminder has been sent"""
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM reminder_content WHERE task_id = ?', [task_id])
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats_counters[name] += amount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats_counters)
+        stats["lead_time"] = self.lead_time
+        return stats
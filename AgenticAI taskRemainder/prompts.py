@@ -0,0 +1,385 @@
+import json
+import math
+import re
+import string
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional; token counts are estimated without it
+    tiktoken = None
+
+_encoding = tiktoken.get_encoding("cl100k_base") if tiktoken is not None else None
+
+# Words, short digit runs, punctuation runs and whitespace, close to how
+# cl100k pre-splits text before merging; long words cost about one token per 4 letters
+_PIECES = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text`: exact with tiktoken installed, otherwise a local estimate"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum((len(piece) + 2) // 4 if piece[-1].isalpha() else 1 for piece in _PIECES.findall(text))
+
+
+def _rounded(value: Any, digits: int) -> Any:
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else round(value, digits)
+    if isinstance(value, dict):
+        return {k: _rounded(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(v, digits) for v in value]
+    if hasattr(value, "item"):  # NumPy scalars
+        return _rounded(value.item(), digits)
+    return value
+
+
+def _empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, tuple, dict)) and not value)
+
+
+def compact(value: Any, keep: Optional[Sequence[str]] = None, digits: int = 2) -> str:
+    """JSON without whitespace, floats rounded, and only the `keep` keys of a dict"""
+    if keep is not None and isinstance(value, dict):
+        value = {k: value[k] for k in keep if not _empty(value.get(k))}
+    return json.dumps(_rounded(value, digits), separators=(",", ":"), default=str)
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once: the literal text between the {slots} is split
+    out and its token count taken up front, so rendering is a join of the
+    serialized values. Dicts and lists are serialized with compact(),
+    keeping only the keys listed for their slot in `keep`.
+    """
+
+    def __init__(self, call_site: str, text: str, max_tokens: int, temperature: float,
+                 keep: Optional[Dict[str, Sequence[str]]] = None, min_tokens: int = 48, per_item_tokens: int = 0,
+                 schema: Optional[Dict] = None):
+        self.call_site = call_site
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.per_item_tokens = per_item_tokens
+        self.temperature = temperature
+        self.keep = keep or {}
+        # A JSON schema for the reply, sent as the parameters of a forced function
+        # call (which every chat model supports, unlike json_schema response
+        # formats); it is billed as prompt tokens
+        self.schema = schema
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(text)
+        ]
+        self.fixed_tokens = count_tokens("".join(literal for literal, _ in self.parts))
+        if schema is not None:
+            self.fixed_tokens += count_tokens(compact(schema))
+
+    @property
+    def tool_params(self) -> Optional[Dict]:
+        """Request parameters that make the model reply by calling one function with the schema's fields"""
+        if self.schema is None:
+            return None
+        function = {"name": self.call_site, "parameters": self.schema}
+        return {"tools": [{"type": "function", "function": function}],
+                "tool_choice": {"type": "function", "function": {"name": self.call_site}}}
+
+    def render(self, **values) -> Tuple[str, int]:
+        """The prompt text and its token count"""
+        out = []
+        tokens = self.fixed_tokens
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                text = value if isinstance(value, str) else compact(value, self.keep.get(field))
+                tokens += count_tokens(text)
+                out.append(text)
+        return "".join(out), tokens
+
+
+# Pattern keys each call site actually reasons about
+SCHEDULING_KEYS = ("patterns", "completion_rate", "preferred_hours", "preferred_days", "cohort_best_hours",
+                   "total_tasks")
+SUMMARY_KEYS = ("patterns", "completion_rate", "preferred_hours", "preferred_days", "productivity_score",
+                "total_tasks")
+REMINDER_KEYS = ("patterns", "completion_rate", "preferred_hours")
+DECISION_KEYS = ("priority_level", "should_reschedule", "productivity_tips", "suggested_breaks",
+                 "task_optimization")
+
+
+def _object(**properties) -> Dict:
+    # Every property required and no others allowed, so the model fills in the whole object
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+_PRIORITY = {"type": "string", "enum": ["low", "medium", "high"]}
+
+PLAN_SCHEMA = _object(
+    task={"type": "string"},
+    suggested_time={"type": "string", "description": "YYYY-MM-DD HH:MM"},
+    priority=_PRIORITY,
+    reasoning={"type": "string"},
+    confidence={"type": "number"},
+    decisions=_object(
+        priority_level=_PRIORITY,
+        should_reschedule={"type": "boolean"},
+        productivity_tips=_STRINGS,
+        suggested_breaks=_STRINGS,
+        task_optimization={"type": "string"},
+    ),
+    confirmation={"type": "string"},
+)
+
+_TYPES = {"string": str, "number": (int, float), "boolean": bool, "array": list, "object": dict}
+
+
+def _conforms(value: Any, schema: Dict) -> bool:
+    expected = _TYPES[schema["type"]]
+    if not isinstance(value, expected) or (schema["type"] == "number" and isinstance(value, bool)):
+        return False
+    if "enum" in schema and value not in schema["enum"]:
+        return False
+    if schema["type"] == "array":
+        return all(_conforms(item, schema["items"]) for item in value)
+    return True
+
+
+def conforming(reply: Any, schema: Dict) -> Dict:
+    """
+    The fields of a JSON object reply that match their schema, recursing
+    into object fields; fields missing or of the wrong shape are dropped
+    so the caller can fill just those in.
+    """
+    if not isinstance(reply, dict):
+        return {}
+    fields = {}
+    for name, field_schema in schema["properties"].items():
+        value = reply.get(name)
+        if field_schema["type"] == "object":
+            value = conforming(value, field_schema)
+            if value:
+                fields[name] = value
+        elif value is not None and _conforms(value, field_schema):
+            fields[name] = value
+    return fields
+
+
+TEMPLATES = {t.call_site: t for t in [
+    PromptTemplate(
+        "suggest_optimal_time",
+        "As a task scheduling agent, suggest the optimal time for this task.\n"
+        "Task: {task}\nUser's Preferred Time: {preferred}\nCurrent Time: {now}\nUser Patterns: {patterns}\n"
+        "Weigh completion history, preferred hours, task size and current workload.\n"
+        'Return only JSON: {{"suggested_time":"YYYY-MM-DD HH:MM","reasoning":"...","confidence":0.0-1.0}}',
+        max_tokens=300, temperature=0.3, keep={"patterns": SCHEDULING_KEYS}),
+    PromptTemplate(
+        "ai_decisions",
+        "As a task management agent, make recommendations for this task.\n"
+        "Task: {task}\nScheduled Time: {scheduled_time}\nPending Tasks: {pending}\nUser Patterns: {patterns}\n"
+        'Return only JSON: {{"priority_level":"low|medium|high","should_reschedule":bool,'
+        '"productivity_tips":[...],"suggested_breaks":[...],"task_optimization":"..."}}',
+        max_tokens=400, temperature=0.4, keep={"patterns": SUMMARY_KEYS}),
+    PromptTemplate(
+        "productivity_insights",
+        "Give actionable insights on best hours, completion patterns, areas to improve and recommendations.\n"
+        "User Patterns: {patterns}\n"
+        'Return only JSON: {{"best_hours":"...","completion_patterns":"...","improvement_areas":[...],'
+        '"recommendations":[...],"productivity_score":0.0-1.0}}',
+        max_tokens=500, temperature=0.3, keep={"patterns": SUMMARY_KEYS}),
+    PromptTemplate(
+        "task_modifications",
+        "Suggest intelligent modifications that make this task more likely to get done "
+        "(splitting it, timing, preparation, grouping).\n"
+        "Task: {task}\nScheduled Time: {scheduled_time}\nUser Patterns: {patterns}\n"
+        "Return only a JSON array of up to 3 strings.",
+        max_tokens=300, temperature=0.4, keep={"patterns": REMINDER_KEYS}),
+    PromptTemplate(
+        "reminder",
+        "Write a friendly, motivating personalized email reminder for this task, with a tip drawn from "
+        "the user's patterns.\n"
+        "Task: {task}\nUser Email: {email}\nUser Patterns: {patterns}\n"
+        'Return only JSON: {{"subject":"...","body":"..."}}',
+        max_tokens=400, temperature=0.7, keep={"patterns": REMINDER_KEYS}),
+    PromptTemplate(
+        "reminder_digest",
+        "Write one friendly personalized email reminder listing all of these tasks, which are due now, "
+        "with a suggested order and a tip drawn from the user's patterns.\n"
+        "Tasks: {tasks}\nUser Email: {email}\nUser Patterns: {patterns}\n"
+        'Return only JSON: {{"subject":"...","body":"..."}}',
+        max_tokens=400, temperature=0.7, keep={"patterns": REMINDER_KEYS}, per_item_tokens=40),
+    PromptTemplate(
+        "parse_task",
+        "As a task scheduling agent, extract task details from the user input.\n"
+        'User Input: "{user_input}"\nCurrent Time: {now}\n'
+        'Return only JSON: {{"task":"...","suggested_time":"YYYY-MM-DD HH:MM","priority":"low|medium|high",'
+        '"reasoning":"...","confidence":0.0-1.0}}',
+        max_tokens=300, temperature=0.3),
+    PromptTemplate(
+        "confirmation",
+        "Write a short, friendly confirmation message for this task reminder, mentioning any useful "
+        "suggestion from the agent.\n"
+        "Task: {task}\nTime: {time}\nAgent Decisions: {decisions}",
+        max_tokens=200, temperature=0.7, keep={"decisions": DECISION_KEYS}),
+    PromptTemplate(
+        "plan_task",
+        "As a task scheduling agent, plan this task in one step: extract the task, pick the optimal time "
+        "(keep a time the user fixed), set its priority, make recommendations and write a short, friendly "
+        "confirmation message.\n"
+        'User Input: "{user_input}"\nCurrent Time: {now}\nPending Tasks: {pending}\nUser Patterns: {patterns}',
+        max_tokens=600, temperature=0.4, keep={"patterns": SCHEDULING_KEYS + ("productivity_score",)},
+        schema=PLAN_SCHEMA),
+]}
+
+
+class PromptRequest(NamedTuple):
+    call_site: str
+    messages: List[Dict]
+    # Sent with the call; max_tokens adapts to the site's observed replies
+    params: Dict
+    # The part of the parameters that decides the reply, for response-cache keys
+    cache_params: Dict
+    prompt_tokens: int
+
+
+class _SiteStats:
+    def __init__(self, samples: int):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.truncated = 0
+        self.failures = 0
+        self.replies = deque(maxlen=samples)
+        self.latencies = deque(maxlen=samples)
+
+
+class PromptCompiler:
+    """
+    Renders the compiled templates and sends them through the gateway,
+    accounting prompt and completion tokens and latency per call site.
+    Once a site has `min_samples` replies, its max_tokens is the largest
+    recent reply plus `headroom`, within the template's bounds; a reply
+    cut off at the limit resets the site to the template's maximum.
+    """
+
+    def __init__(self, gateway, model: str, templates: Dict[str, PromptTemplate] = None, samples: int = 200,
+                 min_samples: int = 20, headroom: float = 1.25):
+        self.gateway = gateway
+        self.model = model
+        self.templates = templates or TEMPLATES
+        self.samples = samples
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _SiteStats] = {}
+
+    def _site(self, call_site: str) -> _SiteStats:
+        site = self._sites.get(call_site)
+        if site is None:
+            site = self._sites[call_site] = _SiteStats(self.samples)
+        return site
+
+    def max_tokens(self, call_site: str, items: int = 1) -> int:
+        template = self.templates[call_site]
+        extra = template.per_item_tokens * max(items - 1, 0)
+        with self._lock:
+            replies = self._site(call_site).replies
+            if len(replies) < self.min_samples:
+                return template.max_tokens + extra
+            observed = max(replies)
+        budget = max(template.min_tokens, math.ceil(observed * self.headroom))
+        return min(template.max_tokens, budget) + extra
+
+    def request(self, call_site: str, items: int = 1, **values) -> PromptRequest:
+        """Render a call site's prompt; `items` scales the reply budget of per-item templates"""
+        template = self.templates[call_site]
+        prompt, tokens = template.render(**values)
+        messages = [{"role": "user", "content": prompt}]
+        cache_params = {"temperature": template.temperature}
+        if template.schema is not None:
+            cache_params.update(template.tool_params)
+        params = dict(cache_params, max_tokens=self.max_tokens(call_site, items))
+        return PromptRequest(call_site, messages, params, cache_params, tokens)
+
+    def complete(self, request: PromptRequest) -> str:
+        """Send the request and return the reply text"""
+        started = time.monotonic()
+        try:
+            response = self.gateway.create(model=self.model, messages=request.messages, **request.params)
+        except Exception:
+            self._record_failure(request)
+            raise
+        choice = response.choices[0]
+        text = choice.message.content
+        if "tools" in request.params:
+            # The forced function call carries the reply as its arguments
+            tool_calls = choice.message.tool_calls or []
+            text = tool_calls[0].function.arguments if tool_calls else ""
+        usage = getattr(response, "usage", None)
+        completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(text)
+        self._record(request, completion_tokens, time.monotonic() - started,
+                     getattr(choice, "finish_reason", None) == "length")
+        return text
+
+    def stream(self, request: PromptRequest) -> Iterator[str]:
+        """Stream the reply's text deltas"""
+        started = time.monotonic()
+        parts = []
+        try:
+            for delta in self.gateway.stream(model=self.model, messages=request.messages, **request.params):
+                parts.append(delta)
+                yield delta
+        except GeneratorExit:
+            raise
+        except Exception:
+            self._record_failure(request)
+            raise
+        text = "".join(parts)
+        completion_tokens = count_tokens(text)
+        self._record(request, completion_tokens, time.monotonic() - started,
+                     completion_tokens >= request.params["max_tokens"])
+
+    def _record(self, request: PromptRequest, completion_tokens: int, latency: float, truncated: bool):
+        with self._lock:
+            site = self._site(request.call_site)
+            site.calls += 1
+            site.prompt_tokens += request.prompt_tokens
+            site.completion_tokens += completion_tokens
+            site.latencies.append(latency)
+            if truncated:
+                site.truncated += 1
+                site.replies.clear()
+            else:
+                site.replies.append(completion_tokens)
+
+    def _record_failure(self, request: PromptRequest):
+        with self._lock:
+            site = self._site(request.call_site)
+            site.failures += 1
+            site.prompt_tokens += request.prompt_tokens
+
+    def stats(self) -> Dict:
+        """Per call site: calls, token totals and averages, current max_tokens and latency"""
+        with self._lock:
+            sites = {name: (site.calls, site.failures, site.prompt_tokens, site.completion_tokens, site.truncated,
+                            sorted(site.latencies))
+                     for name, site in self._sites.items()}
+        stats = {"tokenizer": "tiktoken" if _encoding is not None else "estimate"}
+        for name, (calls, failures, prompt_tokens, completion_tokens, truncated, latencies) in sites.items():
+            stats[name] = {
+                "calls": calls,
+                "failures": failures,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "avg_prompt_tokens": prompt_tokens / (calls + failures) if calls + failures else 0.0,
+                "avg_completion_tokens": completion_tokens / calls if calls else 0.0,
+                "truncated": truncated,
+                "max_tokens": self.max_tokens(name),
+                "fixed_tokens": self.templates[name].fixed_tokens,
+                "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+                "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            }
+        return stats
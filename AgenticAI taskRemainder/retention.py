@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Retention for user_behavior and agent_decisions.
+
+Tasks with an outcome scheduled more than `task_days` ago, and decisions
+logged more than `decision_days` ago, are written to gzipped JSON-lines
+archive files and deleted in batches, one short write transaction per
+batch. Each batch is first rolled up into user_daily_rollup or
+agent_decision_daily, which the pattern analytics read alongside the
+live rows. Freed pages are then handed back with incremental vacuum.
+Run offline with: python retention.py [db_path] [archive_dir] [--convert]
+"""
+
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Tuple
+
+from db import ConnectionManager
+from migrations import migrate
+
+# Batches are addressed by a JSON array of ids, so any batch size fits in one parameter
+BATCH_IDS = "SELECT value FROM json_each(?)"
+
+
+class ArchivedTable(NamedTuple):
+    name: str
+    # (after id, horizon, limit) -> the next batch of rows past the horizon, in id order
+    batch_sql: str
+    # Rolls the batch rows that are still present into the summary table
+    rollup_sql: str
+    # Rows elsewhere that only exist for the archived ones
+    cleanup_sql: Tuple[str, ...] = ()
+
+
+TASKS = ArchivedTable(
+    "user_behavior",
+    '''
+    SELECT * FROM user_behavior
+    WHERE id > ? AND completion_status IS NOT NULL AND scheduled_time < ?
+    ORDER BY id
+    LIMIT ?
+    ''',
+    f'''
+    INSERT INTO user_daily_rollup (email, day, hour, tasks, completed, last_task_id)
+    SELECT email, date(scheduled_time), CAST(strftime('%H', scheduled_time) AS INTEGER),
+           COUNT(*), SUM(completion_status = 'completed'), MAX(id)
+    FROM user_behavior
+    WHERE id IN ({BATCH_IDS}) AND email IS NOT NULL AND date(scheduled_time) IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (email, day, hour) DO UPDATE SET
+        tasks = tasks + excluded.tasks,
+        completed = completed + excluded.completed,
+        last_task_id = MAX(last_task_id, excluded.last_task_id)
+    ''',
+    (f"DELETE FROM reminder_content WHERE task_id IN ({BATCH_IDS})",),
+)
+
+DECISIONS = ArchivedTable(
+    "agent_decisions",
+    '''
+    SELECT * FROM agent_decisions
+    WHERE id > ? AND created_at < ?
+    ORDER BY id
+    LIMIT ?
+    ''',
+    f'''
+    INSERT INTO agent_decision_daily (email, day, decision_type, decisions)
+    SELECT COALESCE(email, ''), COALESCE(date(created_at), ''), COALESCE(decision_type, ''), COUNT(*)
+    FROM agent_decisions
+    WHERE id IN ({BATCH_IDS})
+    GROUP BY 1, 2, 3
+    ON CONFLICT (email, day, decision_type) DO UPDATE SET
+        decisions = decisions + excluded.decisions
+    ''',
+)
+
+RECORD_ARCHIVE_SQL = '''
+    INSERT OR REPLACE INTO retention_archives (file, table_name, first_id, last_id, rows)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# PRAGMA auto_vacuum value for INCREMENTAL
+INCREMENTAL = 2
+
+
+class Retention:
+    """
+    Archives old rows and rolls them up, batch by batch. The archive file
+    is written before the batch's transaction and recorded in
+    retention_archives inside it, so a batch interrupted before its commit
+    leaves its rows in place and an unrecorded file, which the next run
+    removes. Run one retention job at a time.
+    """
+
+    def __init__(self, db: ConnectionManager, archive_dir: str = "archive", task_days: float = 365,
+                 decision_days: float = 90, batch_size: int = 1000, vacuum_pages: int = 1024,
+                 clock=datetime.now):
+        self.db = db
+        self.archive_dir = archive_dir
+        self.task_days = task_days
+        self.decision_days = decision_days
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.stats_counters = {"runs": 0, "tasks": 0, "decisions": 0, "files": 0, "pages_freed": 0}
+        self.last_run = None
+
+    def run(self) -> Dict:
+        """One retention pass; returns rows archived per table and pages freed"""
+        started = time.time()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.remove_orphans()
+        # scheduled_time is local time; created_at is UTC (CURRENT_TIMESTAMP)
+        now = self.clock()
+        task_horizon = (now - timedelta(days=self.task_days)).strftime('%Y-%m-%d %H:%M:%S')
+        decision_horizon = time.strftime('%Y-%m-%d %H:%M:%S',
+                                         time.gmtime(now.timestamp() - self.decision_days * 86400))
+        result = {
+            "tasks": self.archive(TASKS, task_horizon),
+            "decisions": self.archive(DECISIONS, decision_horizon),
+        }
+        result["pages_freed"] = self.vacuum()
+        result["seconds"] = round(time.time() - started, 3)
+        with self._lock:
+            self.stats_counters["runs"] += 1
+            self.stats_counters["tasks"] += result["tasks"]
+            self.stats_counters["decisions"] += result["decisions"]
+            self.stats_counters["pages_freed"] += result["pages_freed"]
+            self.last_run = result
+        return result
+
+    def archive(self, table: ArchivedTable, horizon: str) -> int:
+        """Archive, roll up and delete `table`'s rows past the horizon; returns rows deleted"""
+        archived = 0
+        after = 0
+        while True:
+            with self.db.connection() as conn:
+                cursor = conn.execute(table.batch_sql, [after, horizon, self.batch_size])
+                columns = [d[0] for d in cursor.description]
+                rows = cursor.fetchall()
+            if not rows:
+                return archived
+            ids = [row[0] for row in rows]
+            after = ids[-1]
+
+            # The file goes out before the write lock is taken
+            path = self._write_archive(table.name, columns, rows)
+            batch = json.dumps(ids)
+            with self.db.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(table.rollup_sql, [batch])
+                deleted = conn.execute(f"DELETE FROM {table.name} WHERE id IN ({BATCH_IDS})", [batch]).rowcount
+                for sql in table.cleanup_sql:
+                    conn.execute(sql, [batch])
+                conn.execute(RECORD_ARCHIVE_SQL, [os.path.basename(path), table.name, ids[0], ids[-1], deleted])
+            archived += deleted
+            with self._lock:
+                self.stats_counters["files"] += 1
+
+    def _write_archive(self, table_name: str, columns: List[str], rows: List) -> str:
+        path = os.path.join(self.archive_dir, f"{table_name}-{rows[0][0]:012d}-{rows[-1][0]:012d}.jsonl.gz")
+        partial = path + ".tmp"
+        with open(partial, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                for row in rows:
+                    archive.write(json.dumps(dict(zip(columns, row)), default=str).encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(partial, path)
+        return path
+
+    def remove_orphans(self) -> int:
+        """Delete archive files whose batch never committed; their rows are still in the database"""
+        with self.db.connection() as conn:
+            recorded = {row[0] for row in conn.execute("SELECT file FROM retention_archives")}
+        removed = 0
+        for table in (TASKS, DECISIONS):
+            for path in glob.glob(os.path.join(self.archive_dir, f"{table.name}-*.jsonl.gz*")):
+                if os.path.basename(path) not in recorded:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def vacuum(self) -> int:
+        """Return free pages to the filesystem, `vacuum_pages` per transaction; returns pages freed"""
+        freed = 0
+        with self.db.connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL:
+                return 0
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            while free:
+                # executescript steps the pragma to completion; execute() would free one page
+                conn.executescript(f"PRAGMA incremental_vacuum({min(free, self.vacuum_pages)})")
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if remaining >= free:
+                    break
+                freed += free - remaining
+                free = remaining
+            # Lets the file shrink without waiting on readers
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return freed
+
+    def convert(self) -> bool:
+        """
+        Switch an existing file to incremental auto-vacuum. This rebuilds
+        the whole file under an exclusive lock, so it is an offline step.
+        """
+        with self.db.connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == INCREMENTAL:
+                return False
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats_counters)
+            stats["last_run"] = self.last_run
+        stats["task_days"] = self.task_days
+        stats["decision_days"] = self.decision_days
+        return stats
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    db_path = args[0] if args else "agentic_reminders.db"
+    archive_dir = args[1] if len(args) > 1 else os.environ.get('RETENTION_ARCHIVE_DIR', 'archive')
+
+    db = ConnectionManager(db_path)
+    with db.connection() as conn:
+        migrate(conn)
+    retention = Retention(
+        db, archive_dir,
+        task_days=float(os.environ.get('RETENTION_TASK_DAYS', 365)),
+        decision_days=float(os.environ.get('RETENTION_DECISION_DAYS', 90))
+    )
+    if "--convert" in sys.argv:
+        print("Converted to incremental auto-vacuum" if retention.convert() else "Already incremental")
+    result = retention.run()
+    db.close()
+    print(f"Archived {result['tasks']} tasks and {result['decisions']} decisions to {archive_dir}, "
+          f"freed {result['pages_freed']} pages in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+from cache_versions import CacheVersions
+from db import ConnectionManager
+
+# Hour-of-week slots, Monday 00:00 = 0
+SLOTS = 7 * 24
+
+SLOT_OUTCOMES_SQL = '''
+    SELECT slot, completed, missed FROM user_slot_outcomes
+    WHERE email = ?
+'''
+
+RECORD_SLOT_OUTCOME_SQL = '''
+    INSERT INTO user_slot_outcomes (email, slot, completed, missed)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (email, slot) DO UPDATE SET
+        completed = completed + excluded.completed,
+        missed = missed + excluded.missed
+'''
+
+# Served by the partial pending index
+PENDING_TIMES_SQL = '''
+    SELECT scheduled_time FROM user_behavior
+    WHERE email = ? AND scheduled_time >= ? AND scheduled_time < ? AND completion_status IS NULL
+'''
+
+# Weight, in pseudo-outcomes, of the user's overall completion rate in every slot's prior
+PRIOR_STRENGTH = 2.0
+
+# Posterior standard deviation of a slot nobody has seen (Beta(1, 1)); confidence is measured against it
+UNIFORM_STD = np.sqrt(1 / 12)
+
+# A preferred time is kept unless another slot that day scores at least this much better
+KEEP_PREFERRED_MARGIN = 0.05
+
+HOUR = timedelta(hours=1)
+
+
+def slot_of(when: datetime) -> int:
+    return when.weekday() * 24 + when.hour
+
+
+class SlotPosterior:
+    """
+    Completion probability per hour-of-week slot for one user: a Beta
+    posterior per slot whose prior is centred on the user's overall
+    completion rate.
+    """
+
+    def __init__(self, completed: np.ndarray, missed: np.ndarray):
+        self.completed = completed
+        self.missed = missed
+        self.outcomes = int(completed.sum() + missed.sum())
+        rate = (completed.sum() + 1) / (self.outcomes + 2)
+        alpha = 1 + PRIOR_STRENGTH * rate + completed
+        beta = 1 + PRIOR_STRENGTH * (1 - rate) + missed
+        total = alpha + beta
+        self.mean = alpha / total
+        self.std = np.sqrt(alpha * beta / (total * total * (total + 1)))
+        # Slots are ranked by a lower credible bound, so one lucky outcome does not beat a steady record
+        self.score = self.mean - self.std
+        # Two weeks back to back, so any window of up to a week is one slice
+        self._scores_wrapped = np.concatenate([self.score, self.score])
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[int, int, int]]) -> "SlotPosterior":
+        completed = np.zeros(SLOTS)
+        missed = np.zeros(SLOTS)
+        for slot, c, m in rows:
+            completed[slot] = c
+            missed[slot] = m
+        return cls(completed, missed)
+
+    def with_outcomes(self, outcomes: List[Tuple[int, bool]]) -> "SlotPosterior":
+        """A new posterior with more (slot, completed) outcomes; this one is left untouched for concurrent readers"""
+        completed = self.completed.copy()
+        missed = self.missed.copy()
+        for slot, done in outcomes:
+            (completed if done else missed)[slot] += 1
+        return SlotPosterior(completed, missed)
+
+    def confidence(self, slot: int) -> float:
+        return min(max(1 - float(self.std[slot]) / UNIFORM_STD, 0.0), 1.0)
+
+    def best_slot(self, first: datetime, hours: int, taken: np.ndarray) -> Optional[int]:
+        """Offset, in hours from `first`, of the best slot within a week not marked in `taken`"""
+        start = slot_of(first)
+        scores = self._scores_wrapped[start:start + hours].copy()
+        scores[taken] = -np.inf
+        best = int(scores.argmax())
+        return None if scores[best] == -np.inf else best
+
+
+class SlotModel:
+    """
+    Answers "when should this task go" from each user's recorded outcomes,
+    in-process. Posteriors are cached per user and cache version: loaded
+    on first use, then carried forward in memory as this process records
+    outcomes, and reloaded once another process has written.
+    """
+
+    def __init__(self, db: ConnectionManager, min_confidence: float = 0.6, horizon_hours: int = SLOTS,
+                 cache_size: int = 4096, ttl: float = 3600.0):
+        self.db = db
+        self.min_confidence = min_confidence
+        self.horizon_hours = min(horizon_hours, SLOTS)
+        self.versions = CacheVersions(db)
+        self.posteriors = TTLCache(max_size=cache_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self.stats_counters = {"answered": 0, "deferred": 0, "no_history": 0}
+
+    def record(self, conn, outcomes: List[Tuple[str, datetime, bool]]):
+        """
+        Count (email, scheduled_time, completed) outcomes inside the caller's
+        transaction, one upsert per slot; call observe() after it commits
+        """
+        counts = {}
+        for email, scheduled_time, completed in outcomes:
+            slot_counts = counts.setdefault((email, slot_of(scheduled_time)), [0, 0])
+            slot_counts[0 if completed else 1] += 1
+        conn.executemany(RECORD_SLOT_OUTCOME_SQL, [(*key, c, m) for key, (c, m) in counts.items()])
+
+    def observe(self, email: str, outcomes: List[Tuple[datetime, bool]], version: int):
+        """
+        Carry a user's cached posterior forward with committed (scheduled_time,
+        completed) outcomes, written at cache version `version`. Only the
+        posterior of the version just before is complete without reloading.
+        """
+        cached = self.posteriors.get((email, version - 1))
+        if cached is not None:
+            self.posteriors.set((email, version),
+                                cached.with_outcomes([(slot_of(when), done) for when, done in outcomes]))
+
+    def posterior(self, email: str) -> SlotPosterior:
+        cached = self.posteriors.get((email, self.versions.current(email)))
+        if cached is not None:
+            return cached
+        with self.db.connection() as conn:
+            # One snapshot, so observe() can carry the posterior forward without counting an outcome twice
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            version = self.versions.current(email)
+            posterior = SlotPosterior.from_rows(conn.execute(SLOT_OUTCOMES_SQL, [email]).fetchall())
+        self.posteriors.set((email, version), posterior)
+        return posterior
+
+    def suggest(self, email: str, user_preferred_time: str = None, now: datetime = None) -> Optional[Dict]:
+        """
+        Best open slot as a time suggestion, or None without any recorded
+        outcomes. The suggestion's confidence says whether to trust it.
+        A preferred time pins the day and is kept when it is about as good.
+        """
+        posterior = self.posterior(email)
+        if not posterior.outcomes:
+            self._count("no_history")
+            return None
+
+        now = now or datetime.now()
+        first = now.replace(minute=0, second=0, microsecond=0) + HOUR
+        hours = self.horizon_hours
+        preferred = None
+        if user_preferred_time:
+            try:
+                preferred = datetime.strptime(user_preferred_time, '%Y-%m-%d %H:%M')
+            except ValueError:
+                pass
+        if preferred is not None and preferred > now:
+            day_start = preferred.replace(hour=0, minute=0)
+            first = max(first, day_start)
+            hours = int((day_start + timedelta(days=1) - first) / HOUR)
+
+        best = posterior.best_slot(first, hours, self._taken(email, first, hours)) if hours > 0 else None
+        if best is None:
+            self._count("deferred")
+            return None
+        suggested = first + best * HOUR
+        slot = slot_of(suggested)
+
+        if preferred is not None:
+            preferred_slot = slot_of(preferred)
+            if posterior.score[preferred_slot] >= posterior.score[slot] - KEEP_PREFERRED_MARGIN:
+                suggested, slot = preferred, preferred_slot
+
+        confidence = posterior.confidence(slot)
+        self._count("answered" if confidence >= self.min_confidence else "deferred")
+        return {
+            "suggested_time": suggested.strftime('%Y-%m-%d %H:%M'),
+            "reasoning": f"You complete about {posterior.mean[slot]:.0%} of tasks scheduled "
+                         f"{suggested.strftime('%A')}s around {suggested.hour}:00",
+            "confidence": confidence
+        }
+
+    def _taken(self, email: str, first: datetime, hours: int) -> np.ndarray:
+        """Slots in the window that already hold one of the user's pending tasks"""
+        taken = np.zeros(hours, dtype=bool)
+        with self.db.connection() as conn:
+            rows = conn.execute(PENDING_TIMES_SQL, [email, first, first + hours * HOUR]).fetchall()
+        for (scheduled_time,) in rows:
+            when = scheduled_time if isinstance(scheduled_time, datetime) else datetime.fromisoformat(scheduled_time)
+            offset = int((when - first) / HOUR)
+            if 0 <= offset < hours:
+                taken[offset] = True
+        return taken
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats_counters[name] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats_counters)
+        stats["min_confidence"] = self.min_confidence
+        stats["posteriors"] = self.posteriors.stats()
+        return stats
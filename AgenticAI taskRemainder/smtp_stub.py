@@ -0,0 +1,90 @@
+import socketserver
+import threading
+import time
+from typing import Dict
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib/yagmail to deliver plain messages"""
+
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost SMTP stand-in")
+        sent_here = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command.startswith("RCPT"):
+                recipient = command.partition("<")[2].partition(">")[0].lower()
+                with server.lock:
+                    server.recipient_attempts[recipient] = server.recipient_attempts.get(recipient, 0) + 1
+                self.reply(server.rejections.get(recipient, "250 OK"))
+            elif command.startswith(("HELO", "MAIL", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                recipients_data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    recipients_data.append(data_line)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.messages.append(b"".join(recipients_data))
+                self.reply("250 Queued")
+                sent_here += 1
+                # Optionally drop the connection to exercise reconnects
+                if server.drop_after and sent_here >= server.drop_after:
+                    return
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    In-process SMTP stand-in for tests and benchmarks. Records every message,
+    can add per-message latency, can drop connections after N messages and
+    can refuse recipients with the reply given for them in `rejections`.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, drop_after: int = 0, rejections: Dict[str, str] = None):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.rejections = {address.lower(): reply for address, reply in (rejections or {}).items()}
+        self.recipient_attempts = {}
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
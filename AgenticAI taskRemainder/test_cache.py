@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from datetime import datetime
+
+from cache import TTLCache
+from agentic_ai_agent import AgenticReminderAgent
+from test_llm_cache import make_agent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_size=2, ttl=10, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "a" is now most recently used
+    cache.set("c", 3)                   # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None       # expired
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["evictions"] == 1
+
+
+def test_invalidation_during_compute_is_not_cached():
+    cache = TTLCache()
+
+    def compute():
+        cache.invalidate("user")        # a write lands while we are reading
+        return "stale"
+
+    assert cache.get_or_compute("user", compute) == "stale"
+    assert cache.get("user") is None
+
+
+def test_agent_pattern_cache_is_invalidated_on_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "cache.db"))
+        email = "user@example.com"
+
+        assert agent.analyze_user_patterns(email)["patterns"] == "new_user"
+        assert agent.analyze_user_patterns(email)["patterns"] == "new_user"
+        assert agent.pattern_cache.stats()["hits"] == 1
+
+        agent.record_task(email, "write report", datetime(2025, 5, 5, 9, 0))
+        patterns = agent.analyze_user_patterns(email)
+        assert patterns["total_tasks"] == 1
+
+        # Returned dicts are copies of the cached entry
+        patterns["preferred_hours"].append(23)
+        assert agent.analyze_user_patterns(email)["preferred_hours"] == [9]
+
+        agent.learn_from_outcome(email, "write report", "completed")
+        assert agent.analyze_user_patterns(email)["completion_rate"] == 1.0
+        agent.db.close()
+
+
+def test_writes_from_another_worker_process_are_seen():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Two agents on one database file stand in for two worker processes
+        reader, completions = make_agent(tmp, {"productivity_score": 0.5})
+        writer = AgenticReminderAgent("test-key", reader.db_path)
+        email = "user@example.com"
+        writer.record_task(email, "write report", datetime(2025, 5, 5, 9, 0))
+        writer.learn_from_outcome(email, "write report", "completed")
+
+        assert reader.analyze_user_patterns(email)["total_tasks"] == 1
+        posterior = reader.slot_model.posterior(email)
+        assert posterior.outcomes == 1
+        reader.get_productivity_insights(email)
+        # Served from the reader's memory while nothing changes
+        reader.get_productivity_insights(email)
+        assert completions.calls == 1
+        assert reader.slot_model.posterior(email) is posterior
+
+        writer.record_task(email, "file taxes", datetime(2025, 5, 6, 18, 0))
+        writer.learn_from_outcome(email, "file taxes", "missed")
+        assert reader.analyze_user_patterns(email)["total_tasks"] == 2
+        assert reader.slot_model.posterior(email).outcomes == 2
+        reader.get_productivity_insights(email)
+        assert completions.calls == 2
+        writer.db.close()
+        reader.db.close()
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_ttl()
+    test_invalidation_during_compute_is_not_cached()
+    test_agent_pattern_cache_is_invalidated_on_writes()
+    test_writes_from_another_worker_process_are_seen()
+    print("✅ Cache tests passed")
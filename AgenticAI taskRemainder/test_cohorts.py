@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agentic_ai_agent import AgenticReminderAgent
+from cohorts import CohortModel, load_cohort_model, train_cohort_model
+from test_llm_gateway import FailingClient
+
+# Early birds, afternoon workers and night owls
+HABITS = (8, 14, 20)
+
+
+def populate(agent, rng, users_per_habit=20, tasks_per_user=15):
+    start = datetime(2025, 1, 6)
+    tasks = []
+    for habit in HABITS:
+        for u in range(users_per_habit):
+            for t in range(tasks_per_user):
+                hour = habit if rng.random() < 0.8 else rng.randrange(24)
+                tasks.append((f"h{habit}-{u}@example.com", f"task {t}",
+                              start + timedelta(days=rng.randrange(60), hours=hour)))
+    agent.record_tasks(tasks)
+
+
+def test_cohorts_give_new_and_sparse_users_a_prior():
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "cohorts.db"))
+        assert agent.cohorts is None
+        assert agent.cohort_prior("new@example.com", agent.analyze_user_patterns("new@example.com")) is None
+
+        # Too few users with history to train on
+        assert train_cohort_model(agent.db, n_cohorts=3) is None
+
+        populate(agent, rng)
+        model = train_cohort_model(agent.db, n_cohorts=3, min_tasks=10, chunk_size=16)
+        assert sorted(hours[0] for hours in model.best_hours) == list(HABITS)
+        assert model.sizes.sum() == 60
+
+        path = os.path.join(tmp, "cohorts.joblib")
+        model.save(path)
+        agent.cohorts = load_cohort_model(path)
+        assert agent.cohorts.best_hours == model.best_hours
+
+        # A sparse night owl lands in the night cohort
+        agent.record_tasks([("owl@example.com", "late task", datetime(2025, 3, 3, 20, 0)),
+                            ("owl@example.com", "later task", datetime(2025, 3, 4, 21, 0))])
+        prior = agent.cohort_prior("owl@example.com", agent.analyze_user_patterns("owl@example.com"))
+        assert prior["best_hours"][0] == 20
+
+        # A brand-new user gets the largest cohort; established users get no prior
+        new_prior = agent.cohort_prior("new@example.com", agent.analyze_user_patterns("new@example.com"))
+        assert new_prior["cohort"] == int(np.argmax(model.sizes))
+        assert agent.cohort_prior("h8-0@example.com", agent.analyze_user_patterns("h8-0@example.com")) is None
+
+        # Without the LLM, the cohort's best hour replaces the 9 AM default
+        agent.client = FailingClient()
+        suggestion = agent.suggest_optimal_time("owl@example.com", "review notes")
+        assert suggestion["suggested_time"].endswith("20:00")
+        assert suggestion["confidence"] == 0.6
+
+        # Assignment is a NumPy nearest-centre lookup
+        hours = np.zeros(24)
+        hours[20] = 2
+        start = time.perf_counter()
+        for _ in range(1000):
+            agent.cohorts.prior(hours, np.ones(7), 0.5)
+        assert (time.perf_counter() - start) / 1000 < 0.001
+
+        # Incremental update continues from the loaded centres
+        populate(agent, random.Random(6), users_per_habit=5)
+        updated = train_cohort_model(agent.db, model=load_cohort_model(path), min_tasks=10)
+        assert isinstance(updated, CohortModel)
+        assert sorted(hours[0] for hours in updated.best_hours) == list(HABITS)
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_cohorts_give_new_and_sparse_users_a_prior()
+    print("✅ Cohort model tests passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+
+from db import ConnectionManager
+
+
+def test_connection_pool():
+    """Connections are long-lived, tuned and shared by nested calls"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, "pool.db"), pool_size=2)
+
+        with db.connection() as conn:
+            conn.execute("CREATE TABLE items (value INTEGER)")
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+            # Nested blocks on the same thread share the outer transaction
+            with db.connection() as inner:
+                assert inner is conn
+                inner.execute("INSERT INTO items VALUES (1)")
+            assert conn.in_transaction
+
+        # The outermost block committed and returned the connection
+        with db.connection() as again:
+            assert again is conn
+            assert again.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+        # A failing block rolls back
+        try:
+            with db.connection() as conn:
+                conn.execute("INSERT INTO items VALUES (2)")
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+        # Worker threads draw from the same bounded pool
+        seen = []
+
+        def worker():
+            with db.connection() as conn:
+                seen.append(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert seen == [1] * 8
+        assert db._created <= 2
+        db.close()
+
+
+if __name__ == "__main__":
+    test_connection_pool()
+    print("✅ Connection pool test passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from agentic_ai_agent import AgenticReminderAgent
+from decision_log import DecisionLog
+
+
+def stored_decisions(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT email, decision_type, action_taken FROM agent_decisions ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_decisions_are_written_behind_in_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "decisions.db"))
+        log = DecisionLog(agent.db, batch_size=50, interval=0.05)
+        log.start()
+        for i in range(120):
+            log.log("user@example.com", "task_scheduling", "because", {"task": i, "breaks": []})
+        # Nothing is waited on by the callers, but the writer catches up within the interval
+        deadline = time.monotonic() + 5
+        while log.stats()["written"] < 120 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = log.stats()
+        assert stats["written"] == 120 and stats["queued"] == 0
+        assert stats["batches"] < 120
+
+        # Whatever is still queued is written on stop
+        log.interval = 60
+        for i in range(120, 130):
+            log.log("user@example.com", "reminder_sent", "because", {"subject": f"task {i}"})
+        log.stop()
+        rows = stored_decisions(agent.db_path)
+        assert [json.loads(action).get("task", i) for i, (_, _, action) in enumerate(rows)] == list(range(130))
+        assert json.loads(rows[-1][2]) == {"subject": "task 129"}
+
+        # Stopped, the log writes straight through
+        log.log("user@example.com", "task_scheduling", "because", {"task": 130})
+        assert len(stored_decisions(agent.db_path)) == 131
+        agent.db.close()
+
+
+def test_full_queue_blocks_until_the_writer_catches_up():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "decisions.db"))
+        # Batches larger than the queue and a long interval keep the writer waiting
+        log = DecisionLog(agent.db, max_queue=5, batch_size=10, interval=60)
+        log.start()
+        for i in range(5):
+            log.log("user@example.com", "task_scheduling", "because", {"task": i})
+
+        producer = threading.Thread(
+            target=log.log, args=("user@example.com", "task_scheduling", "because", {"task": 5}))
+        producer.start()
+        producer.join(0.2)
+        assert producer.is_alive()
+        assert log.stats()["blocked"] == 1 and log.backlog() == 5
+
+        # Flushing makes room; the producer's record may go out in the same flush
+        assert log.flush() >= 5
+        producer.join(5)
+        assert not producer.is_alive()
+        log.stop()
+        assert len(stored_decisions(agent.db_path)) == 6
+        agent.db.close()
+
+
+def test_agent_stores_decisions_as_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "decisions.db"))
+        agent._log_decision("user@example.com", "task_scheduling", "because",
+                            {"optimal_time": "2025-01-06 09:00", "confidence": 0.8, "suggested_breaks": []})
+        [(_, _, action)] = stored_decisions(agent.db_path)
+        assert json.loads(action)["confidence"] == 0.8
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_decisions_are_written_behind_in_batches()
+    test_full_queue_blocks_until_the_writer_catches_up()
+    test_agent_stores_decisions_as_json()
+    print("✅ Decision log tests passed")
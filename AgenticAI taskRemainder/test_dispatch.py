@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import smtplib
+import time
+
+import pytest
+import yagmail
+
+from dispatch import SMTPPool, ReminderDispatcher
+from smtp_stub import LocalSMTPServer
+
+
+def make_pool(server, size=2):
+    return SMTPPool(lambda: yagmail.SMTP("agent@example.com", host="127.0.0.1", port=server.port,
+                                         smtp_ssl=False, smtp_starttls=False, smtp_skip_login=True), size=size)
+
+
+def generate(email, task_names):
+    return f"{len(task_names)} reminder(s)", "\n".join(task_names)
+
+
+def test_pool_reuses_and_reconnects():
+    with LocalSMTPServer(drop_after=3) as server:
+        pool = make_pool(server, size=1)
+        for i in range(7):
+            pool.send("user@example.com", "subject", f"body {i}")
+        pool.close()
+
+        assert len(server.messages) == 7
+        # One connection per three messages, replaced when the server drops it
+        assert server.connections == 3
+        assert pool.reconnects == 2
+
+
+def test_permanent_rejections_are_not_retried():
+    rejections = {"gone@example.com": "550 5.1.1 No such user", "busy@example.com": "451 4.3.0 Try again later"}
+    with LocalSMTPServer(rejections=rejections) as server:
+        pool = make_pool(server, size=1)
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send("gone@example.com", "subject", "body")
+        # The connection survives a rejection
+        pool.send("user@example.com", "subject", "body")
+        assert server.recipient_attempts["gone@example.com"] == 1
+        assert server.connections == 1 and pool.reconnects == 0
+
+        # A transient refusal is retried once on a fresh connection
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send("busy@example.com", "subject", "body")
+        pool.close()
+        assert server.recipient_attempts["busy@example.com"] == 2
+        assert pool.reconnects == 1 and len(server.messages) == 1
+
+
+def test_reminders_in_one_window_are_coalesced_into_digests():
+    with LocalSMTPServer() as server:
+        sent = []
+        dispatcher = ReminderDispatcher(make_pool(server), generate, on_sent=lambda r, subject: sent.append(r),
+                                        window=0.2, digest=True)
+        dispatcher.start()
+        for i in range(6):
+            dispatcher.submit(f"user{i % 2}@example.com", f"task {i}", i)
+
+        deadline = time.monotonic() + 5
+        while len(sent) < 6 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        dispatcher.stop()
+
+        assert sorted(r.task_id for r in sent) == list(range(6))
+        assert len(server.messages) == 2
+        stats = dispatcher.stats()
+        assert stats["emails"] == 2 and stats["sent"] == 6 and stats["batches"] == 1
+
+
+if __name__ == "__main__":
+    test_pool_reuses_and_reconnects()
+    test_permanent_rejections_are_not_retried()
+    test_reminders_in_one_window_are_coalesced_into_digests()
+    print("✅ Dispatch tests passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from agentic_ai_agent import AgenticReminderAgent
+from ingest import BulkTaskIngest, read_rows
+from llm_stub import LatencyStubClient
+
+NOW = datetime(2025, 1, 15, 10, 0)
+
+
+def make_ingest(tmp, scheduled, chunk_size=3):
+    agent = AgenticReminderAgent("test-key", os.path.join(tmp, "ingest.db"))
+    agent.client = LatencyStubClient(median_latency=0.001)
+    ingest = BulkTaskIngest(agent, lambda reminders: scheduled.append(list(reminders)),
+                            chunk_size=chunk_size, clock=lambda: NOW)
+    return agent, ingest
+
+
+def test_jsonl_upload_is_stored_scheduled_and_reported_per_row():
+    lines = [
+        {"email": "a@example.com", "task": "Write report", "reminder_time": "2025-01-16 09:00"},
+        {"email": "a@example.com", "task": "Call bank", "reminder_time": "2025-01-16T14:30"},
+        {"email": "b@example.com", "task_name": "Gym", "time": "2025-01-17 18:00:00"},
+        {"email": "b@example.com", "task": "Old task", "reminder_time": "2025-01-01 09:00"},
+        {"email": "c@example.com", "task": "Bad time", "reminder_time": "next tuesday-ish"},
+        {"email": "c@example.com", "reminder_time": "2025-01-20 09:00"},
+        {"email": "c@example.com", "task": "Plan week", "reminder_time": "2025-01-20 09:00"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines[:4]) + "\n{not json\n" + \
+        "\n".join(json.dumps(line) for line in lines[4:]) + "\n"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduled = []
+        agent, ingest = make_ingest(tmp, scheduled)
+        results = list(ingest.run(read_rows(io.BytesIO(body.encode()), "application/x-ndjson")))
+
+        summary = results.pop()["summary"]
+        assert [r["row"] for r in results] == list(range(1, 9))
+        assert [r["status"] for r in results] == ["scheduled", "scheduled", "scheduled", "error",
+                                                  "error", "error", "error", "scheduled"]
+        assert "future" in results[3]["error"] and "JSON" in results[4]["error"]
+        assert "format" in results[5]["error"] and "provide" in results[6]["error"]
+        assert summary == {"rows": 8, "scheduled": 4, "failed": 4, "users": 3}
+
+        # One bulk registration per chunk, carrying the stored task ids
+        task_ids = [r["task_id"] for r in results if r["status"] == "scheduled"]
+        assert [task_id for chunk in scheduled for *_, task_id in chunk] == task_ids
+        assert len(scheduled) == 2
+
+        with agent.db.connection() as conn:
+            stored = conn.execute("SELECT id, task_name FROM user_behavior ORDER BY id").fetchall()
+            decisions = conn.execute(
+                "SELECT COUNT(*) FROM agent_decisions WHERE decision_type = 'bulk_scheduling'").fetchone()[0]
+        assert [row[0] for row in stored] == task_ids
+        assert [row[1] for row in stored] == ["Write report", "Call bank", "Gym", "Plan week"]
+        # One decision per user, not per task
+        assert decisions == 3
+
+        patterns = agent.analyze_user_patterns("a@example.com")
+        assert patterns["total_tasks"] == 2
+        agent.db.close()
+
+
+def test_csv_upload():
+    body = "email,task_name,reminder_time\nd@example.com,Standup,2025-01-16 09:30\nd@example.com,,2025-01-16 10:00\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduled = []
+        agent, ingest = make_ingest(tmp, scheduled, chunk_size=100)
+        results = list(ingest.run(read_rows(io.BytesIO(body.encode()), "text/csv")))
+
+        assert [r.get("status") for r in results[:2]] == ["scheduled", "error"]
+        assert results[0]["scheduled_time"] == "2025-01-16 09:30"
+        assert results[-1]["summary"]["scheduled"] == 1
+        agent.db.close()
+
+
+def test_jsonl_rows_with_non_string_fields_are_row_errors():
+    lines = [
+        json.dumps({"email": "e@example.com", "task_name": 5, "reminder_time": "2025-01-16 09:00"}),
+        json.dumps({"email": "e@example.com", "task": "Stretch", "time": []}),
+        json.dumps({"email": "e@example.com", "task": "Stretch", "time": "2025-01-16 09:00"}),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduled = []
+        agent, ingest = make_ingest(tmp, scheduled)
+        results = list(ingest.run(read_rows(io.BytesIO("\n".join(lines).encode()), "application/x-ndjson")))
+
+        assert [r.get("status") for r in results[:3]] == ["error", "error", "scheduled"]
+        assert results[0]["error"] == "Field task_name must be a string"
+        assert results[1]["error"] == "Field reminder_time must be a string"
+        assert results[-1]["summary"] == {"rows": 3, "scheduled": 1, "failed": 2, "users": 1}
+        agent.db.close()
+
+
+def test_jsonl_row_numbers_count_blank_lines():
+    good = json.dumps({"email": "f@example.com", "task": "Read", "time": "2025-01-16 09:00"})
+    body = f"{good}\n\n   \n{{not json\n\n{good}\n"
+    rows = list(read_rows(io.BytesIO(body.encode()), "application/x-ndjson"))
+    assert [(number, error is None) for number, _, error in rows] == [(1, True), (4, False), (6, True)]
+
+
+if __name__ == "__main__":
+    test_jsonl_upload_is_stored_scheduled_and_reported_per_row()
+    test_csv_upload()
+    test_jsonl_rows_with_non_string_fields_are_row_errors()
+    test_jsonl_row_numbers_count_blank_lines()
+    print("✅ Bulk ingestion tests passed")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import time
+
+from agentic_ai_agent import AgenticReminderAgent
+from llm_gateway import LLMGateway
+from llm_stub import LatencyStubClient
+from test_llm_gateway import FailingClient
+
+INSIGHTS_PROMPT = [{"role": "user", "content": "provide actionable insights"}]
+
+
+def test_gateway_streams_deltas_and_tracks_health():
+    gateway = LLMGateway(LatencyStubClient())
+    deltas = list(gateway.stream(model="m", messages=INSIGHTS_PROMPT))
+    assert len(deltas) > 1
+    assert json.loads("".join(deltas))["productivity_score"] == 0.7
+    assert gateway.stats()["successes"] == 1
+
+    gateway.client = FailingClient()
+    try:
+        list(gateway.stream(model="m", messages=INSIGHTS_PROMPT))
+        assert False, "expected the client error"
+    except RuntimeError:
+        pass
+    assert gateway.stats()["failures"] == 1
+
+
+def test_insights_stream_starts_before_the_llm_answers():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "insights.db"))
+        agent.client = LatencyStubClient(median_latency=0.4, sigma=0.01)
+
+        start = time.perf_counter()
+        events = agent.stream_productivity_insights("user@example.com")
+        first_event, preliminary = next(events)
+        assert time.perf_counter() - start < 0.1
+        assert first_event == "preliminary" and "productivity_score" in preliminary
+
+        rest = list(events)
+        assert {event for event, _ in rest[:-1]} == {"token"}
+        assert rest[-1] == ("insights", json.loads("".join(data for _, data in rest[:-1])))
+
+        # The completed answer is cached: the next dashboard gets it in one event
+        assert list(agent.stream_productivity_insights("user@example.com")) == [rest[-1]]
+        assert agent.get_productivity_insights("user@example.com") == rest[-1][1]
+        assert agent.client.calls == 1
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_gateway_streams_deltas_and_tracks_health()
+    test_insights_stream_starts_before_the_llm_answers()
+    print("✅ Insight streaming tests passed")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+import time
+
+from db import ConnectionManager
+from jobs import TaskJobs, QueueFull, UserLimitReached
+from migrations import migrate
+
+
+def gated_run(gate, ran):
+    """A task run that waits for the gate and fails on request"""
+    def run(email, task_name=None, fail=False):
+        gate.wait(5)
+        ran.append((email, task_name))
+        if fail:
+            raise ValueError("Reminder time must be in the future.")
+        return {"task": task_name, "confirmation": f"Scheduled {task_name}"}
+    return run
+
+
+def make_db(tmp):
+    db = ConnectionManager(os.path.join(tmp, "jobs.db"))
+    with db.connection() as conn:
+        migrate(conn)
+    return db
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_submit_returns_at_once_and_long_poll_gets_the_result():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        gate = threading.Event()
+        jobs = TaskJobs(db, gated_run(gate, []), workers=2)
+        jobs.start()
+
+        started = time.perf_counter()
+        job = jobs.submit("user@example.com", task_name="water plants")
+        failing = jobs.submit("user@example.com", task_name="file taxes", fail=True)
+        assert time.perf_counter() - started < 0.1
+        assert job["status"] == "queued"
+
+        # A long poll on an unfinished job comes back as it stands after the wait
+        assert jobs.wait(job["job_id"], 0.05)["status"] == "running"
+        gate.set()
+        done = jobs.wait(job["job_id"], 2)
+        assert done["status"] == "done" and done["result"]["confirmation"] == "Scheduled water plants"
+        failed = jobs.wait(failing["job_id"], 2)
+        assert failed["status"] == "failed" and failed["error"] == "Reminder time must be in the future."
+        assert jobs.get("no-such-job") is None
+
+        jobs.stop()
+        stats = jobs.stats()
+        assert (stats["submitted"], stats["done"], stats["failed"], stats["in_progress"]) == (2, 1, 1, 0)
+        db.close()
+
+
+def test_queue_and_per_user_limits():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        gate = threading.Event()
+        ran = []
+        jobs = TaskJobs(db, gated_run(gate, ran), workers=1, max_queue=2, per_user=2, result_ttl=0)
+        jobs.start()
+
+        first = jobs.submit("a@example.com", task_name="a1")
+        wait_until(lambda: jobs.stats()["queued"] == 0)
+        jobs.submit("a@example.com", task_name="a2")
+        try:
+            jobs.submit("a@example.com", task_name="a3")
+            assert False, "expected UserLimitReached"
+        except UserLimitReached:
+            pass
+        jobs.submit("b@example.com", task_name="b1")
+        try:
+            jobs.submit("c@example.com", task_name="c1")
+            assert False, "expected QueueFull"
+        except QueueFull:
+            pass
+        assert jobs.backlog() == 2 and jobs.get(first["job_id"])["status"] == "running"
+
+        # Stopping finishes what was accepted, then takes no more
+        gate.set()
+        jobs.stop()
+        assert ran == [("a@example.com", "a1"), ("a@example.com", "a2"), ("b@example.com", "b1")]
+        try:
+            jobs.submit("c@example.com", task_name="c1")
+            assert False, "expected QueueFull"
+        except QueueFull:
+            pass
+        stats = jobs.stats()
+        assert (stats["queue_full"], stats["user_limit"], stats["done"]) == (2, 1, 3)
+
+        # Without workers a job runs inline; finished jobs are dropped after the result TTL
+        inline = TaskJobs(db, gated_run(gate, ran), result_ttl=0)
+        earlier = inline.submit("a@example.com", task_name="a4")
+        assert earlier["status"] == "done"
+        inline.submit("a@example.com", task_name="a5")
+        assert inline.get(earlier["job_id"]) is None
+        with db.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM task_jobs").fetchone()[0] == 1
+        db.close()
+
+
+def test_jobs_are_shared_by_worker_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Two app processes: separate pools and connections over one database file
+        first_db, second_db = make_db(tmp), make_db(tmp)
+        gate = threading.Event()
+        first = TaskJobs(first_db, gated_run(gate, []), workers=1, per_user=2)
+        second = TaskJobs(second_db, gated_run(gate, []), workers=1, per_user=2)
+        first.start()
+        second.start()
+
+        job = first.submit("user@example.com", task_name="water plants")
+        # The poll lands on the process that did not accept the job
+        assert second.wait(job["job_id"], 0.05)["status"] in ("queued", "running")
+        # The per-user limit counts the user's jobs in every process
+        other = second.submit("user@example.com", task_name="file taxes")
+        try:
+            first.submit("user@example.com", task_name="call mom")
+            assert False, "expected UserLimitReached"
+        except UserLimitReached:
+            pass
+
+        gate.set()
+        done = second.wait(job["job_id"], 2)
+        assert done["status"] == "done" and done["result"]["task"] == "water plants"
+        assert first.wait(other["job_id"], 2)["result"]["task"] == "file taxes"
+        first.stop()
+        second.stop()
+        assert second.stats()["in_progress"] == 0
+        first_db.close()
+        second_db.close()
+
+
+def test_jobs_of_a_dead_process_fail_after_the_job_timeout():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        now = time.time()
+        # A process died while running this job
+        with db.connection() as conn:
+            conn.execute('''
+                INSERT INTO task_jobs (job_id, email, status, request, submitted_at, started_at, expires_at)
+                VALUES ('stranded', 'user@example.com', 'running', '{}', ?, ?, ?)
+            ''', [now, now, now + 1200])
+
+        jobs = TaskJobs(db, gated_run(threading.Event(), []), per_user=1, job_timeout=600, clock=lambda: now + 30)
+        try:
+            jobs.submit("user@example.com", task_name="call mom")
+            assert False, "expected UserLimitReached"
+        except UserLimitReached:
+            pass
+        assert jobs.get("stranded")["status"] == "running"
+
+        # Past the timeout it fails, so polls end and the user's slot frees up
+        jobs.clock = lambda: now + 601
+        jobs.run = lambda email, **request: {"task": request["task_name"]}
+        assert jobs.submit("user@example.com", task_name="call mom")["status"] == "done"
+        stranded = jobs.get("stranded")
+        assert stranded["status"] == "failed" and "interrupted" in stranded["error"]
+        db.close()
+
+
+if __name__ == "__main__":
+    test_submit_returns_at_once_and_long_poll_gets_the_result()
+    test_queue_and_per_user_limits()
+    test_jobs_are_shared_by_worker_processes()
+    test_jobs_of_a_dead_process_fail_after_the_job_timeout()
+    print("✅ Task job tests passed")
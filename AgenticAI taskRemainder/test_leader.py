@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import email
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import yagmail
+
+from db import ConnectionManager
+from dispatch import SMTPPool, ReminderDispatcher
+from leader import LeaderLease
+from migrations import migrate
+from poller import ReminderPoller
+from smtp_stub import LocalSMTPServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lease_fails_over_after_ttl_and_hands_over_on_release():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, "leader.db"))
+        with db.connection() as conn:
+            migrate(conn)
+        clock = FakeClock()
+        a = LeaderLease(db, "dispatch", ttl=15, renew_interval=5, holder="a", clock=clock)
+        b = LeaderLease(db, "dispatch", ttl=15, renew_interval=5, holder="b", clock=clock)
+
+        assert a.renew() and not b.renew()
+        clock.now += 5
+        assert a.renew() and a.is_leader() and not b.renew()
+
+        # a stops renewing: it stops counting itself leader before b can take over
+        clock.now += 10.5
+        assert not a.is_leader() and not b.renew()
+        clock.now += 5
+        assert b.renew() and b.is_leader() and b.term == 2
+        assert not a.renew() and a.stats()["current_holder"] == "b"
+
+        # A released lease is free at once
+        b.release()
+        assert not b.is_leader() and a.renew() and a.term == 3
+        # Another lease name elects independently
+        assert LeaderLease(db, "retention", ttl=15, renew_interval=5, holder="b", clock=clock).renew()
+        assert a.stats()["elected"] == 2 and a.stats()["lost"] == 1
+        db.close()
+
+
+def make_pool(port):
+    return SMTPPool(lambda: yagmail.SMTP("agent@example.com", host="127.0.0.1", port=port,
+                                         smtp_ssl=False, smtp_starttls=False, smtp_skip_login=True), size=2)
+
+
+def dispatch_worker(db_path, port, stop_path, claim_timeout=300.0, record_delay=0.0):
+    """One app worker process: contends for the lease and sends reminders while it leads"""
+    db = ConnectionManager(db_path)
+    lease = LeaderLease(db, "reminder_dispatch", ttl=1.0, renew_interval=0.25)
+
+    def start_sending(reminders):
+        sending = poller.mark_sending([reminder.task_id for reminder in reminders])
+        return [reminder for reminder in reminders if reminder.task_id in sending]
+
+    def sent(reminder, subject):
+        # Widens the gap between SMTP accepting a message and the send being recorded
+        time.sleep(record_delay)
+        poller.mark_sent(reminder.task_id)
+
+    dispatcher = ReminderDispatcher(
+        make_pool(port),
+        lambda to, task_names: (f"{task_names[0]} from {os.getpid()}", "Time for your task"),
+        on_sent=sent,
+        on_failed=lambda reminder: poller.mark_failed(reminder.task_id),
+        before_send=start_sending,
+        window=0.05
+    )
+    poller = ReminderPoller(db, dispatcher, interval=0.05, claim_timeout=claim_timeout, active=lease.is_leader)
+    lease.start()
+    dispatcher.start()
+    poller.start()
+    # A file rather than an Event: a killed sibling could leave an Event's lock held
+    deadline = time.monotonic() + 60
+    while not os.path.exists(stop_path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    poller.stop()
+    dispatcher.stop()
+    lease.stop()
+    db.close()
+
+
+def wait_until_sent(db_path, task_ids, timeout=30, settled=("sent",)):
+    conn = sqlite3.connect(db_path)
+    deadline = time.monotonic() + timeout
+    marks = ",".join("?" * len(task_ids))
+    statuses = ",".join("?" * len(settled))
+    while conn.execute(f"SELECT COUNT(*) FROM user_behavior WHERE id IN ({marks}) AND reminder_status IN ({statuses})",
+                       [*task_ids, *settled]).fetchone()[0] < len(task_ids):
+        assert time.monotonic() < deadline, "reminders were not all sent"
+        time.sleep(0.05)
+    conn.close()
+
+
+def leader_pid(db_path, timeout=10):
+    conn = sqlite3.connect(db_path)
+    deadline = time.monotonic() + timeout
+    while conn.execute("SELECT COUNT(*) FROM leader_leases WHERE name = 'reminder_dispatch'").fetchone()[0] == 0:
+        assert time.monotonic() < deadline, "no process took the lease"
+        time.sleep(0.05)
+    holder, expires_at = conn.execute(
+        "SELECT holder, expires_at FROM leader_leases WHERE name = 'reminder_dispatch'").fetchone()
+    conn.close()
+    assert expires_at > time.time()
+    return int(holder.split(":")[1])
+
+
+def senders(server, task_ids):
+    """pid that sent each of the given tasks' reminders, for every message received"""
+    with server.lock:
+        subjects = [email.message_from_bytes(message)["Subject"] for message in server.messages]
+    sent = [subject.split(" from ") for subject in subjects]
+    return [(name, int(pid)) for name, pid in sent if name in task_ids]
+
+
+def test_one_process_sends_each_reminder_exactly_once_across_failover():
+    with tempfile.TemporaryDirectory() as tmp, LocalSMTPServer() as server:
+        db_path = os.path.join(tmp, "leader.db")
+        db = ConnectionManager(db_path)
+        with db.connection() as conn:
+            migrate(conn)
+
+        def due_tasks(wave):
+            now = datetime.now().replace(microsecond=0)
+            tasks = [(f"user{i % 4}@example.com", f"{wave}-{i}", now - timedelta(seconds=i)) for i in range(30)]
+            with db.connection() as conn:
+                ids = [conn.execute("INSERT INTO user_behavior (email, task_name, scheduled_time) VALUES (?, ?, ?)",
+                                    task).lastrowid for task in tasks]
+            return ids, {name for _, name, _ in tasks}
+
+        context = multiprocessing.get_context("spawn")
+        stops = [os.path.join(tmp, f"stop-{i}") for i in range(3)]
+        workers = [context.Process(target=dispatch_worker, args=(db_path, server.port, stop)) for stop in stops]
+        for worker in workers:
+            worker.start()
+        by_pid = {worker.pid: (worker, stop) for worker, stop in zip(workers, stops)}
+        try:
+            first_ids, first = due_tasks("first")
+            wait_until_sent(db_path, first_ids)
+            first_leader = leader_pid(db_path)
+            assert {pid for _, pid in senders(server, first)} == {first_leader}
+
+            # The leader dies without releasing its lease; another worker takes over after the TTL
+            by_pid[first_leader][0].kill()
+            second_ids, second = due_tasks("second")
+            wait_until_sent(db_path, second_ids)
+            second_leader = leader_pid(db_path)
+            assert second_leader != first_leader
+            assert {pid for _, pid in senders(server, second)} == {second_leader}
+
+            # A clean shutdown hands the lease over straight away
+            open(by_pid[second_leader][1], "w").close()
+            by_pid[second_leader][0].join(10)
+            third_ids, third = due_tasks("third")
+            wait_until_sent(db_path, third_ids, timeout=10)
+            assert {pid for _, pid in senders(server, third)} - {first_leader, second_leader}
+
+            sent = Counter(name for name, _ in senders(server, first | second | third))
+            assert sent == Counter(first | second | third)
+        finally:
+            for stop in stops:
+                open(stop, "w").close()
+            for worker in workers:
+                worker.join(10)
+                if worker.is_alive():
+                    worker.kill()
+            db.close()
+
+
+def test_a_leader_killed_mid_batch_sends_no_reminder_twice():
+    with tempfile.TemporaryDirectory() as tmp, LocalSMTPServer() as server:
+        db_path = os.path.join(tmp, "leader.db")
+        db = ConnectionManager(db_path)
+        with db.connection() as conn:
+            migrate(conn)
+
+        context = multiprocessing.get_context("spawn")
+        stops = [os.path.join(tmp, f"stop-{i}") for i in range(2)]
+        workers = [context.Process(target=dispatch_worker, args=(db_path, server.port, stop, 2.0, 0.5))
+                   for stop in stops]
+        for worker in workers:
+            worker.start()
+        by_pid = {worker.pid: worker for worker in workers}
+        try:
+            # One leader claims the whole batch
+            first_leader = leader_pid(db_path)
+            now = datetime.now().replace(microsecond=0)
+            tasks = [(f"user{i % 4}@example.com", f"batch-{i}", now - timedelta(seconds=i)) for i in range(30)]
+            with db.connection() as conn:
+                ids = [conn.execute("INSERT INTO user_behavior (email, task_name, scheduled_time) VALUES (?, ?, ?)",
+                                    task).lastrowid for task in tasks]
+            names = {name for _, name, _ in tasks}
+
+            # Killed once SMTP has accepted part of the batch, before those sends are recorded
+            deadline = time.monotonic() + 30
+            while not senders(server, names):
+                assert time.monotonic() < deadline, "the leader sent nothing"
+                time.sleep(0.01)
+            by_pid[first_leader].kill()
+
+            # The survivor sends what the dead leader had only claimed and gives up on what it was sending
+            wait_until_sent(db_path, ids, settled=("sent", "interrupted"))
+            sent = Counter(name for name, _ in senders(server, names))
+            assert max(sent.values()) == 1, sent
+            with db.connection() as conn:
+                status = dict(conn.execute(f"SELECT task_name, reminder_status FROM user_behavior "
+                                           f"WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+            assert {name for name, value in status.items() if value == "sent"} <= set(sent)
+            assert "interrupted" in status.values()
+            second_leader = leader_pid(db_path)
+            assert second_leader != first_leader
+            assert {pid for _, pid in senders(server, names)} == {first_leader, second_leader}
+        finally:
+            for stop in stops:
+                open(stop, "w").close()
+            for worker in workers:
+                worker.join(10)
+                if worker.is_alive():
+                    worker.kill()
+            db.close()
+
+
+if __name__ == "__main__":
+    test_lease_fails_over_after_ttl_and_hands_over_on_release()
+    test_one_process_sends_each_reminder_exactly_once_across_failover()
+    test_a_leader_killed_mid_batch_sends_no_reminder_twice()
+    print("✅ Leader election tests passed")
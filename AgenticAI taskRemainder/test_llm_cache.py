@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+from agentic_ai_agent import AgenticReminderAgent
+
+
+class StubCompletions:
+    """Stands in for client.chat.completions and counts round trips"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=json.dumps(self.reply))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_agent(tmp, reply):
+    agent = AgenticReminderAgent("test-key", os.path.join(tmp, "llm.db"))
+    completions = StubCompletions(reply)
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return agent, completions
+
+
+def test_repeated_prompts_are_served_from_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent, completions = make_agent(tmp, ["Block out the morning", "Prepare notes"])
+
+        first = agent.suggest_task_modifications("user@example.com", "write report", "2025-05-05 09:00")
+        second = agent.suggest_task_modifications("user@example.com", "write report", "2025-05-05 09:00")
+        assert first == second == ["Block out the morning", "Prepare notes"]
+        assert completions.calls == 1
+
+        # A different prompt input misses
+        agent.suggest_task_modifications("user@example.com", "file taxes", "2025-05-05 09:00")
+        assert completions.calls == 2
+        agent.db.close()
+
+
+def test_disk_tier_survives_a_new_process():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent, completions = make_agent(tmp, {"productivity_score": 0.9})
+        agent.get_productivity_insights("user@example.com")
+        agent.db.close()
+
+        # A fresh agent has an empty memory tier but shares the database file
+        agent, completions = make_agent(tmp, {"productivity_score": 0.1})
+        assert agent.get_productivity_insights("user@example.com") == {"productivity_score": 0.9}
+        assert completions.calls == 0
+        assert agent.llm_cache.stats()["disk_hits"] == 1
+        agent.db.close()
+
+
+def test_user_writes_invalidate_cached_responses():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent, completions = make_agent(tmp, {"productivity_score": 0.5})
+        agent.get_productivity_insights("user@example.com")
+        agent.record_task("user@example.com", "write report", datetime(2025, 5, 5, 9, 0))
+        agent.get_productivity_insights("user@example.com")
+        assert completions.calls == 2
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_repeated_prompts_are_served_from_cache()
+    test_disk_tier_survives_a_new_process()
+    test_user_writes_invalidate_cached_responses()
+    print("✅ LLM cache tests passed")
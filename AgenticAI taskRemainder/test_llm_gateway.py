@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from types import SimpleNamespace
+
+from agentic_ai_agent import AgenticReminderAgent, DEFAULT_MODEL
+from llm_gateway import LLMGateway, CircuitBreaker, CircuitOpenError, LatencyBudgetExceeded
+from llm_stub import LatencyStubClient
+from prompts import PLAN_SCHEMA
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingClient:
+    """An OpenAI client whose quota has run out"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise RuntimeError("insufficient_quota")
+
+
+class StatusError(Exception):
+    """Carries the HTTP status like openai.APIStatusError"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class RecordingClient(LatencyStubClient):
+    """Keeps every request; answers with the given HTTP error status, if any"""
+
+    def __init__(self, status_code=None):
+        super().__init__()
+        self.status_code = status_code
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.status_code is not None:
+            raise StatusError(self.status_code)
+        return super().create(**kwargs)
+
+
+def test_breaker_opens_then_half_open_probe_closes_it():
+    clock = FakeClock()
+    client = FailingClient()
+    gateway = LLMGateway(client, breaker=CircuitBreaker(failure_threshold=3, cooldown=30, clock=clock), clock=clock)
+
+    for _ in range(3):
+        try:
+            gateway.create(model="m", messages=[])
+        except RuntimeError:
+            pass
+    assert gateway.breaker.state == "open"
+
+    # While open, calls fail fast without touching the client
+    try:
+        gateway.create(model="m", messages=[])
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert client.calls == 3
+
+    # After the cooldown a single probe goes out; success closes the breaker
+    clock.now = 31
+    assert gateway.breaker.state == "half_open"
+    gateway.client = LatencyStubClient()
+    gateway.create(model="m", messages=[{"role": "user", "content": "hi"}])
+    assert gateway.breaker.state == "closed"
+
+    stats = gateway.stats()
+    assert stats["short_circuited"] == 1 and stats["failures"] == 3 and stats["successes"] == 1
+    assert stats["fallback_rate"] == 0.8
+
+
+def test_latency_budget_limits_calls():
+    clock = FakeClock()
+    gateway = LLMGateway(LatencyStubClient(), timeout=8, clock=clock)
+    with gateway.latency_budget(2):
+        clock.now = 1.8
+        try:
+            gateway.create(model="m", messages=[])
+            assert False, "expected LatencyBudgetExceeded"
+        except LatencyBudgetExceeded:
+            pass
+    assert gateway.stats()["budget_exhausted"] == 1
+
+
+def test_agent_routes_to_fallbacks_while_open():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "gateway.db"))
+        client = FailingClient()
+        agent.client = client
+
+        for _ in range(agent.llm.breaker.failure_threshold + 3):
+            insights = agent.get_productivity_insights("user@example.com")
+            assert insights["productivity_score"] == 0.5  # heuristic fallback
+
+        assert client.calls == agent.llm.breaker.failure_threshold
+        assert agent.llm.stats()["breaker"]["state"] == "open"
+        agent.db.close()
+
+
+def test_plan_request_is_a_forced_function_call_and_a_400_leaves_the_breaker_closed():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "gateway.db"))
+        agent.client = RecordingClient()
+        plan = agent.plan_task("user@example.com", "water plants")
+        assert plan["task"] == "water plants" and plan["confirmation"]
+
+        # Function calling works on the default model; json_schema response formats do not
+        request = agent.client.requests[0]
+        assert request["model"] == DEFAULT_MODEL and "response_format" not in request
+        assert request["tools"] == [{"type": "function", "function": {"name": "plan_task", "parameters": PLAN_SCHEMA}}]
+        assert request["tool_choice"] == {"type": "function", "function": {"name": "plan_task"}}
+
+        # A rejected request reaches the caller but never opens the breaker for the other call sites
+        agent.client = RecordingClient(400)
+        for _ in range(agent.llm.breaker.failure_threshold + 2):
+            try:
+                agent.plan_task("user@example.com", "water plants")
+                assert False, "expected StatusError"
+            except StatusError:
+                pass
+        assert len(agent.client.requests) == agent.llm.breaker.failure_threshold + 2
+        stats = agent.llm.stats()
+        assert stats["breaker"]["state"] == "closed" and stats["failures"] == 0
+        assert stats["rejected"] == agent.llm.breaker.failure_threshold + 2
+
+        # Rate limits and server errors still count
+        agent.client = RecordingClient(429)
+        for _ in range(agent.llm.breaker.failure_threshold):
+            try:
+                agent.plan_task("user@example.com", "water plants")
+            except StatusError:
+                pass
+        assert agent.llm.stats()["breaker"]["state"] == "open"
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_breaker_opens_then_half_open_probe_closes_it()
+    test_latency_budget_limits_calls()
+    test_agent_routes_to_fallbacks_while_open()
+    test_plan_request_is_a_forced_function_call_and_a_400_leaves_the_breaker_closed()
+    print("✅ LLM gateway tests passed")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import tempfile
+
+from migrations import migrate, get_schema_version, SCHEMA_VERSION
+from agentic_ai_agent import (PATTERN_STATS_SQL, PATTERN_BINS_SQL, PENDING_TASK_COUNT_SQL, RECENT_TASKS_SQL,
+                              PRECOMPUTED_PATTERNS_SQL, PATTERN_SCAN_USERS_SQL, PATTERN_SCAN_SQL,
+                              PENDING_TASK_BY_NAME_SQL, ROLLUP_SCAN_SQL, ANALYTICS_ROLLUP_USERS_SQL,
+                              ANALYTICS_ROLLUP_SQL)
+from cache_versions import CURRENT_VERSION_SQL
+from jobs import GET_JOB_SQL, INTERRUPT_JOBS_SQL, EXPIRE_JOBS_SQL
+from slots import SLOT_OUTCOMES_SQL, PENDING_TIMES_SQL
+
+# Hot queries and sample parameters; none of them may fall back to a table scan
+HOT_QUERIES = {
+    "pattern_stats": (PATTERN_STATS_SQL, ["user@example.com"]),
+    "pattern_bins": (PATTERN_BINS_SQL, ["user@example.com"]),
+    "pending_task_count": (PENDING_TASK_COUNT_SQL, ["user@example.com", "2025-01-01 09:00"]),
+    "recent_tasks": (RECENT_TASKS_SQL, ["user@example.com"]),
+    "pending_task_by_name": (PENDING_TASK_BY_NAME_SQL, ["user@example.com", "Gym"]),
+    "precomputed_patterns": (PRECOMPUTED_PATTERNS_SQL, ["user@example.com", 0]),
+    "pattern_scan_users": (PATTERN_SCAN_USERS_SQL, ["", 500]),
+    "pattern_scan": (PATTERN_SCAN_SQL, ["", "user@example.com"]),
+    "rollup_scan": (ROLLUP_SCAN_SQL, ["", "user@example.com"]),
+    "analytics_rollup_users": (ANALYTICS_ROLLUP_USERS_SQL.format("AND email IN (?)"), ["user@example.com"]),
+    "analytics_rollup": (ANALYTICS_ROLLUP_SQL.format("AND email IN (?)"), ["user@example.com"]),
+    "slot_outcomes": (SLOT_OUTCOMES_SQL, ["user@example.com"]),
+    "pending_times": (PENDING_TIMES_SQL, ["user@example.com", "2025-01-01 09:00", "2025-01-08 09:00"]),
+    "cache_version": (CURRENT_VERSION_SQL, ["user@example.com"]),
+    "task_job": (GET_JOB_SQL, ["job", 0]),
+    "interrupt_task_jobs": (INTERRUPT_JOBS_SQL, ["interrupted", 0, 0, 0]),
+    "expire_task_jobs": (EXPIRE_JOBS_SQL, [0]),
+    "decision_history": ('''
+        SELECT * FROM agent_decisions WHERE email = ? ORDER BY created_at DESC
+    ''', ["user@example.com"]),
+}
+
+# Queries whose sort is bounded by a constant (at most 24 + 7 histogram bins)
+BOUNDED_SORTS = {"pattern_bins"}
+
+
+def create_legacy_database(path):
+    """Create a database the way the original unversioned setup_database did"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE user_behavior (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            task_name TEXT,
+            scheduled_time DATETIME,
+            completion_time DATETIME,
+            completion_status TEXT,
+            user_feedback TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE agent_decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            decision_type TEXT,
+            reasoning TEXT,
+            action_taken TEXT,
+            outcome TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE,
+            preferred_times TEXT,
+            task_categories TEXT,
+            productivity_patterns TEXT,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany('''
+        INSERT INTO user_behavior (email, task_name, scheduled_time)
+        VALUES (?, ?, ?)
+    ''', [(f"user{i % 50}@example.com", f"task {i}", f"2025-01-{i % 28 + 1:02d} {i % 24:02d}:00:00")
+          for i in range(2000)])
+    conn.commit()
+    return conn
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def test_legacy_database_is_migrated_in_place():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_legacy_database(os.path.join(tmp, "legacy.db"))
+        assert get_schema_version(conn) == 0
+
+        assert migrate(conn) == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM user_behavior").fetchone()[0] == 2000
+
+        # Running again is a no-op
+        assert migrate(conn) == SCHEMA_VERSION
+        conn.close()
+
+
+def test_hot_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_legacy_database(os.path.join(tmp, "plans.db"))
+        migrate(conn)
+        conn.execute("ANALYZE")
+
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = query_plan(conn, sql, params)
+            for detail in plan:
+                assert not detail.startswith("SCAN"), f"{name} scans: {plan}"
+                if name not in BOUNDED_SORTS:
+                    assert "TEMP B-TREE" not in detail, f"{name} sorts: {plan}"
+        conn.close()
+
+
+if __name__ == "__main__":
+    test_legacy_database_is_migrated_in_place()
+    test_hot_queries_use_indexes()
+    print("✅ Migration tests passed")
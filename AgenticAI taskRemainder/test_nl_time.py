@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+from datetime import datetime
+
+import pytest
+
+from nl_time import parse, parse_many
+
+# Reference time for the corpus: Wednesday 2025-01-15 10:00
+NOW = datetime(2025, 1, 15, 10, 0)
+
+# (input, expected task name, expected time)
+CORPUS = [
+    ("Call mom today at 12pm", "Call mom", "2025-01-15 12:00"),
+    ("Submit project tomorrow at 3:30pm", "Submit project", "2025-01-16 15:30"),
+    ("Gym workout this evening", "Gym workout", "2025-01-15 18:00"),
+    ("Meeting tomorrow morning", "Meeting", "2025-01-16 09:00"),
+    ("Dinner tonight at 7pm", "Dinner", "2025-01-15 19:00"),
+    ("Study session at 2pm", "Study session", "2025-01-15 14:00"),
+    ("Water the plants tonight", "Water the plants", "2025-01-15 20:00"),
+    ("Call the bank this afternoon", "Call the bank", "2025-01-15 14:00"),
+    ("Stretch this morning", "Stretch", "2025-01-16 09:00"),
+    ("Breakfast at 8am", "Breakfast", "2025-01-16 08:00"),
+    ("Dentist on Friday at 9:15am", "Dentist", "2025-01-17 09:15"),
+    ("Team sync next Wednesday 14:00", "Team sync", "2025-01-22 14:00"),
+    ("Review PR this Wednesday at 11am", "Review PR", "2025-01-15 11:00"),
+    ("Groceries on Monday", "Groceries", "2025-01-20 09:00"),
+    ("Pay rent on 2025-02-01", "Pay rent", "2025-02-01 09:00"),
+    ("Submit taxes on 4/15", "Submit taxes", "2025-04-15 09:00"),
+    ("Renew passport 1/10/2026", "Renew passport", "2026-01-10 09:00"),
+    ("Birthday party March 3rd at 6pm", "Birthday party", "2025-03-03 18:00"),
+    ("Anniversary dinner on the 14th of February at 7:30pm", "Anniversary dinner", "2025-02-14 19:30"),
+    ("New year plans Jan 2", "New year plans", "2026-01-02 09:00"),
+    ("Remind me to call John in 2 hours", "Remind me to call John", "2025-01-15 12:00"),
+    ("Take a break in half an hour", "Take a break", "2025-01-15 10:30"),
+    ("Check the oven in 45 minutes", "Check the oven", "2025-01-15 10:45"),
+    ("Follow up in three days", "Follow up", "2025-01-18 10:00"),
+    ("Quarterly review in 2 weeks", "Quarterly review", "2025-01-29 10:00"),
+    ("Drinks at 8 tonight", "Drinks", "2025-01-15 20:00"),
+    ("Standup at 9", "Standup", "2025-01-16 09:00"),
+    ("Lunch at noon", "Lunch", "2025-01-15 12:00"),
+    ("Backup server at midnight", "Backup server", "2025-01-16 00:00"),
+    ("Walk the dog in the evening", "Walk the dog", "2025-01-15 18:00"),
+    ("Plan sprint next week", "Plan sprint", "2025-01-22 09:00"),
+    ("Pick up parcel day after tomorrow", "Pick up parcel", "2025-01-17 09:00"),
+    ("Buy 2 apples", "Buy 2 apples", "2025-01-16 09:00"),
+    ("Read report", "Read report", "2025-01-16 09:00"),
+    ("TONIGHT: finish slides at 9PM", "finish slides", "2025-01-15 21:00"),
+    # With two dates the later one wins, whether or not either has a year
+    ("Move 2025-02-01 meeting to March 3", "Move meeting to", "2025-03-03 09:00"),
+    ("Submit draft 1/10/2026 final due Jan 20", "Submit draft final due", "2025-01-20 09:00"),
+    ("Call mom 3/4 then on 2026-05-06 at 5pm", "Call mom then", "2026-05-06 17:00"),
+]
+
+# Out-of-range times and dates are not read as times: they stay in the task name
+# and the request falls back to tomorrow 09:00
+OUT_OF_RANGE = [
+    "meeting at 25:00",
+    "call at 10:75",
+    "call at 13pm",
+    "standup at 24",
+    "pay rent on 2/30",
+    "dinner Feb 30",
+    "audit 2025-13-01",
+    "follow up in 99999999999 days",
+    "check in 9999999 weeks",
+]
+
+
+def test_corpus_accuracy():
+    misses = []
+    for text, task, when in CORPUS:
+        result = parse(text, NOW)
+        if (result["task"], result["suggested_time"]) != (task, when):
+            misses.append((text, result["task"], result["suggested_time"]))
+    assert not misses, misses
+
+
+def test_parse_many_matches_parse():
+    texts = [text for text, _, _ in CORPUS]
+    assert parse_many(texts, NOW) == [parse(text, NOW) for text in texts]
+
+
+@pytest.mark.parametrize("text", OUT_OF_RANGE)
+def test_out_of_range_values_stay_task_words(text):
+    result = parse(text, NOW)
+    assert result["suggested_time"] == "2025-01-16 09:00"
+    assert result["task"] == text
+
+
+def test_feb_29_without_a_year_waits_for_a_leap_year():
+    assert parse("leap day party Feb 29", NOW)["suggested_time"] == "2028-02-29 09:00"
+
+
+if __name__ == "__main__":
+    test_corpus_accuracy()
+    test_parse_many_matches_parse()
+    for text in OUT_OF_RANGE:
+        test_out_of_range_values_stay_task_words(text)
+    test_feb_29_without_a_year_waits_for_a_leap_year()
+    print("✅ Time parser tests passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from agentic_ai_agent import AgenticReminderAgent
+
+MONDAY_9 = datetime(2025, 1, 6, 9, 0)
+TUESDAY_18 = datetime(2025, 1, 7, 18, 0)
+
+
+def test_outcomes_are_recorded_by_task_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "outcomes.db"))
+        # The same task name twice: only the id says which one was done
+        first = agent.record_task("user@example.com", "Gym", MONDAY_9)
+        second = agent.record_task("user@example.com", "Gym", TUESDAY_18)
+        other = agent.record_task("other@example.com", "Read", MONDAY_9)
+
+        assert agent.learn_from_outcome("user@example.com", "Gym", "missed", task_id=second)
+        # Already recorded, someone else's task, and an unknown id are all skipped
+        assert not agent.learn_from_outcome("user@example.com", "Gym", "completed", task_id=second)
+        assert not agent.learn_from_outcome("user@example.com", "Read", "completed", task_id=other)
+        assert not agent.learn_from_outcome("user@example.com", "Gym", "completed", task_id=other + 100)
+
+        # Without an id, the name falls back to the newest pending task
+        assert agent.learn_from_outcome("user@example.com", "Gym", "completed")
+        assert not agent.learn_from_outcome("user@example.com", "Gym", "completed")
+
+        conn = sqlite3.connect(agent.db_path)
+        statuses = dict(conn.execute("SELECT id, completion_status FROM user_behavior").fetchall())
+        conn.close()
+        assert statuses == {first: "completed", second: "missed", other: None}
+        agent.db.close()
+
+
+def test_batch_outcomes_update_each_user_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "outcomes.db"))
+        a = [agent.record_task("a@example.com", name, MONDAY_9) for name in ("Gym", "Gym", "Taxes")]
+        b = agent.record_task("b@example.com", "Read", TUESDAY_18)
+        # Warm the caches so the batch has to invalidate them
+        agent.analyze_user_patterns("a@example.com")
+        agent.slot_model.posterior("a@example.com")
+
+        applied = agent.record_outcomes([
+            ("a@example.com", a[0], "completed", ""),
+            ("a@example.com", a[1], "completed", "easy"),
+            ("a@example.com", a[2], "missed", None),
+            ("b@example.com", b, "completed", ""),
+            ("b@example.com", a[0], "completed", ""),
+            ("a@example.com", a[0], "missed", ""),
+        ])
+        assert applied == [True, True, True, True, False, False]
+
+        conn = sqlite3.connect(agent.db_path)
+        completed = dict(conn.execute("SELECT email, completed_tasks FROM user_pattern_stats").fetchall())
+        assert completed == {"a@example.com": 2, "b@example.com": 1}
+        slots = conn.execute("SELECT email, slot, completed, missed FROM user_slot_outcomes ORDER BY email").fetchall()
+        assert slots == [("a@example.com", 9, 2, 1), ("b@example.com", 42, 1, 0)]
+        conn.close()
+
+        assert agent.analyze_user_patterns("a@example.com")["completion_rate"] == 2 / 3
+        assert agent.slot_model.posterior("a@example.com").outcomes == 3
+        preferences = agent.task_preferences("a@example.com")
+        assert [(t["task"], t["successes"], t["failures"]) for t in preferences["successful_tasks"]] == [("gym", 2, 0)]
+        assert [(t["task"], t["successes"], t["failures"]) for t in preferences["challenging_tasks"]] == [("taxes", 0, 1)]
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_outcomes_are_recorded_by_task_id()
+    test_batch_outcomes_update_each_user_once()
+    print("✅ Outcome recording tests passed")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from agentic_ai_agent import AgenticReminderAgent
+from migrations import migrate
+
+
+def reference_patterns(db_path, email):
+    """The original full-history pandas implementation of analyze_user_patterns"""
+    conn = sqlite3.connect(db_path)
+    # created_at has one-second resolution; ties resolve newest-first like the index
+    df = pd.read_sql_query('''
+        SELECT * FROM user_behavior 
+        WHERE email = ? 
+        ORDER BY created_at DESC, id DESC
+    ''', conn, params=[email])
+    conn.close()
+
+    if df.empty:
+        return {"patterns": "new_user", "preferred_times": [], "productivity_score": 0.5}
+
+    completion_rate = len(df[df['completion_status'] == 'completed']) / len(df)
+    df['hour'] = pd.to_datetime(df['scheduled_time']).dt.hour
+    df['day_of_week'] = pd.to_datetime(df['scheduled_time']).dt.dayofweek
+    preferred_hours = df['hour'].value_counts().head(3).index.tolist()
+    preferred_days = df['day_of_week'].value_counts().head(3).index.tolist()
+    productivity_score = completion_rate * 0.7 + (1 - df['hour'].std() / 24) * 0.3
+
+    return {
+        "patterns": "established_user",
+        "completion_rate": completion_rate,
+        "preferred_hours": preferred_hours,
+        "preferred_days": preferred_days,
+        "productivity_score": productivity_score,
+        "total_tasks": len(df)
+    }
+
+
+def assert_same_patterns(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key == "productivity_score":
+            assert np.isclose(actual[key], value, equal_nan=True), (actual, expected)
+        else:
+            assert actual[key] == value, (key, actual, expected)
+
+
+def random_tasks(rng, count):
+    start = datetime(2025, 1, 6, 0, 0)
+    return [(f"user{rng.randrange(5)}@example.com", f"task {i}",
+             start + timedelta(days=rng.randrange(60), hours=rng.choice([8, 9, 9, 14, 18, 20, rng.randrange(24)])))
+            for i in range(count)]
+
+
+def test_aggregates_match_full_history():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "patterns.db")
+        agent = AgenticReminderAgent("test-key", db_path)
+
+        assert agent.analyze_user_patterns("nobody@example.com") == reference_patterns(db_path, "nobody@example.com")
+
+        for email, task_name, scheduled_dt in random_tasks(rng, 400):
+            agent.record_task(email, task_name, scheduled_dt)
+
+        # Record outcomes, including repeats that no longer match a pending row
+        for email, task_name, _ in rng.sample(random_tasks(random.Random(7), 400), 200):
+            agent.learn_from_outcome(email, task_name, rng.choice(["completed", "missed"]))
+
+        for i in range(5):
+            email = f"user{i}@example.com"
+            assert_same_patterns(agent.analyze_user_patterns(email), reference_patterns(db_path, email))
+
+        # A single task has an undefined hour std, exactly like pandas
+        agent.record_task("solo@example.com", "only task", datetime(2025, 3, 3, 10, 0))
+        assert_same_patterns(agent.analyze_user_patterns("solo@example.com"),
+                             reference_patterns(db_path, "solo@example.com"))
+        agent.db.close()
+
+
+def test_migration_backfills_aggregates():
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA user_version = 2")
+        conn.execute('''
+            CREATE TABLE user_behavior (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT,
+                task_name TEXT,
+                scheduled_time DATETIME,
+                completion_time DATETIME,
+                completion_status TEXT,
+                user_feedback TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE user_preferences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE,
+                preferred_times TEXT,
+                task_categories TEXT,
+                productivity_patterns TEXT,
+                last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.executemany('''
+            INSERT INTO user_behavior (email, task_name, scheduled_time, completion_status)
+            VALUES (?, ?, ?, ?)
+        ''', [(email, name, dt.strftime('%Y-%m-%d %H:%M:%S'), rng.choice([None, "completed", "missed"]))
+              for email, name, dt in random_tasks(rng, 300)])
+        conn.commit()
+        migrate(conn)
+        conn.close()
+
+        agent = AgenticReminderAgent("test-key", db_path)
+        for i in range(5):
+            email = f"user{i}@example.com"
+            assert_same_patterns(agent.analyze_user_patterns(email), reference_patterns(db_path, email))
+        agent.db.close()
+
+
+def test_precomputed_patterns_are_served_until_the_user_changes():
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "precompute.db")
+        agent = AgenticReminderAgent("test-key", db_path)
+        agent.record_tasks(random_tasks(rng, 300))
+        agent.record_task("solo@example.com", "only task", datetime(2025, 3, 3, 10, 0))
+        with agent.db.connection() as conn:
+            conn.execute('''
+                INSERT INTO user_behavior (email, task_name, scheduled_time, created_at)
+                VALUES ('idle@example.com', 'old task', '2020-01-01 09:00:00', '2020-01-01 08:00:00')
+            ''')
+
+        # Small chunks exercise the range boundaries; the idle user is skipped
+        assert agent.precompute_patterns(active_days=30, users_per_chunk=2) == 6
+        assert agent._precomputed("idle@example.com") is None
+
+        emails = [f"user{i}@example.com" for i in range(5)] + ["solo@example.com"]
+        for email in emails:
+            precomputed = agent._precomputed(email)
+            assert precomputed is not None
+            assert_same_patterns(precomputed["patterns"], reference_patterns(db_path, email))
+            assert precomputed["insights"] == agent._fallback_productivity_insights(precomputed["patterns"])
+            assert_same_patterns(agent.analyze_user_patterns(email), reference_patterns(db_path, email))
+
+        # New data makes the stored row stale until the next run
+        agent.record_task("user0@example.com", "new task", datetime(2025, 3, 4, 7, 0))
+        assert agent._precomputed("user0@example.com") is None
+        assert agent._precomputed("user1@example.com") is not None
+        assert_same_patterns(agent.analyze_user_patterns("user0@example.com"),
+                             reference_patterns(db_path, "user0@example.com"))
+
+        agent.precompute_patterns()
+        assert agent._precomputed("user0@example.com")["patterns"]["total_tasks"] == \
+            reference_patterns(db_path, "user0@example.com")["total_tasks"]
+        agent.db.close()
+
+
+def test_outcome_racing_the_first_precompute_marks_the_user_dirty():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "race.db"))
+        # A user with tasks but no user_preferences row yet, as after an upgrade
+        with agent.db.connection() as conn:
+            task_id = conn.execute(
+                "INSERT INTO user_behavior (email, task_name, scheduled_time) VALUES (?, ?, ?)",
+                ["new@example.com", "first task", "2025-03-03 10:00:00"]).lastrowid
+
+        # The outcome lands after precompute has read the user's rows and before it stores them
+        summarize = agent._summarize_scanned
+
+        def summarize_then_record(*args, **kwargs):
+            summary = summarize(*args, **kwargs)
+            assert agent.record_outcomes([("new@example.com", task_id, "completed", None)]) == [True]
+            return summary
+
+        agent._summarize_scanned = summarize_then_record
+        assert agent.precompute_patterns() == 1
+        assert agent._precomputed("new@example.com") is None
+        agent.db.close()
+
+
+def test_analyze_many_matches_single_user_analysis():
+    rng = random.Random(13)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "patterns.db")
+        agent = AgenticReminderAgent("test-key", db_path)
+        assert agent.analyze_all() == {}
+
+        agent.record_tasks(random_tasks(rng, 400))
+        for email, task_name, _ in rng.sample(random_tasks(random.Random(13), 400), 200):
+            agent.learn_from_outcome(email, task_name, rng.choice(["completed", "missed"]))
+        agent.record_task("solo@example.com", "only task", datetime(2025, 3, 3, 10, 0))
+
+        emails = [f"user{i}@example.com" for i in range(5)] + ["solo@example.com"]
+        everyone = agent.analyze_all()
+        assert sorted(everyone) == sorted(emails)
+
+        many = agent.analyze_many(["nobody@example.com"] + emails + ["user0@example.com"])
+        assert list(many) == ["nobody@example.com"] + emails
+        assert many["nobody@example.com"] == agent.analyze_user_patterns("nobody@example.com")
+        for email in emails:
+            single = agent.analyze_user_patterns(email)
+            assert_same_patterns(many[email], single)
+            assert_same_patterns(everyone[email], single)
+            # Bit-for-bit, not just close
+            assert many[email]["productivity_score"] == single["productivity_score"] or \
+                np.isnan(single["productivity_score"])
+        assert np.isnan(many["solo@example.com"]["productivity_score"])
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_aggregates_match_full_history()
+    test_migration_backfills_aggregates()
+    test_precomputed_patterns_are_served_until_the_user_changes()
+    test_outcome_racing_the_first_precompute_marks_the_user_dirty()
+    test_analyze_many_matches_single_user_analysis()
+    print("✅ Pattern aggregate tests passed")
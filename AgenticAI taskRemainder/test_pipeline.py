@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import nl_time
+from agentic_ai_agent import AgenticReminderAgent
+from llm_stub import LatencyStubClient
+from pipeline import TaskGraph, TaskCreationFlow, TaskInputError, default_confirmation
+
+
+def test_graph_runs_independent_steps_in_parallel():
+    graph = TaskGraph()
+    graph.add("a", lambda: time.sleep(0.2) or 1)
+    graph.add("b", lambda: time.sleep(0.2) or 2)
+    graph.add("sum", lambda a, b: a + b, ["a", "b"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = graph.run(executor)
+    assert results["sum"] == 3
+    assert time.perf_counter() - start < 0.35
+    assert graph.run_sequential()["sum"] == 3
+
+
+def make_flow(agent, mode, scheduled):
+    def parse_llm(user_input, email):
+        tomorrow = datetime.now() + timedelta(days=1)
+        return {"task": user_input, "suggested_time": tomorrow.strftime('%Y-%m-%d 10:00'),
+                "priority": "high", "reasoning": "parsed", "confidence": 1.0}
+
+    def merge(result, suggestion):
+        return dict(result, suggested_time=suggestion["suggested_time"])
+
+    def schedule(email, task_name, reminder_dt):
+        scheduled.append((task_name, reminder_dt))
+        return agent.record_task(email, task_name, reminder_dt)
+
+    return TaskCreationFlow(agent, parse_llm=parse_llm, parse_fallback=None, merge_suggestion=merge,
+                            confirm=lambda *args: "confirmed", schedule=schedule, mode=mode)
+
+
+def test_modes_produce_the_same_task():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "flow.db"))
+        agent.client = LatencyStubClient()
+
+        outputs = []
+        for mode in ("sequential", "concurrent"):
+            scheduled = []
+            result = make_flow(agent, mode, scheduled).run("user@example.com", natural_input="water plants")
+            assert result["confirmation"] == "confirmed"
+            assert len(scheduled) == 1
+            outputs.append({k: v for k, v in result.items() if k != "task_id"})
+
+        assert outputs[0] == outputs[1]
+
+        # Both modes logged exactly one scheduling decision per task
+        with agent.db.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM agent_decisions").fetchone()[0] == 2
+        agent.db.close()
+
+
+def test_invalid_manual_input_is_rejected_before_scheduling():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "flow.db"))
+        agent.client = LatencyStubClient()
+        scheduled = []
+        flow = make_flow(agent, "concurrent", scheduled)
+
+        for reminder_time in ("not a time", "2000-01-01T09:00"):
+            try:
+                flow.run("user@example.com", task_name="file taxes", reminder_time=reminder_time)
+                assert False, "expected TaskInputError"
+            except TaskInputError:
+                pass
+        assert scheduled == []
+        agent.db.close()
+
+
+class PartialPlanClient(LatencyStubClient):
+    """Answers the plan prompt with an unusable time, a mistyped decision and no confirmation"""
+
+    def __init__(self):
+        super().__init__()
+        self.params = []
+
+    def create(self, model=None, messages=None, stream=False, **params):
+        self.params.append(params)
+        return super().create(model=model, messages=messages, stream=stream, **params)
+
+    def reply_for(self, prompt):
+        reply = json.loads(super().reply_for(prompt))
+        reply["suggested_time"] = "whenever suits"
+        reply["decisions"]["should_reschedule"] = "no"
+        del reply["confirmation"]
+        return json.dumps(reply)
+
+
+def make_planned_flow(agent):
+    return TaskCreationFlow(agent, parse_llm=None, parse_fallback=lambda text, email: nl_time.parse(text),
+                            merge_suggestion=None, confirm=None, schedule=agent.record_task, mode="planned")
+
+
+def test_planned_mode_makes_one_structured_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "flow.db"))
+        agent.client = LatencyStubClient()
+        flow = make_planned_flow(agent)
+
+        result = flow.run("user@example.com", natural_input="water plants")
+        assert agent.client.calls == 1
+        assert result["task"] == "water plants" and result["priority"] == "medium"
+        assert result["confirmation"] == "Reminder set - you've got this!"
+        assert result["decisions"]["task_optimization"] == "Split it into two sessions"
+
+        # A manual task keeps its name and time and still gets one call for decisions and confirmation
+        when = (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d 16:00')
+        result = flow.run("user@example.com", task_name="file taxes", reminder_time=when)
+        assert agent.client.calls == 2
+        assert (result["task"], result["suggested_time"]) == ("file taxes", when)
+        # Heuristic decisions the reply does not cover are kept
+        assert result["decisions"]["suggested_breaks"] == [] and "reasoning" in result["decisions"]
+        assert flow.stats() == {"mode": "planned", "runs": 2, "fallbacks": {}}
+        agent.db.close()
+
+
+def test_planned_mode_falls_back_per_field():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "flow.db"))
+        agent.client = PartialPlanClient()
+        flow = make_planned_flow(agent)
+
+        result = flow.run("user@example.com", natural_input="call mom tomorrow at 6pm")
+        tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        # The parsed task is kept; only the time comes from the local parser
+        assert result["task"] == "call mom tomorrow at 6pm" and result["priority"] == "medium"
+        assert result["suggested_time"] == f"{tomorrow} 18:00"
+        assert result["decisions"]["should_reschedule"] is False
+        assert result["decisions"]["productivity_tips"] == ["Start with the hardest part"]
+        assert result["confirmation"] == default_confirmation("call mom tomorrow at 6pm", f"{tomorrow} 18:00")
+        assert flow.stats()["fallbacks"] == {"suggested_time": 1, "reasoning": 1, "confirmation": 1}
+
+        # The reply comes back as the arguments of a forced call to the plan function
+        assert agent.client.params[0]["tool_choice"]["function"]["name"] == "plan_task"
+        assert agent.prompts.stats()["plan_task"]["calls"] == 1
+        agent.db.close()
+
+
+def test_planned_confirmation_names_the_scheduled_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "flow.db"))
+        agent.client = LatencyStubClient()
+        flow = make_planned_flow(agent)
+
+        # The user's completion record moves the task away from the time the reply confirmed
+        slot_time = (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d 07:00')
+        agent.slot_model.suggest = lambda email, preferred=None: {
+            "suggested_time": slot_time, "reasoning": "You finish early tasks", "confidence": 0.9}
+
+        result = flow.run("user@example.com", natural_input="water plants")
+        assert result["suggested_time"] == slot_time
+        assert result["confirmation"] == default_confirmation("water plants", slot_time)
+        assert flow.stats()["fallbacks"] == {"confirmation": 1}
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_graph_runs_independent_steps_in_parallel()
+    test_modes_produce_the_same_task()
+    test_invalid_manual_input_is_rejected_before_scheduling()
+    test_planned_mode_makes_one_structured_call()
+    test_planned_mode_falls_back_per_field()
+    test_planned_confirmation_names_the_scheduled_time()
+    print("✅ Pipeline tests passed")
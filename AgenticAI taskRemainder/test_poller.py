@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from agentic_ai_agent import AgenticReminderAgent
+from db import ConnectionManager
+from migrations import MIGRATIONS, migrate
+from poller import (ReminderPoller, CLAIM_DUE_SQL, EXPIRE_MISSED_SQL, RELEASE_STALE_CLAIMS_SQL, START_SENDING_SQL,
+                    INTERRUPT_STALE_SENDS_SQL)
+
+
+class CollectingDispatcher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submitted = []
+
+    def backlog(self):
+        return 0
+
+    def submit(self, email, task_name, task_id, scheduled_time=None):
+        with self.lock:
+            self.submitted.append(task_id)
+
+
+def make_agent(tmp):
+    return AgenticReminderAgent("test-key", os.path.join(tmp, "poller.db"))
+
+
+def test_queue_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = make_agent(tmp)
+        with agent.db.connection() as conn:
+            for sql, params in ((CLAIM_DUE_SQL, ["2025-01-01 09:00:00", "claimant", "2025-01-01 09:00:00", 10]),
+                                (EXPIRE_MISSED_SQL, ["2025-01-01 09:00:00"]),
+                                (RELEASE_STALE_CLAIMS_SQL, ["2025-01-01 09:00:00"]),
+                                (START_SENDING_SQL.format("?, ?"), ["2025-01-01 09:00:00", 1, 2, "claimant"]),
+                                (INTERRUPT_STALE_SENDS_SQL, ["2025-01-01 09:00:00"])):
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+                assert not any(detail.startswith("SCAN") for detail in plan), plan
+        agent.db.close()
+
+
+def test_catch_up_claims_each_due_reminder_once():
+    now = datetime(2025, 6, 2, 12, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = make_agent(tmp)
+        missed_long_ago = agent.record_task("a@example.com", "stale", now - timedelta(hours=10))
+        due = [agent.record_task(f"user{i % 3}@example.com", f"task {i}", now - timedelta(minutes=i))
+               for i in range(300)]
+        agent.record_task("a@example.com", "later", now + timedelta(hours=1))
+
+        # Several pollers race over the same backlog
+        dispatcher = CollectingDispatcher()
+        pollers = [ReminderPoller(agent.db, dispatcher, batch_size=25, catchup_horizon=6 * 3600,
+                                  clock=lambda: now) for _ in range(4)]
+
+        def drain(poller):
+            while poller.poll_once():
+                pass
+
+        threads = [threading.Thread(target=drain, args=(p,)) for p in pollers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(dispatcher.submitted) == sorted(due)
+        assert sum(p.stats()["expired"] for p in pollers) == 1
+
+        pollers[0].mark_sent(due[0])
+        with agent.db.connection() as conn:
+            statuses = dict(conn.execute('''
+                SELECT reminder_status, COUNT(*) FROM user_behavior GROUP BY reminder_status
+            ''').fetchall())
+            assert conn.execute('SELECT reminder_status FROM user_behavior WHERE id = ?',
+                                [missed_long_ago]).fetchone()[0] == "expired"
+        assert statuses == {None: 1, "claimed": 299, "sent": 1, "expired": 1}
+        agent.db.close()
+
+
+def test_stale_claims_are_released():
+    now = datetime(2025, 6, 2, 12, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = make_agent(tmp)
+        task_id = agent.record_task("a@example.com", "report", now - timedelta(minutes=1))
+
+        crashed = ReminderPoller(agent.db, CollectingDispatcher(), clock=lambda: now)
+        assert crashed.poll_once() == 1
+
+        # Another worker picks it up once the claim has timed out
+        dispatcher = CollectingDispatcher()
+        later = ReminderPoller(agent.db, dispatcher, claim_timeout=300, clock=lambda: now + timedelta(minutes=6))
+        assert later.poll_once() == 1
+        assert dispatcher.submitted == [task_id]
+        agent.db.close()
+
+
+def test_upgrade_does_not_resend_reminders_sent_before_it():
+    now = datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "v4.db")
+        db = ConnectionManager(path)
+        # A version 4 database in use under APScheduler, which has already sent the due reminders
+        with db.connection() as conn:
+            for _, _, statements in MIGRATIONS[:4]:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute("PRAGMA user_version = 4")
+            insert = "INSERT INTO user_behavior (email, task_name, scheduled_time) VALUES (?, ?, ?)"
+            for minutes in (1, 30, 120):
+                conn.execute(insert, ["user@example.com", f"sent {minutes}m ago", now - timedelta(minutes=minutes)])
+            upcoming = conn.execute(insert, ["user@example.com", "upcoming", now + timedelta(minutes=1)]).lastrowid
+
+        with db.connection() as conn:
+            migrate(conn)
+        dispatcher = CollectingDispatcher()
+        poller = ReminderPoller(db, dispatcher, catchup_horizon=6 * 3600, clock=lambda: now + timedelta(minutes=2))
+        assert poller.poll_once() == 1
+        assert dispatcher.submitted == [upcoming]
+        db.close()
+
+
+if __name__ == "__main__":
+    test_queue_queries_use_indexes()
+    test_catch_up_claims_each_due_reminder_once()
+    test_stale_claims_are_released()
+    test_upgrade_does_not_resend_reminders_sent_before_it()
+    print("✅ Poller tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from agentic_ai_agent import AgenticReminderAgent
+from migrations import DEFAULT_TASK_OUTCOME_KEYS, migrate
+from test_migrations import create_legacy_database
+
+
+def test_legacy_preference_blobs_are_folded_into_the_sketch():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_legacy_database(os.path.join(tmp, "legacy.db"))
+        conn.executemany("INSERT INTO user_preferences (email, task_categories) VALUES (?, ?)", [
+            ("a@example.com", json.dumps({"successful_tasks": ["Gym", "gym ", "Read"],
+                                          "challenging_tasks": ["Gym", "Taxes"]})),
+            ("b@example.com", json.dumps({"challenging_tasks": [f"chore {i}" for i in range(DEFAULT_TASK_OUTCOME_KEYS + 30)]})),
+            ("c@example.com", "not json"),
+        ])
+        conn.commit()
+        migrate(conn)
+
+        rows = conn.execute('''
+            SELECT task_key, outcomes, error, successes, failures FROM user_task_outcomes
+            WHERE email = 'a@example.com' ORDER BY task_key
+        ''').fetchall()
+        assert rows == [("gym", 3, 0, 2, 1), ("read", 1, 0, 1, 0), ("taxes", 1, 0, 0, 1)]
+        # Only as many as the agent tracks are kept from an oversized list
+        assert conn.execute("SELECT COUNT(*) FROM user_task_outcomes WHERE email = 'b@example.com'").fetchone()[0] \
+            == DEFAULT_TASK_OUTCOME_KEYS
+        assert conn.execute("SELECT COUNT(*) FROM user_task_outcomes WHERE email = 'c@example.com'").fetchone()[0] == 0
+        assert {row[0] for row in conn.execute("SELECT task_categories FROM user_preferences")} == {"{}"}
+        conn.close()
+
+
+def test_outcome_sketch_stays_bounded_and_keeps_heavy_hitters():
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "prefs.db"))
+        # The sketch size migration 9 folded legacy lists into
+        assert agent.task_outcome_keys == DEFAULT_TASK_OUTCOME_KEYS
+        agent.task_outcome_keys = 10
+
+        # Two frequent tasks among a long tail of one-off tasks
+        names = ["Daily standup"] * 60 + ["Gym"] * 40 + [f"one-off {i}" for i in range(200)]
+        rng.shuffle(names)
+        truth = {}
+        for i, name in enumerate(names):
+            outcome = "completed" if name != "Gym" or i % 4 == 0 else "missed"
+            agent.record_task("user@example.com", name, datetime(2025, 1, 6, 9, 0))
+            agent.learn_from_outcome("user@example.com", name, outcome)
+            counts = truth.setdefault(name.lower(), [0, 0])
+            counts[outcome != "completed"] += 1
+
+        conn = sqlite3.connect(agent.db_path)
+        rows = conn.execute('''
+            SELECT task_key, outcomes, error, successes, failures FROM user_task_outcomes
+        ''').fetchall()
+        conn.close()
+        assert len(rows) == 10
+        assert sum(outcomes for _, outcomes, _, _, _ in rows) == len(names)
+        for key, outcomes, error, _, _ in rows:
+            # Space-Saving bounds: never under, and over by at most the inherited error
+            assert sum(truth[key]) <= outcomes <= sum(truth[key]) + error
+
+        preferences = agent.task_preferences("user@example.com")
+        top = {t["task"]: t for t in preferences["successful_tasks"] + preferences["challenging_tasks"]}
+        # Anything with more than len(names) / 10 outcomes is guaranteed to be tracked
+        assert top["daily standup"]["outcomes"] >= 60 and top["gym"]["outcomes"] >= 40
+        assert any(t["task"] == "gym" for t in preferences["challenging_tasks"])
+        assert preferences["successful_tasks"][0]["task"] == "daily standup"
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_legacy_preference_blobs_are_folded_into_the_sketch()
+    test_outcome_sketch_stays_bounded_and_keeps_heavy_hitters()
+    print("✅ Preference sketch tests passed")
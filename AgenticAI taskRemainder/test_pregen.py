@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import yagmail
+
+from agentic_ai_agent import AgenticReminderAgent
+from dispatch import SMTPPool, ReminderDispatcher
+from pregen import ContentPregenerator, UPCOMING_SQL
+from smtp_stub import LocalSMTPServer
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, email, task_names):
+        self.calls += 1
+        return f"Reminder {self.calls}", "\n".join(task_names)
+
+
+def test_content_is_generated_ahead_and_refreshed_when_patterns_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "pregen.db"))
+        now = datetime(2025, 1, 1, 9, 0)
+        generate = CountingGenerator()
+        pregen = ContentPregenerator(agent.db, agent.analyze_user_patterns, generate, lead_time=900,
+                                     clock=lambda: now)
+
+        soon = agent.record_task("user@example.com", "soon", now + timedelta(minutes=10))
+        agent.record_task("user@example.com", "later", now + timedelta(hours=2))
+
+        with agent.db.connection() as conn:
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + UPCOMING_SQL, ["a", "b", 10])]
+        assert not any(detail.startswith("SCAN") for detail in plan), plan
+
+        # Only the reminder inside the lead time is generated, and only once
+        assert pregen.run_once() == 1
+        assert pregen.run_once() == 0
+        assert generate.calls == 1
+
+        # A new task changes the user's patterns, so stored content is stale
+        agent.record_task("user@example.com", "also soon", now + timedelta(minutes=5))
+        assert pregen.run_once() == 2
+        assert pregen.stats()["regenerated"] == 1
+
+        # Sending reads the stored content instead of generating it
+        def unexpected(email, task_names):
+            raise AssertionError("content generated at send time")
+
+        with LocalSMTPServer() as server:
+            pool = SMTPPool(lambda: yagmail.SMTP("agent@example.com", host="127.0.0.1", port=server.port,
+                                                 smtp_ssl=False, smtp_starttls=False, smtp_skip_login=True))
+            sent = []
+            dispatcher = ReminderDispatcher(pool, unexpected, on_sent=lambda r, subject: sent.append(subject),
+                                            pregenerated=pregen.lookup,
+                                            clock=lambda: now + timedelta(minutes=10, seconds=3))
+            dispatcher.submit("user@example.com", "soon", soon, now + timedelta(minutes=10))
+            dispatcher.flush()
+            pool.close()
+
+        assert sent == ["Reminder 3"]
+        assert len(server.messages) == 1
+        assert dispatcher.stats()["send_lag"]["max"] == 3.0
+        assert pregen.stats()["send_hits"] == 1
+
+        pregen.discard(soon)
+        with agent.db.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM reminder_content").fetchone()[0] == 1
+        agent.db.close()
+
+
+def test_fallback_content_is_not_stored_and_retried():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "pregen.db"))
+        now = datetime(2025, 1, 1, 9, 0)
+        generate = CountingGenerator()
+        llm_up = False
+
+        def personalized(email, task_names):
+            return generate(email, task_names) if llm_up else None
+
+        pregen = ContentPregenerator(agent.db, agent.analyze_user_patterns, personalized, lead_time=900,
+                                     clock=lambda: now)
+        soon = agent.record_task("user@example.com", "soon", now + timedelta(minutes=10))
+
+        # While the LLM is down nothing is stored, so sending would generate the content itself
+        assert pregen.run_once() == 0
+        assert pregen.lookup([SimpleNamespace(task_id=soon)]) is None
+        assert pregen.stats()["unavailable"] == 1
+
+        # Once it recovers, the next run generates the personalized content
+        llm_up = True
+        assert pregen.run_once() == 1
+        assert pregen.lookup([SimpleNamespace(task_id=soon)]) == ("Reminder 1", "soon")
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_content_is_generated_ahead_and_refreshed_when_patterns_change()
+    test_fallback_content_is_not_stored_and_retried()
+    print("✅ Pre-generation tests passed")
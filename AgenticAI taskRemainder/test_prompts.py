@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from agentic_ai_agent import AgenticReminderAgent
+from llm_stub import LatencyStubClient
+from prompts import PromptCompiler, TEMPLATES, compact, count_tokens
+
+PATTERNS = {
+    "patterns": "established_user",
+    "completion_rate": 0.6666666666666666,
+    "preferred_hours": [9, 14, 20],
+    "preferred_days": [0, 2],
+    "productivity_score": np.float64(0.7123456),
+    "total_tasks": 42,
+}
+
+
+class FixedReplyGateway:
+    """Gateway stand-in answering every call with the same reply"""
+
+    def __init__(self, reply, finish_reason="stop"):
+        self.reply = reply
+        self.finish_reason = finish_reason
+        self.max_tokens = []
+
+    def create(self, model=None, messages=None, max_tokens=None, **params):
+        self.max_tokens.append(max_tokens)
+        choice = SimpleNamespace(message=SimpleNamespace(content=self.reply), finish_reason=self.finish_reason)
+        return SimpleNamespace(choices=[choice])
+
+
+def test_compact_serialization_keeps_only_the_fields_used():
+    text = compact(dict(PATTERNS, hour_std=float("nan"), cohort_best_hours=[]),
+                   keep=("completion_rate", "preferred_hours", "productivity_score", "hour_std", "cohort_best_hours"))
+    assert text == '{"completion_rate":0.67,"preferred_hours":[9,14,20],"productivity_score":0.71,"hour_std":null}'
+    assert compact(["a", "b"]) == '["a","b"]'
+
+    prompt, tokens = TEMPLATES["suggest_optimal_time"].render(
+        task="Write report", preferred="Not specified", now="2025-01-06 09:00", patterns=PATTERNS)
+    assert "productivity_score" not in prompt and '"total_tasks":42' in prompt
+    # Slot values are counted on their own, so the total is close to counting the whole prompt
+    assert abs(tokens - count_tokens(prompt)) <= 8
+
+
+def test_max_tokens_follows_the_replies_and_resets_on_truncation():
+    reply = json.dumps({"suggested_time": "2025-01-07 09:00", "reasoning": "Mornings work", "confidence": 0.8})
+    gateway = FixedReplyGateway(reply)
+    compiler = PromptCompiler(gateway, "test-model", min_samples=5)
+    values = dict(task="Write report", preferred="Not specified", now="2025-01-06 09:00", patterns=PATTERNS)
+
+    for _ in range(6):
+        compiler.complete(compiler.request("suggest_optimal_time", **values))
+    # The template's ceiling until there are enough replies, then a margin over the largest one
+    assert gateway.max_tokens[:5] == [300] * 5
+    assert TEMPLATES["suggest_optimal_time"].min_tokens <= gateway.max_tokens[5] < 100
+
+    gateway.finish_reason = "length"
+    compiler.complete(compiler.request("suggest_optimal_time", **values))
+    assert compiler.max_tokens("suggest_optimal_time") == 300
+
+    # A digest gets more room per extra task
+    assert compiler.request("reminder_digest", items=3, tasks=["a", "b", "c"], email="u@example.com",
+                            patterns=PATTERNS).params["max_tokens"] == 400 + 2 * 40
+
+    stats = compiler.stats()["suggest_optimal_time"]
+    assert stats["calls"] == 7 and stats["truncated"] == 1
+    assert stats["avg_prompt_tokens"] > 0 and stats["completion_tokens"] == 7 * count_tokens(reply)
+
+
+def test_agent_calls_are_accounted_per_call_site():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "prompts.db"))
+        agent.client = LatencyStubClient()
+        agent.suggest_optimal_time("user@example.com", "Write report", "2030-01-07 09:00")
+        agent.make_intelligent_decisions("user@example.com", "Write report", "2030-01-07 09:00")
+        agent.get_productivity_insights("user@example.com")
+        # A repeat is served from the response cache and costs no tokens
+        agent.get_productivity_insights("user@example.com")
+        agent.record_task("other@example.com", "Gym", datetime(2030, 1, 7, 18, 0))
+        list(agent.stream_productivity_insights("other@example.com"))
+
+        stats = agent.prompts.stats()
+        assert stats["suggest_optimal_time"]["calls"] == 1
+        assert stats["ai_decisions"]["calls"] == 1
+        assert stats["productivity_insights"]["calls"] == 2
+        assert stats["productivity_insights"]["latency_p50"] is not None
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_compact_serialization_keeps_only_the_fields_used()
+    test_max_tokens_follows_the_replies_and_resets_on_truncation()
+    test_agent_calls_are_accounted_per_call_site()
+    print("✅ Prompt compiler tests passed")
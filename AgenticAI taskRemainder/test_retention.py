@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+from agentic_ai_agent import AgenticReminderAgent
+from retention import Retention
+
+USERS = ["a@example.com", "b@example.com", "c@example.com"]
+
+
+def build_history(agent, rng):
+    """Two years of tasks, mostly with outcomes, plus decisions backdated over the same span"""
+    now = datetime.now().replace(second=0, microsecond=0)
+    tasks = [(rng.choice(USERS), f"task {i}", now - timedelta(days=rng.randrange(730), hours=rng.randrange(24)))
+             for i in range(400)]
+    ids = agent.record_tasks(tasks)
+    agent.record_outcomes([(email, task_id, rng.choice(["completed", "missed"]), "")
+                           for task_id, (email, _, _) in zip(ids, tasks) if rng.random() < 0.8])
+    for i in range(60):
+        agent._log_decision(rng.choice(USERS), "task_scheduling", "because", {"n": i})
+    conn = sqlite3.connect(agent.db_path)
+    conn.execute("UPDATE agent_decisions SET created_at = datetime('now', '-' || (id * 3) || ' days')")
+    conn.commit()
+    conn.close()
+
+
+def precomputed(agent):
+    agent.precompute_patterns()
+    conn = sqlite3.connect(agent.db_path)
+    rows = dict(conn.execute("SELECT email, productivity_patterns FROM user_preferences").fetchall())
+    conn.close()
+    return rows
+
+
+def archived_ids(archive_dir, table_name):
+    ids = []
+    for name in sorted(os.listdir(archive_dir)):
+        if name.startswith(table_name):
+            with gzip.open(os.path.join(archive_dir, name), "rt") as archive:
+                ids.extend(json.loads(line)["id"] for line in archive)
+    return ids
+
+
+def test_archived_rows_still_count_in_the_analytics():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "retention.db"))
+        build_history(agent, random.Random(5))
+        conn = sqlite3.connect(agent.db_path)
+        old_done = {row[0] for row in conn.execute('''
+            SELECT id FROM user_behavior
+            WHERE completion_status IS NOT NULL AND scheduled_time < datetime('now', 'localtime', '-365 days')
+        ''')}
+        old_pending = {row[0] for row in conn.execute('''
+            SELECT id FROM user_behavior
+            WHERE completion_status IS NULL AND scheduled_time < datetime('now', 'localtime', '-365 days')
+        ''')}
+        old_decisions = conn.execute(
+            "SELECT COUNT(*) FROM agent_decisions WHERE created_at < datetime('now', '-90 days')").fetchone()[0]
+        assert old_done and old_decisions
+
+        before_all = agent.analyze_all()
+        before_users = {email: agent._compute_user_patterns(email) for email in USERS}
+        before_precomputed = precomputed(agent)
+
+        archive_dir = os.path.join(tmp, "archive")
+        result = Retention(agent.db, archive_dir, batch_size=25).run()
+        assert result["tasks"] == len(old_done)
+        assert result["decisions"] == old_decisions
+        assert conn.execute("SELECT SUM(decisions) FROM agent_decision_daily").fetchone()[0] == result["decisions"]
+        assert conn.execute("SELECT SUM(tasks) FROM user_daily_rollup").fetchone()[0] == len(old_done)
+        # Pending tasks are kept however old they are
+        live = {row[0] for row in conn.execute("SELECT id FROM user_behavior")}
+        assert old_pending and old_pending <= live and not old_done & live
+        assert sorted(archived_ids(archive_dir, "user_behavior")) == sorted(old_done)
+        assert len(archived_ids(archive_dir, "agent_decisions")) == result["decisions"]
+        assert result["pages_freed"] > 0
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        conn.close()
+
+        # The analytics see the same history through the rollup
+        assert agent.analyze_all() == before_all
+        assert agent.analyze_many(USERS) == before_users
+        assert precomputed(agent) == before_precomputed
+        agent.db.close()
+
+
+def test_interrupted_batch_is_redone_without_duplicates():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "retention.db"))
+        build_history(agent, random.Random(8))
+        archive_dir = os.path.join(tmp, "archive")
+        retention = Retention(agent.db, archive_dir, batch_size=25)
+
+        # Crash after the third archive file is written, before its batch commits
+        write_archive = retention._write_archive
+        written = []
+
+        def crashing_write(*args):
+            written.append(write_archive(*args))
+            if len(written) == 3:
+                raise OSError("disk went away")
+            return written[-1]
+
+        retention._write_archive = crashing_write
+        try:
+            retention.run()
+        except OSError:
+            pass
+        assert os.path.exists(written[-1])
+        retention._write_archive = write_archive
+
+        conn = sqlite3.connect(agent.db_path)
+        # The rows of the interrupted batch are still live and its file is not recorded
+        assert conn.execute("SELECT COUNT(*) FROM retention_archives").fetchone()[0] == 2
+        assert len(os.listdir(archive_dir)) == 3
+
+        retention.run()
+        ids = archived_ids(archive_dir, "user_behavior")
+        assert len(ids) == len(set(ids))
+        assert conn.execute("SELECT SUM(tasks) FROM user_daily_rollup").fetchone()[0] == len(ids)
+        assert not set(ids) & {row[0] for row in conn.execute("SELECT id FROM user_behavior")}
+        files = {row[0] for row in conn.execute("SELECT file FROM retention_archives")}
+        assert files == set(os.listdir(archive_dir))
+        conn.close()
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_archived_rows_still_count_in_the_analytics()
+    test_interrupted_batch_is_redone_without_duplicates()
+    print("✅ Retention tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+
+from agentic_ai_agent import AgenticReminderAgent
+from slots import slot_of
+from test_llm_gateway import FailingClient
+
+# Wednesday morning
+NOW = datetime(2025, 1, 15, 10, 30)
+TUESDAY_10 = datetime(2025, 1, 7, 10, 0)
+MONDAY_20 = datetime(2025, 1, 6, 20, 0)
+
+
+def record_outcomes(agent, email, when, outcomes):
+    for week, outcome in enumerate(outcomes):
+        name = f"{when:%a %H} task {week} {len(outcome)}"
+        agent.record_task(email, name, when - timedelta(weeks=week))
+        agent.learn_from_outcome(email, name, outcome)
+
+
+def test_slot_model_picks_the_best_open_slot():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "slots.db"))
+        model = agent.slot_model
+        assert model.suggest("user@example.com", now=NOW) is None
+
+        # One good outcome is not enough to skip the LLM
+        record_outcomes(agent, "user@example.com", TUESDAY_10, ["completed"])
+        early = model.suggest("user@example.com", now=NOW)
+        assert early["suggested_time"] == "2025-01-21 10:00"
+        assert early["confidence"] < model.min_confidence
+
+        record_outcomes(agent, "user@example.com", TUESDAY_10 - timedelta(weeks=1), ["completed"] * 7)
+        record_outcomes(agent, "user@example.com", MONDAY_20, ["missed"] * 6 + ["completed"])
+        suggestion = model.suggest("user@example.com", now=NOW)
+        assert suggestion["suggested_time"] == "2025-01-21 10:00"
+        assert suggestion["confidence"] >= model.min_confidence
+
+        # A pending task in that slot pushes the suggestion elsewhere
+        agent.record_task("user@example.com", "busy", datetime(2025, 1, 21, 10, 15))
+        assert model.suggest("user@example.com", now=NOW)["suggested_time"] != "2025-01-21 10:00"
+
+        # A preferred time pins the day: a poor hour moves, a good one is kept as given
+        moved = model.suggest("user@example.com", "2025-01-20 20:00", now=NOW)
+        assert moved["suggested_time"].startswith("2025-01-20") and moved["suggested_time"] != "2025-01-20 20:00"
+        assert model.suggest("user@example.com", "2025-01-28 10:45", now=NOW)["suggested_time"] == "2025-01-28 10:45"
+
+        # The posterior updated in memory matches one loaded from the stored counts
+        cached = model.posterior("user@example.com")
+        model.posteriors.clear()
+        reloaded = model.posterior("user@example.com")
+        assert cached is not reloaded
+        assert (cached.score == reloaded.score).all()
+
+        # The outcome counts match the task history
+        conn = sqlite3.connect(agent.db_path)
+        rows = conn.execute('''
+            SELECT scheduled_time, completion_status FROM user_behavior WHERE completion_status IS NOT NULL
+        ''').fetchall()
+        expected = Counter()
+        for scheduled_time, status in rows:
+            expected[(slot_of(datetime.fromisoformat(scheduled_time)), status == "completed")] += 1
+        stored = Counter()
+        for slot, completed, missed in conn.execute("SELECT slot, completed, missed FROM user_slot_outcomes"):
+            stored[(slot, True)] += completed
+            stored[(slot, False)] += missed
+        assert +stored == expected
+        conn.close()
+        agent.db.close()
+
+
+def test_llm_is_only_consulted_below_the_confidence_threshold():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = AgenticReminderAgent("test-key", os.path.join(tmp, "slots.db"))
+        client = FailingClient()
+        agent.client = client
+
+        # Outcomes at the current hour of the week, so the slot falls inside the horizon
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        record_outcomes(agent, "sure@example.com", now - timedelta(weeks=1), ["completed"] * 10)
+        suggestion = agent.suggest_optimal_time("sure@example.com", "write report")
+        assert suggestion["suggested_time"].endswith(now.strftime("%H:00"))
+        assert client.calls == 0
+
+        record_outcomes(agent, "unsure@example.com", now - timedelta(weeks=1), ["completed"])
+        suggestion = agent.suggest_optimal_time("unsure@example.com", "write report")
+        assert client.calls == 1
+        # With the LLM down, the less confident local answer is still used
+        assert suggestion["suggested_time"].endswith(now.strftime("%H:00"))
+
+        stats = agent.slot_model.stats()
+        assert stats["answered"] == 1 and stats["deferred"] == 1
+        agent.db.close()
+
+
+if __name__ == "__main__":
+    test_slot_model_picks_the_best_open_slot()
+    test_llm_is_only_consulted_below_the_confidence_threshold()
+    print("✅ Slot model tests passed")